@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: line-by-line vs mmap scanning of a synthetic stock dump.
+
+Writes a dump of --mb megabytes (about --keep of its lines are stock
+records, the rest page headers and blank lines) to a temporary directory,
+then times, in one process:
+
+  lines  read_lines() + stock_lines(): a Python loop over every line
+  mmap   scan_records() + clean_lines(): one regex over the mapped file
+
+and the whole pipeline (run(), writing the CSV) for both modes.
+
+Usage:
+  python bench_scan.py [--mb 200] [--keep 0.3] [--jobs N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import invoice_parser  # noqa: E402
+
+
+def synthetic_dump(path, size_mb, keep, rng):
+    target = int(size_mb * 1024 * 1024)
+    block = []
+    for i in range(50_000):
+        if rng.random() < keep:
+            block.append(f"  {rng.randint(10000, 99999)}   ARTICULO {i:06d}\t\t{rng.random() * 100:8.2f}   EUR   {i % 13}\n")
+        elif i % 5:
+            block.append(f"Pagina {i}  Inventario mensual  ----------------------------------------\n")
+        else:
+            block.append("\n")
+    blob = "".join(block).encode()
+    written = 0
+    with open(path, "wb") as f:
+        while written < target:
+            f.write(blob)
+            written += len(blob)
+    return written
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=float, default=200)
+    ap.add_argument("--keep", type=float, default=0.3, help="share of lines that are stock records")
+    ap.add_argument("--jobs", type=int, default=None, help="workers for the full-pipeline runs")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = os.path.join(tmp, "dump.txt")
+        size = synthetic_dump(dump, args.mb, args.keep, random.Random(42))
+        out = os.path.join(tmp, "cleaned.csv")
+        print(f"dump: {size / 1e6:,.0f} MB, keep ~{args.keep:.0%}")
+
+        t_lines, n_lines = timed(lambda: sum(1 for _ in invoice_parser.stock_lines(invoice_parser.read_lines(dump))))
+        t_mmap, n_mmap = timed(lambda: sum(1 for _ in invoice_parser.clean_lines(invoice_parser.scan_records(dump))))
+        assert n_lines == n_mmap, (n_lines, n_mmap)
+        print(f"{'scan only':<12} lines {t_lines:6.2f}s   mmap {t_mmap:6.2f}s   x{t_lines / t_mmap:.1f}  ({n_mmap:,} records)")
+
+        results = {}
+        for scan in invoice_parser.SCAN_MODES:
+            t, (lines, rows, _) = timed(lambda: invoice_parser.run([dump], out, args.jobs, scan=scan))
+            results[scan] = t
+            print(f"{'run ' + scan:<12} {t:6.2f}s   {lines / t:,.0f} lines/s   {size / t / 1e6:,.1f} MB/s")
+        print(f"{'pipeline':<12} x{results['lines'] / results['mmap']:.1f} with mmap")
+
+
+if __name__ == "__main__":
+    main()
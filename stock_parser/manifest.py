@@ -0,0 +1,141 @@
+"""
+Fingerprint manifest for incremental stock imports.
+
+A SQLite file next to the cumulative output records every input merged into
+it: path, size, mtime, SHA-256 of the content, the lines read and rows
+produced, and the stored part holding those rows. invoice_parser.py asks
+classify() which inputs are new or changed and parses only those.
+
+- Size and mtime equal to the manifest means unchanged, without reading the
+  file. Otherwise the content is hashed: same hash (a copy, a touch) is still
+  unchanged, and only the new mtime is stored.
+- Files keep the sequence number of their first import, which is their
+  place in the cumulative output.
+- meta holds what else the outputs depend on: the parser settings, and the
+  size/mtime of every cumulative file as last written, so an output edited
+  or deleted by hand is rebuilt rather than appended to.
+"""
+
+import hashlib
+import os
+import sqlite3
+from collections import namedtuple
+from datetime import datetime
+
+HASH_BLOCK = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+  path       TEXT PRIMARY KEY,
+  seq        INTEGER NOT NULL UNIQUE,   -- order of first import = order in the output
+  size       INTEGER NOT NULL,
+  mtime_ns   INTEGER NOT NULL,
+  sha256     TEXT NOT NULL,
+  lines      INTEGER NOT NULL,
+  rows       INTEGER NOT NULL,
+  part       TEXT NOT NULL,             -- name of the stored part (without extension)
+  parsed_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+  key    TEXT PRIMARY KEY,
+  value  TEXT NOT NULL
+);
+"""
+
+Entry = namedtuple("Entry", "path seq size mtime_ns sha256 lines rows part parsed_at")
+# what classify() found for one input; entry is the manifest row (None if new)
+Input = namedtuple("Input", "path status size mtime_ns sha256 entry")
+
+NEW, CHANGED, UNCHANGED = "new", "changed", "unchanged"
+
+
+def sha256_of(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """The manifest file; every change is committed at once."""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- files ----------------------------------------------------------
+    def entries(self):
+        """{path: Entry}, in output order."""
+        rows = self._db.execute(f"SELECT {', '.join(Entry._fields)} FROM files ORDER BY seq").fetchall()
+        return {row[0]: Entry(*row) for row in rows}
+
+    def classify(self, paths):
+        """[Input] for *paths*: new, changed (content differs) or unchanged."""
+        known = self.entries()
+        found = []
+        for path in paths:
+            st = os.stat(path)
+            entry = known.get(path)
+            if entry is not None and (entry.size, entry.mtime_ns) == (st.st_size, st.st_mtime_ns):
+                found.append(Input(path, UNCHANGED, st.st_size, st.st_mtime_ns, entry.sha256, entry))
+                continue
+            sha = sha256_of(path)
+            if entry is None:
+                status = NEW
+            elif sha == entry.sha256:
+                status = UNCHANGED
+                self._db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                                 (st.st_size, st.st_mtime_ns, path))
+            else:
+                status = CHANGED
+            found.append(Input(path, status, st.st_size, st.st_mtime_ns, sha, entry))
+        return found
+
+    def next_seq(self):
+        return self._db.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM files").fetchone()[0]
+
+    def record(self, item, seq, lines, rows, part):
+        """Store what parsing *item* (an Input) produced."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO files (path, seq, size, mtime_ns, sha256, lines, rows, part, parsed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (item.path, seq, item.size, item.mtime_ns, item.sha256, lines, rows, part,
+             datetime.now().isoformat(sep=" ", timespec="seconds")))
+
+    def remove(self, path):
+        self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def clear(self):
+        self._db.execute("DELETE FROM files")
+        self._db.execute("DELETE FROM meta")
+
+    # ---- meta -----------------------------------------------------------
+    def get(self, key, default=None):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def output_matches(self, path):
+        """True if *path* is as this manifest last wrote it (same size and mtime)."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False
+        return self.get(f"output:{path}") == f"{st.st_size}:{st.st_mtime_ns}"
+
+    def output_written(self, path):
+        st = os.stat(path)
+        self.set(f"output:{path}", f"{st.st_size}:{st.st_mtime_ns}")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Watch the import folder and merge stock dumps as they land.
+
+Runs until stopped (Ctrl+C / SIGTERM), feeding every new or changed *.txt
+in ~/Desktop/imports through invoice_parser.update(), so cleaned.csv and its
+typed columns are current when accounting asks for them.
+
+- The folder is polled with os.scandir every --interval seconds: one
+  directory read plus a stat per dump, compared by size and mtime; nothing
+  is opened until a file is ready.
+- A file is ready once two polls in a row saw the same size and mtime and
+  they have not moved for --settle seconds (or the mtime is already that
+  old), so a dump still being copied or exported is never parsed
+  half-written.
+- Ready files go through a bounded queue (--queue) to the importer, which
+  merges them in batches of up to --batch files. When the queue is full the
+  scanner leaves the rest in the folder and offers them again on the next
+  poll.
+- A batch that fails is retried file by file, so one unreadable dump does
+  not hold back the others; that dump waits until it changes.
+- Each batch logs its files, lines and rate; a rolling line gives lines/s
+  and MB/s over the last --window seconds.
+- The manifest makes restarts cheap: on start every dump is offered once,
+  and the ones already merged are skipped after a stat.
+
+Usage:
+  python watch_imports.py                        # ~/Desktop/imports -> ~/Desktop/exports/cleaned.csv
+  python watch_imports.py dumps/ -o out.csv --settle 10 --jobs 4
+"""
+
+import argparse
+import fnmatch
+import importlib.util
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import invoice_parser  # update(): the incremental merge
+
+POLL_SECONDS = 5
+SETTLE_SECONDS = 30
+QUEUE_SIZE = 64     # files waiting for the importer
+BATCH_FILES = 16    # files merged per update() call
+WINDOW_SECONDS = 15 * 60  # rolling throughput window
+
+
+def log(message):
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S}  {message}", flush=True)
+
+
+# ==========================================================
+# Scanner
+# ==========================================================
+def scan(directory, pattern=invoice_parser.PATTERN):
+    """{path: (size, mtime_ns)} of the dumps in *directory*."""
+    found = {}
+    with os.scandir(directory) as it:
+        for entry in it:
+            if not fnmatch.fnmatch(entry.name, pattern):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except FileNotFoundError:  # removed between the listing and the stat
+                continue
+            found[os.path.abspath(entry.path)] = (st.st_size, st.st_mtime_ns)
+    return found
+
+
+class Scanner(threading.Thread):
+    """Polls the folder and queues each dump once it has stopped growing."""
+
+    def __init__(self, directory, ready, interval=POLL_SECONDS, settle=SETTLE_SECONDS):
+        super().__init__(name="stock-scanner", daemon=True)
+        self.directory = directory
+        self.ready = ready
+        self.interval = interval
+        self.settle = settle
+        self._seen = {}      # path -> ((size, mtime_ns), monotonic time first seen so)
+        self._queued = {}    # path -> (size, mtime_ns) handed to the importer
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def poll(self):
+        """One pass over the folder; returns the paths queued."""
+        now = time.monotonic()
+        wall = time.time_ns()
+        current = scan(self.directory)
+        for gone in self._seen.keys() - current.keys():
+            del self._seen[gone]
+            self._queued.pop(gone, None)
+
+        queued = []
+        for path, stat in sorted(current.items()):
+            seen = self._seen.get(path)
+            if seen is None or seen[0] != stat:
+                self._seen[path] = seen = (stat, now)
+            if self._queued.get(path) == stat:
+                continue
+            # unchanged since an earlier poll, and for --settle seconds (or by mtime)
+            settled = seen[1] < now and (now - seen[1] >= self.settle or (wall - stat[1]) / 1e9 >= self.settle)
+            if not settled:
+                continue
+            try:
+                self.ready.put_nowait(path)
+            except queue.Full:
+                break  # the rest waits for the next poll
+            self._queued[path] = stat
+            queued.append(path)
+        return queued
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                self.poll()
+            except OSError as e:  # folder unmounted or renamed: keep trying
+                log(f"⚠️ Cannot scan {self.directory}: {e}")
+            self._stopping.wait(self.interval)
+
+
+# ==========================================================
+# Importer
+# ==========================================================
+class Throughput:
+    """Lines and bytes parsed over a rolling window of batches."""
+
+    def __init__(self, window=WINDOW_SECONDS):
+        self.window = window
+        self._batches = deque()  # (monotonic end, lines, bytes, parse seconds)
+
+    def add(self, lines, size, seconds):
+        now = time.monotonic()
+        self._batches.append((now, lines, size, seconds))
+        while self._batches and now - self._batches[0][0] > self.window:
+            self._batches.popleft()
+
+    def text(self):
+        lines = sum(b[1] for b in self._batches)
+        size = sum(b[2] for b in self._batches)
+        busy = max(sum(b[3] for b in self._batches), 1e-9)
+        return (f"last {self.window / 60:g} min: {len(self._batches)} batch(es), {lines:,} lines,"
+                f" {lines / busy:,.0f} lines/s, {size / busy / 1e6:,.1f} MB/s while parsing")
+
+
+def take_batch(ready, limit, timeout):
+    """Up to *limit* queued paths, waiting at most *timeout* for the first."""
+    try:
+        batch = [ready.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    while len(batch) < limit:
+        try:
+            batch.append(ready.get_nowait())
+        except queue.Empty:
+            break
+    return list(dict.fromkeys(batch))
+
+
+def import_batch(batch, output, formats, throughput, **parse):
+    """Merge *batch* into *output*; logs the outcome, never raises for a bad dump."""
+    present = [path for path in batch if os.path.exists(path)]
+    if not present:
+        return None
+    try:
+        done = invoice_parser.update(present, output, formats, **parse)
+    except Exception as e:  # a dump that cannot be read must not stop the watch
+        if len(present) > 1:
+            # find the bad dump: the others are queued no more and must not wait for it
+            log(f"⚠️ Import of {len(present)} files failed ({type(e).__name__}: {e}); retrying them one by one")
+            for path in present:
+                import_batch([path], output, formats, throughput, **parse)
+            return None
+        log(f"⚠️ Import of {os.path.basename(present[0])} failed, waiting for it to change: {type(e).__name__}: {e}")
+        return None
+    if done["new"] or done["changed"]:
+        throughput.add(done["lines"], done["bytes"], done["seconds"])
+        parse_s = max(done["seconds"], 1e-9)
+        names = ", ".join(os.path.basename(path) for path in present)
+        log(f"✅ {done['new']} new, {done['changed']} changed: {names}; {done['lines']:,} lines in {parse_s:.2f}s"
+            f" ({done['lines'] / parse_s:,.0f} lines/s); {done['rows']:,} rows in {output}")
+        log(f"   {throughput.text()}")
+        if done["unmatched"]:
+            log(f"⚠️ {done['unmatched']:,} new line(s) did not match the column pattern (no quantity/price)")
+    return done
+
+
+# ==========================================================
+# CLI
+# ==========================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Watch a folder and merge stock dumps into the cumulative CSV.")
+    ap.add_argument("directory", nargs="?", default=invoice_parser.IMPORT_DIR,
+                    help=f"folder to watch (default: {invoice_parser.IMPORT_DIR})")
+    ap.add_argument("-o", "--output", default=invoice_parser.OUTPUT_FILE,
+                    help=f"CSV to keep up to date (default: {invoice_parser.OUTPUT_FILE})")
+    ap.add_argument("--interval", type=float, default=POLL_SECONDS, help=f"seconds between polls (default: {POLL_SECONDS})")
+    ap.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                    help=f"seconds a file must stay the same size and mtime (default: {SETTLE_SECONDS})")
+    ap.add_argument("--queue", type=int, default=QUEUE_SIZE, help=f"files waiting at most (default: {QUEUE_SIZE})")
+    ap.add_argument("--batch", type=int, default=BATCH_FILES, help=f"files merged per run (default: {BATCH_FILES})")
+    ap.add_argument("--window", type=float, default=WINDOW_SECONDS,
+                    help=f"seconds of the rolling throughput log (default: {WINDOW_SECONDS})")
+    ap.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--columns", nargs="*", choices=invoice_parser.COLUMN_FORMATS,
+                    default=list(invoice_parser.COLUMN_FORMATS),
+                    help="typed outputs to write next to the CSV (default: csv parquet; none without values)")
+    args = ap.parse_args(argv)
+
+    directory = os.path.abspath(os.path.expanduser(args.directory))
+    if not os.path.isdir(directory):
+        print(f"⚠️ No such directory: {directory}", file=sys.stderr)
+        return 1
+    output = os.path.expanduser(args.output)
+    formats = list(dict.fromkeys(args.columns))
+    if "parquet" in formats and importlib.util.find_spec("pyarrow") is None:
+        print("⚠️ Parquet output needs pyarrow (pip install pyarrow); skipping it.", file=sys.stderr)
+        formats.remove("parquet")
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    ready = queue.Queue(maxsize=max(args.queue, 1))
+    scanner = Scanner(directory, ready, args.interval, args.settle)
+    throughput = Throughput(args.window)
+    log(f"👀 Watching {directory}/{invoice_parser.PATTERN} -> {output}"
+        f" (poll {args.interval:g}s, settle {args.settle:g}s, queue {ready.maxsize})")
+    scanner.start()
+    try:
+        while not stop.is_set():
+            batch = take_batch(ready, max(args.batch, 1), timeout=min(args.interval, 1))
+            if batch:
+                import_batch(batch, output, formats, throughput, jobs=args.jobs)
+    finally:
+        scanner.stop()
+        log("Stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""
+python -m vat_refunder <command> ...   (run from the folder above vat_refunder/)
+
+  report  generate reports without the GUI (app/report_cli.py)
+  batch   render many periods into a dated folder with a manifest (app/batch_reports.py)
+
+Neither imports tkinter.
+"""
+
+import importlib
+import os
+import sys
+
+# app/ modules import each other by plain name (as run_gui.py does when run from app/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+
+COMMANDS = {
+    "report": ("report_cli", "main"),
+    "batch": ("batch_reports", "cli"),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(f"usage: python -m vat_refunder {{{','.join(COMMANDS)}}} ...", file=sys.stderr)
+        return 0 if argv[:1] in (["-h"], ["--help"]) else 2
+    module_name, function = COMMANDS[argv[0]]
+    return getattr(importlib.import_module(module_name), function)(argv[1:])
+
+
+# guarded: process-pool workers may re-import this module (spawn start method)
+if __name__ == "__main__":
+    sys.exit(main())
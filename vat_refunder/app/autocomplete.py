@@ -0,0 +1,139 @@
+"""
+Shared autocomplete combobox for the entry forms.
+
+CompletionIndex keeps the completion list case-folded and sorted, answers
+prefix queries with bisect and substring queries (including NIF codes passed
+as aliases) through a trigram index, so a key press costs O(log n + k)
+instead of a scan over every supplier. Forms showing the same list share one
+index, and the trigram part is built on a worker thread as soon as the index
+is created; until it is ready a substring query falls back to a plain scan,
+so the Tk thread never waits for the build.
+The widget debounces key presses and never pushes more than MAX_RESULTS
+values into Tk.
+"""
+
+import threading
+from bisect import bisect_left
+from tkinter import ttk
+
+MAX_RESULTS = 50
+DEBOUNCE_MS = 120
+NGRAM = 3
+SKIP_KEYS = ("BackSpace", "Left", "Right", "Up", "Down", "Return", "Escape")
+
+
+class CompletionIndex:
+    def __init__(self, completion_list, aliases=None):
+        """*aliases* is an optional parallel list of extra search text (e.g. NIF)."""
+        pairs = sorted(
+            zip(completion_list, aliases or [""] * len(completion_list)),
+            key=lambda p: p[0].casefold(),
+        )
+        self.items = [item for item, _ in pairs]
+        self._folded = [item.casefold() for item in self.items]  # sorted: bisect gives item indices
+        folded_aliases = [(alias or "").casefold() for _, alias in pairs]
+        alias_keys = sorted((alias, i) for i, alias in enumerate(folded_aliases) if alias)
+        self._alias_keys = [k for k, _ in alias_keys]
+        self._alias_items = [i for _, i in alias_keys]
+        # folded "item\0alias" per item, for substring checks
+        self._text = [f + "\0" + a if a else f for f, a in zip(self._folded, folded_aliases)]
+        self._grams = None  # set by the builder thread when ready
+        self.ready = threading.Event()  # set once the trigram index is in use
+        threading.Thread(target=self._build_grams, name="completion-grams", daemon=True).start()
+
+    @classmethod
+    def for_list(cls, completion_list, aliases=None):
+        """Shared index for an identical list, so every open form reuses one build."""
+        key = (tuple(completion_list), tuple(aliases) if aliases else None)
+        index = _shared.get(key)
+        if index is None:
+            if len(_shared) >= 8:
+                _shared.pop(next(iter(_shared)))
+            index = _shared[key] = cls(completion_list, aliases)
+        return index
+
+    def _build_grams(self):
+        grams = {}
+        for i, text in enumerate(self._text):
+            for gram in {text[j:j + NGRAM] for j in range(len(text) - NGRAM + 1)}:
+                grams.setdefault(gram, []).append(i)
+        self._grams = grams  # published whole, never half-built
+        self.ready.set()
+
+    def prefix(self, query, limit=MAX_RESULTS):
+        """Indices of items whose name starts with *query* (list order), then
+        those whose alias does (alias order)."""
+        q = query.casefold()
+        end = q + "\U0010ffff"
+        lo = bisect_left(self._folded, q)
+        hits = list(range(lo, min(bisect_left(self._folded, end), lo + limit)))
+        if len(hits) < limit:
+            lo = bisect_left(self._alias_keys, q)
+            hi = bisect_left(self._alias_keys, end)
+            seen = set(hits)
+            for i in self._alias_items[lo:hi]:
+                if i not in seen:
+                    hits.append(i)
+                    if len(hits) >= limit:
+                        break
+        return hits
+
+    def substring(self, query, limit=MAX_RESULTS):
+        """Indices of items whose name or alias contains *query*, in list order."""
+        q = query.casefold()
+        if len(q) < NGRAM:
+            return self.prefix(query, limit)
+        if self._grams is None:   # still building: one pass over the folded texts
+            return [i for i in range(len(self._text)) if q in self._text[i]][:limit]
+        postings = []
+        for j in range(len(q) - NGRAM + 1):
+            posting = self._grams.get(q[j:j + NGRAM])
+            if posting is None:
+                return []
+            postings.append(posting)
+        hits = []
+        for i in min(postings, key=len):   # rarest trigram, then verify
+            if q in self._text[i]:
+                hits.append(i)
+                if len(hits) >= limit:
+                    break
+        return hits
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Prefix matches first, then substring matches, at most *limit* items."""
+        if not query:
+            return self.items[:limit]
+        hits = self.prefix(query, limit)
+        if len(hits) < limit:
+            seen = set(hits)
+            hits += [i for i in self.substring(query, limit) if i not in seen][: limit - len(hits)]
+        return [self.items[i] for i in hits]
+
+
+_shared = {}
+
+
+class AutocompleteCombobox(ttk.Combobox):
+    """
+    A Combobox with indexed, debounced autocompletion.
+    """
+    def set_completion_list(self, completion_list, aliases=None):
+        self._index = CompletionIndex.for_list(completion_list, aliases)
+        self._completion_list = self._index.items
+        self._after_id = None
+        self['values'] = self._index.search("")
+        self.bind('<KeyRelease>', self._handle_keyrelease)
+
+    def _handle_keyrelease(self, event):
+        if event.keysym in SKIP_KEYS:
+            return
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+        self._after_id = self.after(DEBOUNCE_MS, self._refresh)
+
+    def _refresh(self):
+        self._after_id = None
+        matches = self._index.search(self.get())
+        self['values'] = matches
+        if matches:
+            self.event_generate('<Down>')
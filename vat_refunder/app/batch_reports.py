@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Batch report generation across periods (year-end, audits).
+
+- Takes report types x periods (x colleagues) and turns each combination
+  into one job; jobs are rendered in a ProcessPoolExecutor, one worker per
+  core by default.
+- Each worker process keeps its own small DB pool (db.get_pool() is per
+  process) and reuses it for every job it runs.
+- All outputs go into one dated folder under the exports directory, next to
+  a manifest.json with per-job files, row counts, timings and errors.
+- Oficial and vouchers outputs come from report_cache when the period's data
+  has not changed since they were last built, so re-running a year-end batch
+  only renders the quarters that were edited.
+
+Usage:
+  python batch_reports.py                          # oficial + vouchers, last 5 years
+  python batch_reports.py --years 2023 2024 --quarters 1 2 --formats pdf
+  python batch_reports.py --reports colleague --colleague 12 15 --last-years 2
+  python batch_reports.py --reports colleague      # every colleague, one query per period
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import db
+import report_cache
+import vat_colleague
+import vat_oficial
+import vat_vouchers
+
+# ==========================================================
+# Config
+# ==========================================================
+OUTPUT_DIR = os.path.expanduser("~/Desktop/exports")
+REPORT_TYPES = ("oficial", "vouchers", "colleague")
+FORMATS = ("pdf", "csv")
+WORKER_POOL_SIZE = 2  # DB connections per worker process; jobs run one at a time
+MANIFEST_NAME = "manifest.json"
+
+
+def default_periods(last_years=5, today=None):
+    """Every (year, quarter) of the last *last_years* years up to the current quarter."""
+    today = today or datetime.now()
+    current = (today.year, (today.month - 1) // 3 + 1)
+    return [
+        (y, q)
+        for y in range(today.year - last_years + 1, today.year + 1)
+        for q in (1, 2, 3, 4)
+        if (y, q) <= current
+    ]
+
+
+def build_jobs(reports, periods, formats, colleagues=()):
+    """One job per report and period; 'colleague' jobs per ID, or one for all colleagues."""
+    jobs = []
+    for report in reports:
+        for year, quarter in periods:
+            if report == "colleague":
+                for colleague_id in colleagues or [None]:
+                    jobs.append(dict(report=report, year=year, quarter=quarter,
+                                     colleague=colleague_id, formats=list(formats)))
+            else:
+                jobs.append(dict(report=report, year=year, quarter=quarter,
+                                 colleague=None, formats=list(formats)))
+    return jobs
+
+
+# ==========================================================
+# Workers
+# ==========================================================
+def _init_worker():
+    db.reset_pool(WORKER_POOL_SIZE)
+
+
+def _from_cache(report, job, outputs):
+    """{format: (cache key, summary)}; summary is None where the cache had nothing."""
+    found = {}
+    for fmt in job["formats"]:
+        key = report_cache.key_for(f"{report}_{fmt}", job["quarter"], job["year"])
+        found[fmt] = (key, report_cache.restore(key, outputs[fmt]))
+    return found
+
+
+def _written(job, outputs):
+    return [path for fmt in job["formats"] for path in outputs[fmt].values() if os.path.exists(path)]
+
+
+def _oficial(job, out_dir):
+    q, y = job["quarter"], job["year"]
+    base = os.path.join(out_dir, f"VAT_Q{q}_{y}")
+    outputs = {"pdf": {"pdf": base + ".pdf"},
+               "csv": {"csv": base + ".csv", "log": base + "_truncated_log.csv"}}
+    cached = _from_cache("oficial", job, outputs)
+    todo = [fmt for fmt, (_, summary) in cached.items() if summary is None]
+    chancery = residence = []
+    if todo:
+        chancery = list(vat_oficial.iter_rows(vat_oficial.CHANCERY_VIEW, q, y))
+        residence = list(vat_oficial.iter_rows(vat_oficial.RESIDENCE_VIEW, q, y))
+    rows, truncated = len(chancery) + len(residence), 0
+    if rows and "pdf" in todo:
+        vat_oficial.render_pdf(chancery, residence, base + ".pdf", y, q)
+        report_cache.save(cached["pdf"][0], outputs["pdf"], {"rows": rows})
+    if rows and "csv" in todo:
+        _, truncated = vat_oficial.generate_csv(
+            (("Chancery", chancery), ("Residence", residence)),
+            base + ".csv", base + "_truncated_log.csv")
+        report_cache.save(cached["csv"][0], outputs["csv"], {"written": rows, "truncated": truncated})
+    for fmt, (_, summary) in cached.items():
+        if summary is not None:
+            rows = summary.get("rows", summary.get("written", rows))
+            truncated = summary.get("truncated", truncated)
+    hits = [fmt for fmt in job["formats"] if fmt not in todo]
+    return _written(job, outputs), rows, {"truncated": truncated, "cached": hits}
+
+
+def _vouchers(job, out_dir):
+    q, y = job["quarter"], job["year"]
+    base = os.path.join(out_dir, f"VatVouchers_Q{q}_{y}")
+    outputs = {"pdf": {"pdf": base + ".pdf"},
+               "csv": {name.lower(): f"{base}_{name}.csv" for name, _ in vat_vouchers.TABLES}}
+    cached = _from_cache("vouchers", job, outputs)
+    todo = [fmt for fmt, (_, summary) in cached.items() if summary is None]
+    sections = [(name, vat_vouchers.fetch_rows(table, q, y) if todo else [])
+                for name, table in vat_vouchers.TABLES]
+    (_, ch), (_, rs) = sections
+    rows = len(ch) + len(rs)
+    if rows and "pdf" in todo:
+        vat_vouchers.render_pdf(ch, rs, base + ".pdf", y, q)
+        report_cache.save(cached["pdf"][0], outputs["pdf"], {"rows": rows})
+    if rows and "csv" in todo:
+        for name, section_rows in sections:
+            if section_rows:
+                vat_vouchers.write_csv(section_rows, outputs["csv"][name.lower()])
+        report_cache.save(cached["csv"][0], outputs["csv"],
+                          {name.lower(): len(section_rows) for name, section_rows in sections})
+    for fmt, (_, summary) in cached.items():
+        if summary is not None:
+            rows = summary["rows"] if fmt == "pdf" else sum(summary.values())
+    hits = [fmt for fmt in job["formats"] if fmt not in todo]
+    return _written(job, outputs), rows, {"cached": hits}
+
+
+def _colleague(job, out_dir):
+    q, y = job["quarter"], job["year"]
+    if job["colleague"] is None:
+        # all colleagues: one query for the period, grouped in one pass
+        groups = vat_colleague.colleague_reports(vat_colleague.fetch_rows(None, q, y))
+    else:
+        valid = [row for row in vat_colleague.fetch_rows(job["colleague"], q, y) if len(row) >= 13]
+        groups = [(job["colleague"], valid)] if valid else []
+    files, rows = [], 0
+    for colleague_id, valid in groups:
+        pdf_name, csv_name = vat_colleague.report_filenames(valid, q, y, colleague_id)
+        if "pdf" in job["formats"]:
+            vat_colleague.render_pdf(valid, os.path.join(out_dir, pdf_name))
+            files.append(os.path.join(out_dir, pdf_name))
+        if "csv" in job["formats"]:
+            vat_colleague.write_csv(valid, os.path.join(out_dir, csv_name))
+            files.append(os.path.join(out_dir, csv_name))
+        rows += len(valid)
+    return files, rows, {}
+
+
+RUNNERS = {"oficial": _oficial, "vouchers": _vouchers, "colleague": _colleague}
+
+
+def run_job(job, out_dir):
+    """Render one job; never raises, the outcome goes into the manifest entry."""
+    entry = dict(job, pid=os.getpid(), files=[], rows=0)
+    t0 = time.perf_counter()
+    try:
+        files, rows, extra = RUNNERS[job["report"]](job, out_dir)
+        entry.update(extra, files=[os.path.basename(f) for f in files], rows=rows,
+                     status="ok" if files else "empty")
+    except Exception as e:
+        entry.update(status="error", error=f"{type(e).__name__}: {e}")
+    entry["seconds"] = round(time.perf_counter() - t0, 3)
+    return entry
+
+
+# ==========================================================
+# Driver
+# ==========================================================
+def run_batch(jobs, output_root=OUTPUT_DIR, workers=None, progress=None):
+    """Render *jobs* into a new dated folder; returns (folder, manifest dict).
+
+    progress(done, total, entry) is called in this process as jobs finish.
+    """
+    started = datetime.now()
+    out_dir = os.path.join(output_root, f"batch_{started:%Y%m%d_%H%M%S}")
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    t0 = time.perf_counter()
+    entries = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(run_job, job, out_dir): i for i, job in enumerate(jobs)}
+        for done, fut in enumerate(as_completed(futures), start=1):
+            entries[futures[fut]] = entry = fut.result()
+            if progress:
+                progress(done, len(jobs), entry)
+
+    manifest = {
+        "created": started.isoformat(timespec="seconds"),
+        "workers": workers,
+        "wall_seconds": round(time.perf_counter() - t0, 3),
+        "totals": {
+            "jobs": len(entries),
+            "ok": sum(e["status"] == "ok" for e in entries),
+            "empty": sum(e["status"] == "empty" for e in entries),
+            "errors": sum(e["status"] == "error" for e in entries),
+            "rows": sum(e["rows"] for e in entries),
+            "cpu_seconds": round(sum(e["seconds"] for e in entries), 3),
+        },
+        "jobs": entries,
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return out_dir, manifest
+
+
+def _print_progress(done, total, entry):
+    who = ""
+    if entry["report"] == "colleague":
+        who = f" colleague {entry['colleague']}" if entry["colleague"] is not None else " all colleagues"
+    note = entry.get("error") or f"{entry['rows']} rows"
+    print(f"[{done}/{total}] {entry['report']}{who} Q{entry['quarter']} {entry['year']}: "
+          f"{entry['status']} ({note}, {entry['seconds']:.2f}s)")
+
+
+def cli(argv=None):
+    ap = argparse.ArgumentParser(description="Render VAT reports for many periods in parallel.")
+    ap.add_argument("--reports", nargs="+", choices=REPORT_TYPES, default=["oficial", "vouchers"])
+    ap.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    ap.add_argument("--years", nargs="+", type=int, help="fiscal years (default: --last-years)")
+    ap.add_argument("--last-years", type=int, default=5)
+    ap.add_argument("--quarters", nargs="+", type=int, choices=(1, 2, 3, 4), default=[1, 2, 3, 4])
+    ap.add_argument("--colleague", nargs="+", type=int, default=[], help="colleague IDs for 'colleague' (default: all colleagues)")
+    ap.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    ap.add_argument("--out", default=OUTPUT_DIR, help="root folder for the dated batch folder")
+    args = ap.parse_args(argv)
+
+    if args.years:
+        periods = [(y, q) for y in sorted(args.years) for q in args.quarters]
+    else:
+        periods = [(y, q) for y, q in default_periods(args.last_years) if q in args.quarters]
+
+    jobs = build_jobs(args.reports, periods, args.formats, args.colleague)
+    out_dir, manifest = run_batch(jobs, args.out, args.workers, progress=_print_progress)
+    t = manifest["totals"]
+    print(f"{t['jobs']} jobs ({t['ok']} ok, {t['empty']} empty, {t['errors']} errors), "
+          f"{t['rows']} rows in {manifest['wall_seconds']:.1f}s on {manifest['workers']} workers")
+    print(f"Output: {out_dir}")
+    return 1 if t["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Bulk invoice import (CSV / XLSX) into Invoices_Chancery or Invoices_Residence.
+
+- The spreadsheet is streamed row by row (csv module / openpyxl read-only),
+  validated, and handled in chunks of CHUNK_ROWS.
+- Per chunk: ONE query resolves supplier names/NIFs against NIF_Codes and ONE
+  query finds invoice numbers already present (Invoice_*_No unique keys).
+- Accepted rows are inserted with invoices_repo.insert_invoices (multi-row
+  INSERTs); the whole file is a single transaction. Dry-run does everything
+  except the INSERT.
+- Rejected rows are written to a semicolon CSV next to the exports.
+
+Expected columns (header row, case-insensitive, Spanish names accepted):
+  Supplier | NIF, Number, Date, Total, Vat, [Refundable], [Status]
+
+Usage:
+  python bulk_import.py FILE --table chancery|residence [--dry-run]
+"""
+
+import argparse
+import csv
+import os
+import sys
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+import tkinter as tk
+from tkinter import filedialog, messagebox
+from mysql.connector import Error
+from db import db_cursor  # shared pooled DB connector
+import invoices_repo  # batch INSERTs shared with the forms
+
+# ==========================================================
+# Config
+# ==========================================================
+OUTPUT_DIR = os.path.expanduser("~/Desktop/exports")
+CHUNK_ROWS = 5000
+
+TABLES = {
+    "chancery": "Invoices_Chancery",
+    "residence": "Invoices_Residence",
+}
+
+STATUSES = ("Pending", "Processed", "Archived")
+
+HEADER_ALIASES = {
+    "supplier": "supplier", "proveedor": "supplier", "supplier_name": "supplier",
+    "nif": "nif", "supplier_nif_code": "nif",
+    "number": "number", "numero_factura": "number", "invoice_number": "number",
+    "date": "date", "fecha": "date", "fecha_devengo": "date", "invoice_date": "date",
+    "total": "total", "importe": "total", "importe_total_impuestos_incluidos": "total",
+    "vat": "vat", "iva": "vat", "cuota": "vat", "cuotas_iva": "vat",
+    "refundable": "refundable",
+    "status": "status",
+}
+
+
+class ImportFormatError(Exception):
+    """The file cannot be read as an invoice sheet at all."""
+
+
+# ==========================================================
+# Streaming readers
+# ==========================================================
+def _normalize_header(header):
+    cols = [HEADER_ALIASES.get(str(h or "").strip().lower().replace(" ", "_")) for h in header]
+    if "number" not in cols or not ({"supplier", "nif"} & set(cols)):
+        raise ImportFormatError(
+            "Header must contain Number and Supplier or NIF columns, got: "
+            + ", ".join(str(h) for h in header)
+        )
+    return cols
+
+
+def _iter_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        delimiter = ";" if sample.count(";") > sample.count(",") else ","
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield header
+        yield from reader
+
+
+def _iter_xlsx(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("XLSX import needs openpyxl (pip install openpyxl)")
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def iter_records(path):
+    """Yield (line_no, {column: value}) for every data row of *path*."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        rows = _iter_xlsx(path)
+    elif ext in (".csv", ".txt"):
+        rows = _iter_csv(path)
+    else:
+        raise ImportFormatError(f"Unsupported file type: {ext}")
+
+    header = next(rows, None)
+    if header is None:
+        return
+    cols = _normalize_header(header)
+    for line_no, values in enumerate(rows, start=2):
+        if not values or all(v in (None, "") for v in values):
+            continue
+        yield line_no, {c: v for c, v in zip(cols, values) if c}
+
+
+# ==========================================================
+# Validation helpers
+# ==========================================================
+def _parse_amount(value):
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+    s = str(value or "").strip().replace("€", "").replace(" ", "")
+    if "," in s and "." in s:
+        s = s.replace(".", "").replace(",", ".")   # 1.234,56
+    elif "," in s:
+        s = s.replace(",", ".")
+    return Decimal(s).quantize(Decimal("0.01"))
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    s = str(value or "").strip()[:10]
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"invalid date {value!r}")
+
+
+def _parse_flag(value, default=1):
+    if value in (None, ""):
+        return default
+    return 1 if str(value).strip().lower() in ("1", "true", "yes", "si", "sí", "x") else 0
+
+
+def validate(rec):
+    """Return a normalized dict or raise ValueError with the reject reason."""
+    number = rec.get("number")
+    if isinstance(number, float) and number.is_integer():
+        number = int(number)   # XLSX numeric cells
+    number = str(number or "").strip()
+    if not number:
+        raise ValueError("missing invoice number")
+    if len(number) > 255:
+        raise ValueError("invoice number longer than 255 characters")
+    supplier = str(rec.get("supplier") or "").strip()
+    nif = str(rec.get("nif") or "").strip()
+    if not supplier and not nif:
+        raise ValueError("missing supplier name and NIF")
+    try:
+        total = _parse_amount(rec.get("total"))
+        vat = _parse_amount(rec.get("vat"))
+    except (InvalidOperation, ValueError):
+        raise ValueError("Total and Vat must be numbers")
+    status = str(rec.get("status") or "Processed").strip().capitalize()
+    if status not in STATUSES:
+        raise ValueError(f"unknown status {status!r}")
+    return {
+        "supplier": supplier,
+        "nif": nif,
+        "number": number,
+        "date": _parse_date(rec.get("date")),
+        "total": total,
+        "vat": vat,
+        "refundable": _parse_flag(rec.get("refundable")),
+        "status": status,
+    }
+
+
+# ==========================================================
+# Set-based lookups (one query each per chunk)
+# ==========================================================
+def resolve_suppliers(cur, names, nifs):
+    """Return ({folded name: id}, {folded nif: id}) for the given keys."""
+    names, nifs = list(names), list(nifs)
+    if not names and not nifs:
+        return {}, {}
+    clauses, params = [], []
+    if names:
+        clauses.append(f"Supplier_Name IN ({', '.join(['%s'] * len(names))})")
+        params += names
+    if nifs:
+        clauses.append(f"Supplier_NIF_Code IN ({', '.join(['%s'] * len(nifs))})")
+        params += nifs
+    cur.execute(
+        "SELECT Supplier_ID, Supplier_Name, Supplier_NIF_Code FROM NIF_Codes WHERE "
+        + " OR ".join(clauses),
+        params,
+    )
+    by_name, by_nif = {}, {}
+    for sid, name, nif in cur.fetchall():
+        by_name[name.casefold()] = sid
+        if nif:
+            by_nif[nif.casefold()] = sid
+    return by_name, by_nif
+
+
+def existing_numbers(cur, table, numbers):
+    numbers = list(numbers)
+    if not numbers:
+        return set()
+    cur.execute(
+        f"SELECT Number FROM {table} WHERE Number IN ({', '.join(['%s'] * len(numbers))})",
+        numbers,
+    )
+    return {n.casefold() for (n,) in cur.fetchall()}
+
+
+# ==========================================================
+# Import
+# ==========================================================
+def _chunks(records, size):
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_file(path, kind, dry_run=False, reject_file=None):
+    """Import *path* into the *kind* ("chancery"/"residence") invoice table.
+
+    Returns a summary dict: rows, accepted, inserted, rejected, reject_file.
+    Raises ImportFormatError for unreadable files, invoices_repo.DuplicateInvoice
+    if a number was inserted by someone else while the file was being imported,
+    and mysql Error on DB failure (nothing is committed in those cases).
+    """
+    table = TABLES[kind]
+    summary = {"rows": 0, "accepted": 0, "inserted": 0, "rejected": 0, "reject_file": None}
+    rejects = []
+    seen = set()  # invoice numbers already accepted from this file
+
+    with db_cursor(commit=not dry_run) as cur:
+        for chunk in _chunks(iter_records(path), CHUNK_ROWS):
+            valid = []
+            for line_no, rec in chunk:
+                summary["rows"] += 1
+                try:
+                    valid.append((line_no, validate(rec)))
+                except ValueError as e:
+                    rejects.append((line_no, rec.get("number", ""), str(e)))
+
+            by_name, by_nif = resolve_suppliers(
+                cur,
+                {r["supplier"] for _, r in valid if r["supplier"]},
+                {r["nif"] for _, r in valid if r["nif"]},
+            )
+            dupes = existing_numbers(cur, table, {r["number"] for _, r in valid})
+
+            batch = []
+            for line_no, r in valid:
+                key = r["number"].casefold()
+                sid = by_nif.get(r["nif"].casefold()) or by_name.get(r["supplier"].casefold())
+                if sid is None:
+                    rejects.append((line_no, r["number"], f"unknown supplier {r['nif'] or r['supplier']!r}"))
+                elif key in dupes:
+                    rejects.append((line_no, r["number"], f"already in {table}"))
+                elif key in seen:
+                    rejects.append((line_no, r["number"], "repeated in file"))
+                else:
+                    seen.add(key)
+                    batch.append((sid, r["number"], r["date"], r["total"], r["vat"],
+                                  r["refundable"], r["status"]))
+
+            summary["accepted"] += len(batch)
+            if batch and not dry_run:
+                summary["inserted"] += invoices_repo.insert_invoices(cur, table, batch)
+
+    summary["rejected"] = len(rejects)
+    if rejects:
+        if reject_file is None:
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            mode = "dryrun" if dry_run else "import"
+            reject_file = os.path.join(OUTPUT_DIR, f"BulkImport_{kind}_{mode}_{stamp}_rejects.csv")
+        with open(reject_file, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f, delimiter=";")
+            w.writerow(["Line", "Number", "Reason"])
+            w.writerows(sorted(rejects))
+        summary["reject_file"] = reject_file
+    return summary
+
+
+def format_summary(summary, dry_run):
+    verb = "Would insert" if dry_run else "Inserted"
+    count = summary["accepted"] if dry_run else summary["inserted"]
+    msg = f"Rows read: {summary['rows']}\n{verb}: {count}\nRejected: {summary['rejected']}"
+    if summary["reject_file"]:
+        msg += f"\n\nReject report:\n{summary['reject_file']}"
+    return msg
+
+
+# ==========================================================
+# Main GUI
+# ==========================================================
+def main(master=None):
+    """Build the dialog; as a Toplevel of *master* when opened from the launcher."""
+    root = tk.Toplevel(master) if master is not None else tk.Tk()
+    root.title("Bulk Invoice Import")
+
+    path_var = tk.StringVar()
+    kind_var = tk.StringVar(value="chancery")
+    dry_run_var = tk.IntVar(value=1)
+
+    def browse():
+        path = filedialog.askopenfilename(
+            parent=root,
+            title="Select invoice spreadsheet",
+            filetypes=[("Spreadsheets", "*.csv *.xlsx"), ("All files", "*.*")],
+        )
+        if path:
+            path_var.set(path)
+
+    def run_import():
+        path = path_var.get().strip()
+        if not path:
+            messagebox.showwarning("Input Required", "Select a CSV or XLSX file.", parent=root)
+            return
+        dry_run = bool(dry_run_var.get())
+        try:
+            summary = import_file(path, kind_var.get(), dry_run=dry_run)
+        except ImportFormatError as e:
+            messagebox.showerror("File Error", str(e), parent=root)
+            return
+        except (Error, OSError, invoices_repo.DuplicateError) as e:
+            messagebox.showerror("Import Error", f"Nothing was imported: {e}", parent=root)
+            return
+        title = "Dry Run" if dry_run else "Import Finished"
+        messagebox.showinfo(title, format_summary(summary, dry_run), parent=root)
+
+    tk.Label(root, text="File:").grid(row=0, column=0, padx=10, pady=5, sticky="e")
+    tk.Entry(root, textvariable=path_var, width=45).grid(row=0, column=1, padx=10, pady=5)
+    tk.Button(root, text="Browse", command=browse).grid(row=0, column=2, padx=5, pady=5)
+
+    tk.Label(root, text="Table:").grid(row=1, column=0, padx=10, pady=5, sticky="e")
+    tk.Radiobutton(root, text="Chancery", variable=kind_var, value="chancery").grid(row=1, column=1, sticky="w", padx=10)
+    tk.Radiobutton(root, text="Residence", variable=kind_var, value="residence").grid(row=2, column=1, sticky="w", padx=10)
+
+    tk.Checkbutton(root, text="Dry run (report only, insert nothing)", variable=dry_run_var)\
+        .grid(row=3, column=1, sticky="w", padx=10, pady=5)
+    tk.Button(root, text="Import", command=run_import, width=15).grid(row=4, column=1, pady=15)
+
+    if master is None:
+        root.mainloop()
+    return root
+
+
+def cli(argv=None):
+    ap = argparse.ArgumentParser(description="Bulk import invoices from CSV/XLSX.")
+    ap.add_argument("file")
+    ap.add_argument("--table", choices=sorted(TABLES), required=True)
+    ap.add_argument("--dry-run", action="store_true", help="validate and report only")
+    ap.add_argument("--rejects", help="path for the reject report (default: exports folder)")
+    args = ap.parse_args(argv)
+    try:
+        summary = import_file(args.file, args.table, dry_run=args.dry_run, reject_file=args.rejects)
+    except (ImportFormatError, Error, OSError, invoices_repo.DuplicateError) as e:
+        print(f"Import failed, nothing committed: {e}", file=sys.stderr)
+        return 1
+    print(format_summary(summary, args.dry_run))
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(cli())
+    main()
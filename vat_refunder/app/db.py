@@ -1,15 +1,132 @@
 import os
+import time
+from contextlib import contextmanager
 import mysql.connector
+from mysql.connector import Error, pooling
+from mysql.connector.errors import PoolError
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_cnx():
-    """Return a new MySQL connection using environment variables."""
-    return mysql.connector.connect(
+POOL_NAME = "vat_refunder"
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+PING_ATTEMPTS = int(os.getenv("DB_PING_ATTEMPTS", "3"))
+PING_DELAY = int(os.getenv("DB_PING_DELAY", "1"))
+
+_pool = None
+
+
+def _cnx_config():
+    return dict(
         host=os.getenv("DB_HOST", "127.0.0.1"),
         user=os.getenv("DB_USER", "vat_user"),
         password=os.getenv("DB_PASS", "ChangeMeUser!"),
         database=os.getenv("DB_NAME", "vat_refunder"),
         autocommit=False,  # better control; handle commits explicitly
+        consume_results=True,  # a stream closed early must not poison the pooled connection
     )
+
+
+def connect():
+    """Return a new, unpooled MySQL connection (full TCP + auth handshake)."""
+    return mysql.connector.connect(**_cnx_config())
+
+
+def get_pool():
+    """Create the process-wide pool on first use and return it.
+
+    The pool opens all of its connections up front, so it is built lazily:
+    importing a form must not require the database to be up.
+    """
+    global _pool
+    if _pool is None:
+        _pool = pooling.MySQLConnectionPool(
+            pool_name=POOL_NAME,
+            pool_size=POOL_SIZE,
+            # keep the server session between checkouts: its prepared statements
+            # are reused (queries.py); db_connection() ends open transactions instead
+            pool_reset_session=False,
+            **_cnx_config(),
+        )
+    return _pool
+
+
+def raw_connection(cnx):
+    """The connection behind a pooled handle from get_cnx().
+
+    The handle only lasts one checkout; the connection (and its server
+    session) lasts as long as the pool, so per-session state hangs off it.
+    """
+    return getattr(cnx, "_cnx", cnx)
+
+
+def reset_pool(size=None):
+    """Drop the pool this process inherited, for ProcessPoolExecutor initializers.
+
+    A pool copied through fork() would share its sockets with the parent; the
+    next get_pool() opens a fresh one, of *size* connections when given.
+    """
+    global _pool, POOL_SIZE
+    _pool = None
+    if size is not None:
+        POOL_SIZE = size
+
+
+def get_cnx():
+    """Check a healthy connection out of the shared pool.
+
+    Waits up to DB_POOL_TIMEOUT seconds when every connection is in use, then
+    pings the socket and transparently reconnects if the server dropped it
+    (idle timeout, container restart). close() returns it to the pool.
+    """
+    pool = get_pool()
+    deadline = time.monotonic() + POOL_TIMEOUT
+    while True:
+        try:
+            cnx = pool.get_connection()
+            break
+        except PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+    try:
+        cnx.ping(reconnect=True, attempts=PING_ATTEMPTS, delay=PING_DELAY)
+    except Error:
+        cnx.close()
+        raise
+    return cnx
+
+
+# ==========================================================
+# Context manager for automatic cleanup
+# ==========================================================
+@contextmanager
+def db_connection(commit=False):
+    """A pooled connection for the block: committed (or rolled back) and returned to the pool.
+
+    Sessions are not reset on checkout, so a block that only read still ends
+    its transaction here; the next checkout must not see an old snapshot.
+    """
+    cnx = get_cnx()
+    try:
+        yield cnx
+        if commit:
+            cnx.commit()
+        elif cnx.in_transaction:
+            cnx.rollback()
+    except BaseException:  # also a stream closed early (GeneratorExit) or a cancel
+        cnx.rollback()
+        raise
+    finally:
+        cnx.close()
+
+
+@contextmanager
+def db_cursor(commit=False, dictionary=False):
+    with db_connection(commit) as cnx:
+        cur = cnx.cursor(dictionary=dictionary)
+        try:
+            yield cur
+        finally:
+            cur.close()
@@ -0,0 +1,151 @@
+"""
+Incremental exports: only the rows inserted or changed since the last export.
+
+The invoice and voucher tables carry Created_At / Updated_At, and
+Export_Watermarks remembers per report and scope (period, colleague) when it
+was last exported, with the period's row count and VAT at that moment
+(db/init/006_change_tracking.sql).
+
+An export (full or changes-only) goes like this:
+- Export(...) reads the previous watermark, the database clock and the
+  period totals *before* anything is fetched, so a row edited while the
+  export runs is sent again next time rather than missed;
+- a changes export fetches WHERE Updated_At > export.since (an index range
+  on IDX_I*_Changes) with a trailing "Is_New" column (Created_At > since);
+- split_new() strips that column and counts the new rows, summary() adds the
+  changed / gone counts and the VAT movement;
+- commit() moves the watermark once the files are written.
+
+Without a watermark (first run) a changes export contains the whole period.
+Rows that were deleted, made non-refundable or moved to another period
+cannot be listed, only counted ("gone"), from the stored row count.
+"""
+
+from mysql.connector import Error
+from db import db_cursor  # shared pooled DB connector
+
+REPORT_ENTITIES = {
+    # report -> Vat_Rollup_Quarter entities its totals come from
+    "oficial": ("Chancery", "Residence"),
+    "vouchers": ("Chancery", "Residence"),
+}
+
+WATERMARK_QUERY = """
+SELECT Exported_At, Row_Count, Vat_Total
+FROM Export_Watermarks
+WHERE Report = %s AND Year = %s AND Quarter = %s AND Colleague_ID = %s
+"""
+
+PERIOD_TOTALS_QUERY = """
+SELECT COALESCE(SUM(Invoice_Count), 0), COALESCE(SUM(Vat), 0)
+FROM Vat_Rollup_Quarter
+WHERE Year = %s AND Quarter = %s AND Refundable = 1 AND Entity IN ({entities})
+"""
+
+SAVE_WATERMARK = """
+INSERT INTO Export_Watermarks (Report, Year, Quarter, Colleague_ID, Exported_At, Row_Count, Vat_Total)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE Exported_At = VALUES(Exported_At),
+                        Row_Count = VALUES(Row_Count),
+                        Vat_Total = VALUES(Vat_Total)
+"""
+
+
+class Export:
+    """One export of *report* for a period (and colleague); see the module docstring.
+
+    Raises mysql Error if the change-tracking tables are not installed yet.
+    For reports without rollup entities (colleague), set .totals to
+    (row_count, vat_total) of the full period before commit().
+    """
+
+    def __init__(self, report, quarter, year, colleague=None):
+        self.report = report
+        self.scope = (int(year or 0), int(quarter or 0), int(colleague or 0))
+        self.totals = None
+        with db_cursor() as cur:
+            cur.execute(WATERMARK_QUERY, (report, *self.scope))
+            self.previous = cur.fetchone()
+            cur.execute("SELECT NOW(6)")
+            self.started_at = cur.fetchone()[0]
+            entities = REPORT_ENTITIES.get(report)
+            if entities and self.scope[0] and self.scope[1]:
+                cur.execute(PERIOD_TOTALS_QUERY.format(entities=", ".join(["%s"] * len(entities))),
+                            (self.scope[0], self.scope[1], *entities))
+                self.totals = cur.fetchone()
+
+    @property
+    def since(self):
+        """Time of the previous export; the epoch start when there is none."""
+        return self.previous[0] if self.previous else "1970-01-01"
+
+    def summary(self, new, changed):
+        """Compact change summary for *new* / *changed* rows of this export."""
+        count, vat = self.totals or (0, 0)
+        prev_count, prev_vat = (self.previous[1], self.previous[2]) if self.previous else (0, 0)
+        return {
+            "since": self.previous[0] if self.previous else None,
+            "until": self.started_at,
+            "new": new,
+            "changed": changed,
+            "gone": max(prev_count + new - count, 0) if self.previous else 0,
+            "rows_in_period": count,
+            "vat_in_period": float(vat),
+            "vat_delta": float(vat) - float(prev_vat),
+        }
+
+    def commit(self):
+        """Move the watermark to this export's start; False if that failed.
+
+        The files are already written at this point, so a failure is not an
+        error for the caller: the next changes export simply repeats these rows.
+        """
+        count, vat = self.totals or (0, 0)
+        try:
+            with db_cursor(commit=True) as cur:
+                cur.execute(SAVE_WATERMARK, (self.report, *self.scope, self.started_at, count, vat))
+        except Error:
+            return False
+        return True
+
+
+def start(report, quarter, year, colleague=None):
+    """Export(...) for a full export, or None if change tracking is not installed.
+
+    Full exports work as before without db/init/006_change_tracking.sql; they
+    just do not move a watermark.
+    """
+    try:
+        return Export(report, quarter, year, colleague)
+    except Error:
+        return None
+
+
+def split_new(rows):
+    """Strip the trailing Is_New column; returns (rows, new_count)."""
+    stripped, new = [], 0
+    for row in rows:
+        stripped.append(tuple(row[:-1]))
+        new += bool(row[-1])
+    return stripped, new
+
+
+def format_summary(summary):
+    """The summary as short text lines, for the dialog and the _changes.txt file."""
+    since = summary["since"]
+    lines = [
+        f"Changes since: {since:%Y-%m-%d %H:%M:%S}" if since else "Changes since: first export (whole period)",
+        f"Up to: {summary['until']:%Y-%m-%d %H:%M:%S}",
+        f"New rows: {summary['new']}",
+        f"Changed rows: {summary['changed']}",
+    ]
+    if since:
+        lines.append(f"Gone (deleted, non-refundable or moved): {summary['gone']}")
+    lines.append(f"Period now: {summary['rows_in_period']} rows, VAT € {summary['vat_in_period']:,.2f} "
+                 f"({summary['vat_delta']:+,.2f})")
+    return lines
+
+
+def write_summary(summary, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(format_summary(summary)) + "\n")
@@ -6,62 +6,23 @@ from mysql.connector import Error
 import csv
 from datetime import datetime
 import os
-from contextlib import contextmanager
-from db import get_cnx  # central DB connector
-
-# ==========================================================
-# Context manager for automatic cleanup
-# ==========================================================
-@contextmanager
-def db_cursor(commit=False):
-    cnx = get_cnx()
-    cur = cnx.cursor()
-    try:
-        yield cur
-        if commit:
-            cnx.commit()
-    except Exception as e:
-        cnx.rollback()
-        raise e
-    finally:
-        cur.close()
-        cnx.close()
-
-# ==========================================================
-# Autocomplete Combobox
-# ==========================================================
-
-class AutocompleteCombobox(ttk.Combobox):
-    def set_completion_list(self, completion_list):
-        self._completion_list = sorted(completion_list, key=str.lower)
-        self['values'] = self._completion_list
-        self.bind('<KeyRelease>', self._handle_keyrelease)
-    def _handle_keyrelease(self, event):
-        if event.keysym in ("BackSpace", "Left", "Right", "Up", "Down", "Return", "Escape"):
-            return
-        value = self.get().lower()
-        matches = [item for item in self._completion_list if item.lower().startswith(value)]
-        self['values'] = matches if matches else self._completion_list
-        if matches:
-            self.event_generate('<Down>')
+import invoices_repo  # duplicate errors
+import journal  # local write-ahead journal, synced to MySQL in the background
+import refdata  # cached lookup tables
+from autocomplete import AutocompleteCombobox  # shared indexed widget
 
 # ==========================================================
 # Database Fetch Functions
 # ==========================================================
 def fetch_supplier_data():
     try:
-        with db_cursor(commit=False) as cur:
-            cur.execute("SELECT Supplier_ID, Supplier_Name FROM NIF_Codes")
-            return cur.fetchall()
+        return refdata.suppliers()
     except Error:
         return []
 
 def fetch_budget_heads():
     try:
-        with db_cursor(commit=False) as cur:
-            cur.execute("SELECT Head_of_Accounts_ID, Head_of_Accounts_Name FROM Head_of_Accounts")
-            rows = cur.fetchall()
-            return {name: head_id for head_id, name in rows}
+        return refdata.budget_heads()
     except Error:
         return {}
 
@@ -87,7 +48,7 @@ def submit_transaction():
     supp_id = supplier_id_map.get(supplier)
     if not supp_id:
         status_label.config(text="Invalid supplier.", fg="red"); return
-    voucher_id = None
+    voucher_row = None
     voucher = entry_voucher_number.get().strip()
     if voucher:
         voucher = voucher.zfill(10)
@@ -107,35 +68,17 @@ def submit_transaction():
         head_id = budget_heads.get(bud_head)
         if not head_id:
             status_label.config(text="Invalid budget head.", fg="red"); return
+        voucher_row = (voucher, head_id, benef, vou_euro, vou_quarter, vou_year)
     try:
-        with db_cursor(commit=True) as cur:
-            cur.execute("SELECT * FROM Invoices_Residence WHERE Number = %s", (inv_num,))
-            if cur.fetchone():
-                status_label.config(text="Duplicate invoice.", fg="red"); return
-            if voucher:
-                cur.execute(
-                    """INSERT INTO Vouchers (Voucher_Number, Head_of_Accounts_ID, Voucher_Beneficiary,
-                    Voucher_Euro, Voucher_Quarter, Voucher_Year) VALUES (%s, %s, %s, %s, %s, %s)""",
-                    (voucher, head_id, benef, vou_euro, vou_quarter, vou_year)
-                )
-                voucher_id = cur.lastrowid
-                cur.execute(
-                    """INSERT INTO Invoices_Residence (Supplier_ID, Number, Date, Total, Vat, Refundable, Status, Voucher_ID)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-                    (supp_id, inv_num, inv_date, inv_amt, inv_vat, refundable, status, voucher_id)
-                )
-            else:
-                cur.execute(
-                    """INSERT INTO Invoices_Residence (Supplier_ID, Number, Date, Total, Vat, Refundable, Status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-                    (supp_id, inv_num, inv_date, inv_amt, inv_vat, refundable, status)
-                )
-            msg = f"Invoice ID: {cur.lastrowid}"
-            if voucher_id: msg += f", Voucher ID: {voucher_id}"
-            status_label.config(text=msg, fg="green")
-            clear_form()
-    except Error as e:
-        status_label.config(text=f"DB Error: {e}", fg="red")
+        # journaled at once; the syncer writes both rows in one transaction
+        entry_id = journal.submit_invoice(
+            "Invoices_Residence", (supp_id, inv_num, inv_date, inv_amt, inv_vat, refundable, status), voucher_row)
+    except invoices_repo.DuplicateError as e:
+        status_label.config(text=str(e), fg="red"); return
+    except Exception as e:
+        status_label.config(text=f"Journal Error: {e}", fg="red"); return
+    status_label.config(text=f"Submitted (entry {entry_id}), saving in the background.", fg="green")
+    clear_form()
 
 def clear_form():
     supplier_var.set('')
@@ -167,96 +110,118 @@ def calculate_vat(*args):
         invoice_vat_var.set('')
         invoice_vat_entry.config(state='normal')
 
-# ==========================================================
-# GUI Setup
-# ==========================================================
-
-root = tk.Tk()
-root.title("Residence Invoice Entry Form")
-root.geometry("1100x700")
-lbl_font = ("Helvetica", 14)
-btn_font = ("Helvetica", 14)
-w = 50
-
-tk.Label(root, text="Supplier:", font=lbl_font).grid(row=0, column=0, padx=20, pady=15, sticky="e")
-supplier_var = tk.StringVar()
-supplier_dropdown = AutocompleteCombobox(root, textvariable=supplier_var, font=lbl_font, width=w-10)
-supplier_dropdown.grid(row=0, column=1, padx=20, pady=15)
-
-tk.Label(root, text="Invoice Number:", font=lbl_font).grid(row=1, column=0, padx=20, pady=15, sticky="e")
-invoice_number_entry = tk.Entry(root, font=lbl_font, width=w)
-invoice_number_entry.grid(row=1, column=1, padx=20, pady=15)
-
-tk.Label(root, text="Invoice Date (YYYY-MM-DD):", font=lbl_font).grid(row=2, column=0, padx=20, pady=15, sticky="e")
-invoice_date_entry = tk.Entry(root, font=lbl_font, width=w)
-invoice_date_entry.grid(row=2, column=1, padx=20, pady=15)
-
-tk.Label(root, text="Invoice Amount:", font=lbl_font).grid(row=3, column=0, padx=20, pady=15, sticky="e")
-invoice_amount_var = tk.StringVar()
-invoice_amount_entry = tk.Entry(root, textvariable=invoice_amount_var, font=lbl_font, width=w)
-invoice_amount_entry.grid(row=3, column=1, padx=20, pady=15)
-calculate_vat_var = tk.IntVar()
-tk.Checkbutton(root, text="Calculate VAT at 21%", variable=calculate_vat_var, font=lbl_font, command=calculate_vat)\
-    .grid(row=3, column=2, padx=20, pady=15, sticky="w")
-invoice_amount_var.trace_add('write', calculate_vat)
-
-tk.Label(root, text="Invoice VAT:", font=lbl_font).grid(row=4, column=0, padx=20, pady=15, sticky="e")
-invoice_vat_var = tk.StringVar()
-invoice_vat_entry = tk.Entry(root, textvariable=invoice_vat_var, font=lbl_font, width=w)
-invoice_vat_entry.grid(row=4, column=1, padx=20, pady=15)
-
-tk.Label(root, text="VAT Refundable:", font=lbl_font).grid(row=5, column=0, padx=20, pady=15, sticky="e")
-vat_refundable_var = tk.IntVar()
-tk.Checkbutton(root, variable=vat_refundable_var, font=lbl_font)\
-    .grid(row=5, column=1, padx=20, pady=15, sticky="w")
-
-tk.Label(root, text="Status:", font=lbl_font).grid(row=6, column=0, padx=20, pady=15, sticky="e")
-status_var = tk.StringVar()
-status_dropdown = ttk.Combobox(root, textvariable=status_var, font=lbl_font, width=w-10)
-status_dropdown['values'] = ["Pending", "Processed", "Archived"]
-status_dropdown.grid(row=6, column=1, padx=20, pady=15)
-status_dropdown.config(state='readonly')
-
-# Voucher Section
-sep = ttk.Separator(root, orient='horizontal')
-sep.grid(row=7, column=0, columnspan=3, sticky="ew", padx=20, pady=20)
-tk.Label(root, text="Voucher Entry (Optional):", font=("Helvetica", 16, "bold"))\
-    .grid(row=8, column=0, columnspan=3, padx=20, pady=10)
-tk.Label(root, text="Voucher Number:", font=lbl_font).grid(row=9, column=0, padx=20, pady=10, sticky="e")
-entry_voucher_number = tk.Entry(root, font=lbl_font, width=w)
-entry_voucher_number.grid(row=9, column=1, padx=20, pady=10, sticky="w")
-tk.Label(root, text="Voucher Beneficiary:", font=lbl_font).grid(row=10, column=0, padx=20, pady=10, sticky="e")
-entry_voucher_beneficiary = tk.Entry(root, font=lbl_font, width=w)
-entry_voucher_beneficiary.grid(row=10, column=1, padx=20, pady=10, sticky="w")
-tk.Label(root, text="Voucher Euro (€):", font=lbl_font).grid(row=11, column=0, padx=20, pady=10, sticky="e")
-entry_voucher_euro = tk.Entry(root, font=lbl_font, width=w)
-entry_voucher_euro.grid(row=11, column=1, padx=20, pady=10, sticky="w")
-tk.Label(root, text="Voucher Quarter:", font=lbl_font).grid(row=12, column=0, padx=20, pady=10, sticky="e")
-entry_voucher_quarter = tk.Entry(root, font=lbl_font, width=w)
-entry_voucher_quarter.grid(row=12, column=1, padx=20, pady=10, sticky="w")
-tk.Label(root, text="Voucher Year:", font=lbl_font).grid(row=13, column=0, padx=20, pady=10, sticky="e")
-entry_voucher_year = tk.Entry(root, font=lbl_font, width=w)
-entry_voucher_year.grid(row=13, column=1, padx=20, pady=10, sticky="w")
-tk.Label(root, text="Budget Head:", font=lbl_font).grid(row=14, column=0, padx=20, pady=10, sticky="e")
-budget_head_var = tk.StringVar()
-budget_heads = fetch_budget_heads()
-if budget_heads:
-    budget_head_var.set(list(budget_heads.keys())[0])
-option_menu = tk.OptionMenu(root, budget_head_var, *budget_heads.keys())
-option_menu.config(font=lbl_font)
-option_menu.grid(row=14, column=1, padx=20, pady=10, sticky="w")
-suppliers = fetch_supplier_data()                 # [(id, name), ...]
-supplier_id_map = {name: sid for sid, name in suppliers}
-supplier_dropdown.set_completion_list([name for _, name in suppliers])
-# Guard: budget heads menu can be empty
-if not budget_heads:
-    budget_head_var.set("— no heads —")
-    option_menu.config(state="disabled")
-
-submit_button = tk.Button(root, text="Submit", command=submit_transaction, font=btn_font, width=20)
-submit_button.grid(row=15, column=1, padx=20, pady=20, sticky="w")
-# Status label (missing)
-status_label = tk.Label(root, text="", font=("Helvetica", 12))
-status_label.grid(row=16, column=0, columnspan=3, padx=20, pady=10, sticky="w")
-
-root.mainloop()
+def main(master=None):
+    """Build the form; as a Toplevel of *master* when opened from the launcher."""
+    global supplier_id_map, budget_heads, supplier_var, invoice_number_entry, \
+        invoice_date_entry, invoice_amount_var, invoice_vat_var, invoice_vat_entry, \
+        calculate_vat_var, vat_refundable_var, status_var, entry_voucher_number, \
+        entry_voucher_beneficiary, entry_voucher_euro, entry_voucher_quarter, \
+        entry_voucher_year, budget_head_var, status_label
+
+    # ==========================================================
+    # GUI Setup
+    # ==========================================================
+
+    root = tk.Toplevel(master) if master is not None else tk.Tk()
+    root.title("Residence Invoice Entry Form")
+    root.geometry("1100x700")
+    lbl_font = ("Helvetica", 14)
+    btn_font = ("Helvetica", 14)
+    w = 50
+
+    tk.Label(root, text="Supplier:", font=lbl_font).grid(row=0, column=0, padx=20, pady=15, sticky="e")
+    supplier_var = tk.StringVar()
+    supplier_dropdown = AutocompleteCombobox(root, textvariable=supplier_var, font=lbl_font, width=w-10)
+    supplier_dropdown.grid(row=0, column=1, padx=20, pady=15)
+
+    tk.Label(root, text="Invoice Number:", font=lbl_font).grid(row=1, column=0, padx=20, pady=15, sticky="e")
+    invoice_number_entry = tk.Entry(root, font=lbl_font, width=w)
+    invoice_number_entry.grid(row=1, column=1, padx=20, pady=15)
+
+    tk.Label(root, text="Invoice Date (YYYY-MM-DD):", font=lbl_font).grid(row=2, column=0, padx=20, pady=15, sticky="e")
+    invoice_date_entry = tk.Entry(root, font=lbl_font, width=w)
+    invoice_date_entry.grid(row=2, column=1, padx=20, pady=15)
+
+    tk.Label(root, text="Invoice Amount:", font=lbl_font).grid(row=3, column=0, padx=20, pady=15, sticky="e")
+    invoice_amount_var = tk.StringVar()
+    invoice_amount_entry = tk.Entry(root, textvariable=invoice_amount_var, font=lbl_font, width=w)
+    invoice_amount_entry.grid(row=3, column=1, padx=20, pady=15)
+    calculate_vat_var = tk.IntVar()
+    tk.Checkbutton(root, text="Calculate VAT at 21%", variable=calculate_vat_var, font=lbl_font, command=calculate_vat)\
+        .grid(row=3, column=2, padx=20, pady=15, sticky="w")
+    invoice_amount_var.trace_add('write', calculate_vat)
+
+    tk.Label(root, text="Invoice VAT:", font=lbl_font).grid(row=4, column=0, padx=20, pady=15, sticky="e")
+    invoice_vat_var = tk.StringVar()
+    invoice_vat_entry = tk.Entry(root, textvariable=invoice_vat_var, font=lbl_font, width=w)
+    invoice_vat_entry.grid(row=4, column=1, padx=20, pady=15)
+
+    tk.Label(root, text="VAT Refundable:", font=lbl_font).grid(row=5, column=0, padx=20, pady=15, sticky="e")
+    vat_refundable_var = tk.IntVar()
+    tk.Checkbutton(root, variable=vat_refundable_var, font=lbl_font)\
+        .grid(row=5, column=1, padx=20, pady=15, sticky="w")
+
+    tk.Label(root, text="Status:", font=lbl_font).grid(row=6, column=0, padx=20, pady=15, sticky="e")
+    status_var = tk.StringVar()
+    status_dropdown = ttk.Combobox(root, textvariable=status_var, font=lbl_font, width=w-10)
+    status_dropdown['values'] = ["Pending", "Processed", "Archived"]
+    status_dropdown.grid(row=6, column=1, padx=20, pady=15)
+    status_dropdown.config(state='readonly')
+
+    # Voucher Section
+    sep = ttk.Separator(root, orient='horizontal')
+    sep.grid(row=7, column=0, columnspan=3, sticky="ew", padx=20, pady=20)
+    tk.Label(root, text="Voucher Entry (Optional):", font=("Helvetica", 16, "bold"))\
+        .grid(row=8, column=0, columnspan=3, padx=20, pady=10)
+    tk.Label(root, text="Voucher Number:", font=lbl_font).grid(row=9, column=0, padx=20, pady=10, sticky="e")
+    entry_voucher_number = tk.Entry(root, font=lbl_font, width=w)
+    entry_voucher_number.grid(row=9, column=1, padx=20, pady=10, sticky="w")
+    tk.Label(root, text="Voucher Beneficiary:", font=lbl_font).grid(row=10, column=0, padx=20, pady=10, sticky="e")
+    entry_voucher_beneficiary = tk.Entry(root, font=lbl_font, width=w)
+    entry_voucher_beneficiary.grid(row=10, column=1, padx=20, pady=10, sticky="w")
+    tk.Label(root, text="Voucher Euro (€):", font=lbl_font).grid(row=11, column=0, padx=20, pady=10, sticky="e")
+    entry_voucher_euro = tk.Entry(root, font=lbl_font, width=w)
+    entry_voucher_euro.grid(row=11, column=1, padx=20, pady=10, sticky="w")
+    tk.Label(root, text="Voucher Quarter:", font=lbl_font).grid(row=12, column=0, padx=20, pady=10, sticky="e")
+    entry_voucher_quarter = tk.Entry(root, font=lbl_font, width=w)
+    entry_voucher_quarter.grid(row=12, column=1, padx=20, pady=10, sticky="w")
+    tk.Label(root, text="Voucher Year:", font=lbl_font).grid(row=13, column=0, padx=20, pady=10, sticky="e")
+    entry_voucher_year = tk.Entry(root, font=lbl_font, width=w)
+    entry_voucher_year.grid(row=13, column=1, padx=20, pady=10, sticky="w")
+    tk.Label(root, text="Budget Head:", font=lbl_font).grid(row=14, column=0, padx=20, pady=10, sticky="e")
+    budget_head_var = tk.StringVar()
+    budget_heads = fetch_budget_heads()
+    if budget_heads:
+        budget_head_var.set(list(budget_heads.keys())[0])
+    option_menu = tk.OptionMenu(root, budget_head_var, *budget_heads.keys())
+    option_menu.config(font=lbl_font)
+    option_menu.grid(row=14, column=1, padx=20, pady=10, sticky="w")
+    suppliers = fetch_supplier_data()                 # [(id, name, nif), ...]
+    supplier_id_map = {name: sid for sid, name, _ in suppliers}
+    supplier_dropdown.set_completion_list([name for _, name, _ in suppliers],
+                                          aliases=[nif for _, _, nif in suppliers])
+
+    def on_suppliers_changed(rows):
+        supplier_id_map.clear()
+        supplier_id_map.update({name: sid for sid, name, _ in rows})
+        supplier_dropdown.set_completion_list([name for _, name, _ in rows],
+                                              aliases=[nif for _, _, nif in rows])
+    refdata.subscribe("NIF_Codes", on_suppliers_changed, widget=root)
+    # Guard: budget heads menu can be empty
+    if not budget_heads:
+        budget_head_var.set("— no heads —")
+        option_menu.config(state="disabled")
+
+    submit_button = tk.Button(root, text="Submit", command=submit_transaction, font=btn_font, width=20)
+    submit_button.grid(row=15, column=1, padx=20, pady=20, sticky="w")
+    # Status label (missing)
+    status_label = tk.Label(root, text="", font=("Helvetica", 12))
+    status_label.grid(row=16, column=0, columnspan=3, padx=20, pady=10, sticky="w")
+
+    if master is None:
+        root.mainloop()
+    return root
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Invoice repository shared by the Chancery, Residence and Personal forms and
+the bulk tools.
+
+- No duplicate check before the INSERT: the unique keys (Invoice_Chancery_No,
+  Invoice_Residence_No, Invoice_Personal_No, Voucher_Number) reject a
+  duplicate atomically, also when two clerks submit the same number at the
+  same moment. The duplicate-key error (1062) is raised as DuplicateInvoice
+  / DuplicateVoucher, whose str() is the message for the user.
+- add_invoice() writes the optional voucher and its invoice in one
+  transaction: two prepared INSERTs (queries.py) and the commit.
+- insert_invoices() / insert_vouchers() write many rows on a caller's cursor
+  and transaction; executemany sends them as multi-row INSERTs.
+
+Row layouts (tuples, in column order):
+  Chancery / Residence: INVOICE_COLUMNS
+  Personal:             PERSONAL_COLUMNS
+  Voucher:              VOUCHER_COLUMNS
+"""
+
+import re
+from mysql.connector import Error, errorcode
+import queries  # prepared statements
+
+TABLES = {
+    "chancery": "Invoices_Chancery",
+    "residence": "Invoices_Residence",
+    "personal": "Invoices_Personal",
+}
+
+INVOICE_COLUMNS = ("Supplier_ID", "Number", "Date", "Total", "Vat", "Refundable", "Status")
+PERSONAL_COLUMNS = ("Store", "Colleague_ID", "Recipient_ID", "Number", "Date", "Amount", "VAT",
+                    "Status", "Date_Refunded")
+VOUCHER_COLUMNS = ("Voucher_Number", "Head_of_Accounts_ID", "Voucher_Beneficiary",
+                   "Voucher_Euro", "Voucher_Quarter", "Voucher_Year")
+
+
+def _insert_sql(table, columns):
+    return (f"INSERT INTO {table} ({', '.join(columns)})\n"
+            f"VALUES ({', '.join(['%s'] * len(columns))})")
+
+
+INSERT_VOUCHER = _insert_sql("Vouchers", VOUCHER_COLUMNS)
+INSERT_SQL = {
+    # single rows: Voucher_ID may be None
+    "Invoices_Chancery": _insert_sql("Invoices_Chancery", INVOICE_COLUMNS + ("Voucher_ID",)),
+    "Invoices_Residence": _insert_sql("Invoices_Residence", INVOICE_COLUMNS + ("Voucher_ID",)),
+    "Invoices_Personal": _insert_sql("Invoices_Personal", PERSONAL_COLUMNS),
+}
+BATCH_INSERT_SQL = {
+    # executemany rewrites these into multi-row INSERTs; no vouchers in a batch
+    "Invoices_Chancery": _insert_sql("Invoices_Chancery", INVOICE_COLUMNS),
+    "Invoices_Residence": _insert_sql("Invoices_Residence", INVOICE_COLUMNS),
+    "Invoices_Personal": _insert_sql("Invoices_Personal", PERSONAL_COLUMNS),
+}
+
+
+# ==========================================================
+# Duplicate keys
+# ==========================================================
+class DuplicateError(Exception):
+    """A unique key rejected the row; str() is the message for the user."""
+
+    def __init__(self, message, key=None, value=None):
+        super().__init__(message)
+        self.key = key
+        self.value = value
+
+
+class DuplicateInvoice(DuplicateError):
+    pass
+
+
+class DuplicateVoucher(DuplicateError):
+    pass
+
+
+UNIQUE_KEYS = {
+    "Invoice_Chancery_No": (DuplicateInvoice, "A Chancery invoice with number {value} already exists."),
+    "Invoice_Residence_No": (DuplicateInvoice, "A Residence invoice with number {value} already exists."),
+    "Invoice_Personal_No": (DuplicateInvoice, "A personal invoice with number {value} already exists."),
+    "Voucher_Number": (DuplicateVoucher, "A voucher with number {value} already exists."),
+}
+
+# "Duplicate entry 'X' for key 'Table.Key'" (MySQL 8: key prefixed with the table)
+DUPLICATE_ENTRY = re.compile(r"Duplicate entry '(?P<value>.*)' for key '(?:\w+\.)?(?P<key>\w+)'")
+
+
+def duplicate_error(e):
+    """The DuplicateError for mysql Error *e*, or None if *e* is not a duplicate key."""
+    if getattr(e, "errno", None) != errorcode.ER_DUP_ENTRY:
+        return None
+    m = DUPLICATE_ENTRY.search(e.msg or "")
+    key, value = (m.group("key"), m.group("value")) if m else (None, None)
+    cls, message = UNIQUE_KEYS.get(key, (DuplicateError, "A record with value {value} already exists."))
+    return cls(message.format(value=value if value is not None else "?"), key, value)
+
+
+def _raise_mapped(e):
+    duplicate = duplicate_error(e)
+    if duplicate is not None:
+        raise duplicate from e
+    raise e
+
+
+# ==========================================================
+# Single invoice (entry forms)
+# ==========================================================
+def insert_invoice(s, table, invoice, voucher=None):
+    """Voucher (if any), then the invoice pointing at it, on queries.Session *s*.
+
+    Returns (invoice_id, voucher_id). Raises DuplicateInvoice /
+    DuplicateVoucher or mysql Error; the caller's transaction decides what
+    is kept.
+    """
+    if voucher is not None and table == "Invoices_Personal":
+        raise ValueError("personal invoices have no voucher")
+    try:
+        voucher_id = s.insert(INSERT_VOUCHER, tuple(voucher)) if voucher is not None else None
+        if table == "Invoices_Personal":
+            return s.insert(INSERT_SQL[table], tuple(invoice)), None
+        return s.insert(INSERT_SQL[table], tuple(invoice) + (voucher_id,)), voucher_id
+    except Error as e:
+        _raise_mapped(e)
+
+
+def add_invoice(table, invoice, voucher=None):
+    """insert_invoice() in its own transaction: both rows or neither."""
+    with queries.session(commit=True) as s:
+        return insert_invoice(s, table, invoice, voucher)
+
+
+def add_voucher(voucher):
+    """Insert one voucher; returns its id. Raises DuplicateVoucher or mysql Error."""
+    with queries.session(commit=True) as s:
+        try:
+            return s.insert(INSERT_VOUCHER, tuple(voucher))
+        except Error as e:
+            _raise_mapped(e)
+
+
+# ==========================================================
+# Batches (bulk tools)
+# ==========================================================
+def insert_invoices(cur, table, rows):
+    """Insert *rows* (without vouchers) on *cur*, in the caller's transaction.
+
+    A duplicate anywhere fails the whole statement with DuplicateInvoice
+    (naming the first duplicate number); the rows before it in the same
+    statement are not written either.
+    """
+    rows = [tuple(r) for r in rows]
+    if not rows:
+        return 0
+    try:
+        cur.executemany(BATCH_INSERT_SQL[table], rows)
+    except Error as e:
+        _raise_mapped(e)
+    return len(rows)
+
+
+def insert_vouchers(cur, vouchers):
+    """Insert *vouchers* on *cur*, in the caller's transaction; raises DuplicateVoucher."""
+    vouchers = [tuple(v) for v in vouchers]
+    if not vouchers:
+        return 0
+    try:
+        cur.executemany(INSERT_VOUCHER, vouchers)
+    except Error as e:
+        _raise_mapped(e)
+    return len(vouchers)
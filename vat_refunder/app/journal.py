@@ -0,0 +1,410 @@
+"""
+Local write-ahead journal for the entry forms.
+
+A submit is appended to a SQLite file (WAL mode) in the app data directory
+and acknowledged at once, whatever state MySQL is in: still starting in
+Docker, stalled, or just slow. A background Syncer drains the journal into
+MySQL in batches, one transaction per batch, through invoices_repo.
+
+- Every entry gets a SAVEPOINT inside the batch, so one bad entry does not
+  hold back the others.
+- A duplicate number is checked against the row already in MySQL. If it is
+  the same invoice (an earlier sync committed but the journal was not marked
+  before the app closed), the entry counts as synced. Otherwise it goes to
+  the review list ("conflict"), as do rows MySQL rejects for other reasons
+  ("failed"). journal_review.py shows that list.
+- Connection problems (server down, timeouts, deadlocks) leave the whole
+  batch pending; the syncer retries with a growing delay.
+- The same number submitted twice while still pending is refused locally.
+
+Env:
+  VAT_JOURNAL_PATH   journal file (default: $XDG_DATA_HOME/vat_refunder/journal.sqlite3)
+  VAT_JOURNAL_SYNC   SQLite synchronous mode (default NORMAL: an acknowledged
+                     entry survives an app crash; FULL also survives power loss,
+                     at the cost of an fsync per submit)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from mysql.connector import Error, errors
+import invoices_repo  # voucher + invoice in one transaction, duplicate keys mapped
+import queries  # prepared statements
+
+# ==========================================================
+# Config
+# ==========================================================
+DATA_DIR = os.path.join(os.path.expanduser(os.getenv("XDG_DATA_HOME", "~/.local/share")), "vat_refunder")
+JOURNAL_PATH = os.path.expanduser(os.getenv("VAT_JOURNAL_PATH", os.path.join(DATA_DIR, "journal.sqlite3")))
+SYNCHRONOUS = os.getenv("VAT_JOURNAL_SYNC", "NORMAL").upper()
+SYNC_BATCH = 200          # entries per MySQL transaction
+SYNC_IDLE_SECONDS = 5     # poll interval when nothing is pending (submits wake the syncer)
+SYNC_MAX_BACKOFF = 60     # seconds between attempts while MySQL is unreachable
+KEEP_SYNCED_DAYS = 30
+
+VOUCHERS = "Vouchers"
+# rows an entry writes: key column and the columns compared when that key already exists
+KEY_COLUMN = {
+    "Invoices_Chancery": "Number",
+    "Invoices_Residence": "Number",
+    "Invoices_Personal": "Number",
+    VOUCHERS: "Voucher_Number",
+}
+SAME_ROW_COLUMNS = {
+    "Invoices_Chancery": ("Supplier_ID", "Date", "Total", "Vat"),
+    "Invoices_Residence": ("Supplier_ID", "Date", "Total", "Vat"),
+    "Invoices_Personal": ("Store", "Colleague_ID", "Date", "Amount", "VAT"),
+    VOUCHERS: ("Head_of_Accounts_ID", "Voucher_Euro", "Voucher_Quarter", "Voucher_Year"),
+}
+COLUMNS = {
+    "Invoices_Chancery": invoices_repo.INVOICE_COLUMNS,
+    "Invoices_Residence": invoices_repo.INVOICE_COLUMNS,
+    "Invoices_Personal": invoices_repo.PERSONAL_COLUMNS,
+    VOUCHERS: invoices_repo.VOUCHER_COLUMNS,
+}
+
+# server busy rather than the row being wrong: lock wait timeout, deadlock
+TRANSIENT_ERRNOS = {1205, 1213}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+  id          INTEGER PRIMARY KEY AUTOINCREMENT,
+  created_at  TEXT NOT NULL,
+  target      TEXT NOT NULL,              -- invoice table, or Vouchers for a voucher on its own
+  number      TEXT NOT NULL,              -- invoice / voucher number, for the review list
+  payload     TEXT NOT NULL,              -- JSON {"row": [...], "voucher": [...] | null}
+  state       TEXT NOT NULL DEFAULT 'pending',  -- pending | synced | conflict | failed | dismissed
+  attempts    INTEGER NOT NULL DEFAULT 0,
+  error       TEXT,
+  synced_at   TEXT,
+  invoice_id  INTEGER,
+  voucher_id  INTEGER
+);
+CREATE INDEX IF NOT EXISTS entries_state ON entries (state, id);
+CREATE UNIQUE INDEX IF NOT EXISTS entries_pending_number ON entries (target, number) WHERE state = 'pending';
+"""
+
+REVIEW_STATES = ("conflict", "failed")
+
+
+def _now():
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+# ==========================================================
+# Journal file
+# ==========================================================
+class Journal:
+    """The SQLite journal; safe to share between the Tk thread and the syncer."""
+
+    def __init__(self, path=JOURNAL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # autocommit mode: every statement is its own (sub-millisecond) transaction
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ---- submits ------------------------------------------------------
+    def append_invoice(self, table, row, voucher=None):
+        """Journal an invoice (and its optional voucher); returns the entry id.
+
+        Raises invoices_repo.DuplicateInvoice if the same number is still pending.
+        """
+        number = row[COLUMNS[table].index("Number")]
+        return self._append(table, number, row, voucher)
+
+    def append_voucher(self, voucher):
+        """Journal a voucher on its own; raises DuplicateVoucher if that number is pending."""
+        return self._append(VOUCHERS, voucher[0], voucher, None)
+
+    def _append(self, target, number, row, voucher):
+        payload = json.dumps({
+            "row": [_json_value(v) for v in row],
+            "voucher": [_json_value(v) for v in voucher] if voucher is not None else None,
+        })
+        try:
+            with self._lock:
+                cur = self._db.execute(
+                    "INSERT INTO entries (created_at, target, number, payload) VALUES (?, ?, ?, ?)",
+                    (_now(), target, str(number), payload))
+                return cur.lastrowid
+        except sqlite3.IntegrityError:
+            cls = invoices_repo.DuplicateVoucher if target == VOUCHERS else invoices_repo.DuplicateInvoice
+            raise cls(f"Number {number} was already submitted and is waiting to be saved.",
+                      KEY_COLUMN[target], str(number)) from None
+
+    # ---- syncer side ----------------------------------------------------
+    def pending(self, limit=SYNC_BATCH):
+        """[(id, target, row, voucher)] oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, target, payload FROM entries WHERE state = 'pending' ORDER BY id LIMIT ?",
+                (limit,)).fetchall()
+        entries = []
+        for entry_id, target, payload in rows:
+            data = json.loads(payload)
+            entries.append((entry_id, target, data["row"], data["voucher"]))
+        return entries
+
+    def record(self, outcomes):
+        """Store a batch's outcomes: [(id, state, error, invoice_id, voucher_id)]."""
+        now = _now()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "UPDATE entries SET state = ?, error = ?, invoice_id = ?, voucher_id = ?,"
+                    " attempts = attempts + 1, synced_at = CASE WHEN ? = 'synced' THEN ? END WHERE id = ?",
+                    [(state, error, invoice_id, voucher_id, state, now, entry_id)
+                     for entry_id, state, error, invoice_id, voucher_id in outcomes])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def note_attempt(self, entry_ids, error):
+        """A batch could not reach MySQL: count the attempt, keep the entries pending."""
+        with self._lock:
+            self._db.executemany("UPDATE entries SET attempts = attempts + 1, error = ? WHERE id = ?",
+                                 [(error, entry_id) for entry_id in entry_ids])
+
+    def purge_synced(self, days=KEEP_SYNCED_DAYS):
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE state IN ('synced', 'dismissed')"
+                             " AND created_at < datetime('now', 'localtime', ?)", (f"-{int(days)} days",))
+
+    # ---- review list ----------------------------------------------------
+    def counts(self):
+        """{state: number of entries}."""
+        with self._lock:
+            return dict(self._db.execute("SELECT state, COUNT(*) FROM entries GROUP BY state").fetchall())
+
+    def review(self):
+        """[(id, created_at, target, number, state, error)] of entries that need a person."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, created_at, target, number, state, error FROM entries"
+                " WHERE state IN ('conflict', 'failed') ORDER BY id").fetchall()
+
+    def retry(self, entry_id):
+        """Send a reviewed entry again (e.g. after fixing the clashing row in MySQL).
+
+        Raises DuplicateError if the same number has been submitted again meanwhile.
+        """
+        try:
+            with self._lock:
+                self._db.execute("UPDATE entries SET state = 'pending', error = NULL"
+                                 " WHERE id = ? AND state IN ('conflict', 'failed')", (entry_id,))
+        except sqlite3.IntegrityError:
+            raise invoices_repo.DuplicateError("That number is already waiting to be saved.") from None
+
+    def dismiss(self, entry_id):
+        with self._lock:
+            self._db.execute("UPDATE entries SET state = 'dismissed'"
+                             " WHERE id = ? AND state IN ('conflict', 'failed')", (entry_id,))
+
+
+# ==========================================================
+# Sync to MySQL
+# ==========================================================
+def _is_transient(e):
+    return (isinstance(e, (errors.InterfaceError, errors.OperationalError, errors.PoolError))
+            or getattr(e, "errno", None) in TRANSIENT_ERRNOS)
+
+
+def _comparable(value):
+    # MySQL gives Decimal / date where the journal has float / "YYYY-MM-DD"
+    value = _json_value(value)
+    if value is None:
+        return None
+    try:
+        return round(float(value), 2)
+    except (TypeError, ValueError):
+        return str(value).strip()
+
+
+def _same_value(a, b):
+    return _comparable(a) == _comparable(b)
+
+
+def _already_synced(s, target, row):
+    """True if MySQL already has this entry's row (same key, same values)."""
+    columns = COLUMNS[target]
+    key = KEY_COLUMN[target]
+    compared = SAME_ROW_COLUMNS[target]
+    found = s.fetchall(f"SELECT {', '.join(compared)} FROM {target} WHERE {key} = %s",
+                       (row[columns.index(key)],))
+    if not found:
+        return False
+    return all(_same_value(value, row[columns.index(column)]) for column, value in zip(compared, found[0]))
+
+
+def _apply(s, target, row, voucher):
+    """Write one entry; returns (invoice_id, voucher_id)."""
+    if target == VOUCHERS:
+        return None, s.insert(invoices_repo.INSERT_VOUCHER, tuple(row))
+    return invoices_repo.insert_invoice(s, target, row, voucher)
+
+
+def _sync_entry(s, entry_id, target, row, voucher):
+    """Write one entry inside its savepoint; returns its outcome for Journal.record()."""
+    try:
+        invoice_id, voucher_id = _apply(s, target, row, voucher)
+    except invoices_repo.DuplicateError as e:
+        s.cursor.execute("ROLLBACK TO SAVEPOINT journal_entry")
+        if _already_synced(s, target, row):
+            return entry_id, "synced", "already in the database", None, None
+        return entry_id, "conflict", str(e), None, None
+    return entry_id, "synced", None, invoice_id, voucher_id
+
+
+def sync_batch(journal, limit=SYNC_BATCH):
+    """Send up to *limit* pending entries in one MySQL transaction; returns how many were handled.
+
+    Raises mysql Error (entries left pending) when MySQL cannot be reached.
+    Any other error, and any non-transient mysql Error, fails only its own
+    entry, which goes to review.
+    """
+    entries = journal.pending(limit)
+    if not entries:
+        return 0
+    outcomes = []
+    try:
+        with queries.session(commit=True) as s:
+            for entry_id, target, row, voucher in entries:
+                s.cursor.execute("SAVEPOINT journal_entry")
+                try:
+                    outcomes.append(_sync_entry(s, entry_id, target, row, voucher))
+                except Error as e:
+                    if _is_transient(e):
+                        raise
+                    s.cursor.execute("ROLLBACK TO SAVEPOINT journal_entry")
+                    outcomes.append((entry_id, "failed", str(e), None, None))
+                except Exception as e:  # a malformed entry must not hold up the ones after it
+                    s.cursor.execute("ROLLBACK TO SAVEPOINT journal_entry")
+                    outcomes.append((entry_id, "failed", f"{type(e).__name__}: {e}", None, None))
+    except Error as e:
+        journal.note_attempt([entry[0] for entry in entries], str(e))
+        raise
+    journal.record(outcomes)
+    return len(entries)
+
+
+class Syncer(threading.Thread):
+    """Drains the journal into MySQL on a daemon thread; wake() after a submit."""
+
+    def __init__(self, journal, batch=SYNC_BATCH, idle_seconds=SYNC_IDLE_SECONDS, max_backoff=SYNC_MAX_BACKOFF):
+        super().__init__(name="journal-syncer", daemon=True)
+        self.journal = journal
+        self.batch = batch
+        self.idle_seconds = idle_seconds
+        self.max_backoff = max_backoff
+        self.last_error = None  # message of the last failed attempt, None once MySQL answers again
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        backoff = 1
+        self.journal.purge_synced()
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                handled = sync_batch(self.journal, self.batch)
+            except Exception as e:  # MySQL down or slow: keep everything pending
+                self.last_error = str(e)
+                self._wake.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            self.last_error = None
+            backoff = 1
+            if handled < self.batch:
+                self._wake.wait(self.idle_seconds)
+
+
+# ==========================================================
+# Process-wide journal
+# ==========================================================
+_default_lock = threading.Lock()
+_default = None  # (Journal, Syncer)
+
+
+def default():
+    """(journal, syncer) for this process; the syncer starts on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            j = Journal()
+            syncer = Syncer(j)
+            syncer.start()
+            _default = (j, syncer)
+        return _default
+
+
+def submit_invoice(table, row, voucher=None):
+    """Journal an invoice for the syncer; returns the entry id (see Journal.append_invoice)."""
+    j, syncer = default()
+    entry_id = j.append_invoice(table, row, voucher)
+    syncer.wake()
+    return entry_id
+
+
+def submit_voucher(voucher):
+    j, syncer = default()
+    entry_id = j.append_voucher(voucher)
+    syncer.wake()
+    return entry_id
+
+
+def status_text():
+    """One line for the launcher: what is waiting, what needs review."""
+    j, syncer = default()
+    counts = j.counts()
+    pending = counts.get("pending", 0)
+    review = sum(counts.get(state, 0) for state in REVIEW_STATES)
+    parts = []
+    if pending:
+        waiting = f"{pending} entr{'y' if pending == 1 else 'ies'} waiting for the database"
+        parts.append(waiting + (" (unreachable)" if syncer.last_error else ""))
+    if review:
+        parts.append(f"{review} to review")
+    return "; ".join(parts) if parts else "All entries saved."
+
+
+if __name__ == "__main__":
+    # drain once from the command line: python journal.py
+    start = time.perf_counter()
+    j = Journal()
+    total = 0
+    while True:
+        n = sync_batch(j)
+        total += n
+        if n < SYNC_BATCH:
+            break
+    print(f"{total} entries synced in {time.perf_counter() - start:.2f}s; {j.counts()}")
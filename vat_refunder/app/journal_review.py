@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import tkinter as tk
+from tkinter import messagebox
+import invoices_repo  # duplicate errors
+import journal  # local write-ahead journal, synced to MySQL in the background
+
+REFRESH_MS = 2000
+
+# ==========================================================
+# Review list
+# ==========================================================
+def load():
+    """Reload the entries MySQL rejected and the journal status."""
+    global review_rows
+    j, _ = journal.default()
+    rows = j.review()
+    if rows != review_rows:
+        review_rows = rows
+        listbox.delete(0, tk.END)
+        for entry_id, created_at, target, number, state, error in rows:
+            listbox.insert(tk.END, f"#{entry_id}  {created_at}  {target}  {number}  [{state}]  {error or ''}")
+    status_label.config(text=journal.status_text())
+
+
+def refresh():
+    # reschedules itself while the window is open
+    if listbox.winfo_exists():
+        load()
+        listbox.after(REFRESH_MS, refresh)
+
+
+def selected_entry():
+    sel = listbox.curselection()
+    if not sel:
+        messagebox.showwarning("Review", "Select an entry first.")
+        return None
+    return review_rows[sel[0]][0]
+
+
+def retry():
+    entry_id = selected_entry()
+    if entry_id is None:
+        return
+    j, syncer = journal.default()
+    try:
+        j.retry(entry_id)
+    except invoices_repo.DuplicateError as e:
+        messagebox.showerror("Retry", str(e))
+        return
+    syncer.wake()
+    load()
+
+
+def dismiss():
+    entry_id = selected_entry()
+    if entry_id is None:
+        return
+    if not messagebox.askyesno("Dismiss", f"Drop entry #{entry_id}? It will not be saved to the database."):
+        return
+    j, _ = journal.default()
+    j.dismiss(entry_id)
+    load()
+
+
+def main(master=None):
+    """Build the window; as a Toplevel of *master* when opened from the launcher."""
+    global listbox, status_label, review_rows
+    review_rows = None
+
+    # ==========================================================
+    # Main app GUI
+    # ==========================================================
+    root = tk.Toplevel(master) if master is not None else tk.Tk()
+    root.title("Entries to Review")
+    root.geometry("")
+
+    tk.Label(root, text="Entries the database rejected (duplicate number or invalid data):",
+             font=("Helvetica", 12)).pack(padx=10, pady=(10, 4), anchor="w")
+    listbox = tk.Listbox(root, width=110, height=14, font=("Courier", 10))
+    listbox.pack(padx=10, pady=4, fill="both", expand=True)
+
+    buttons = tk.Frame(root)
+    buttons.pack(pady=6)
+    tk.Button(buttons, text="Retry", width=12, command=retry).pack(side="left", padx=6)
+    tk.Button(buttons, text="Dismiss", width=12, command=dismiss).pack(side="left", padx=6)
+
+    status_label = tk.Label(root, text="", font=("Helvetica", 11))
+    status_label.pack(pady=(4, 10))
+
+    refresh()
+    if master is None:
+        root.mainloop()
+    return root
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,9 @@
 #!/usr/bin/env python3
 import tkinter as tk
 from tkinter import messagebox
-from contextlib import contextmanager
 from mysql.connector import Error
-from db import get_cnx  # central DB connector
-
-# ==========================================================
-# Context manager for automatic cleanup
-# ==========================================================
-@contextmanager
-def db_cursor(commit=False):
-    cnx = get_cnx()
-    cur = cnx.cursor()
-    try:
-        yield cur
-        if commit:
-            cnx.commit()
-    except Exception as e:
-        cnx.rollback()
-        raise e
-    finally:
-        cur.close()
-        cnx.close()
+from db import db_cursor  # shared pooled DB connector
+import refdata  # cached lookup tables
 
 # ==========================================================
 # Function to add supplier to database and retrieve new Supplier_ID
@@ -37,7 +19,10 @@ def add_supplier( nif_code, supplier_name):
         
             # Retrieve the last inserted Supplier_ID
             new_supplier_id = cur.lastrowid
-            messagebox.showinfo("Success", f"Supplier added successfully with ID: {new_supplier_id}")
+            version = refdata.current_version(cur, "NIF_Codes")
+        # Committed: patch the cache so open forms see the supplier right away
+        refdata.add_supplier(new_supplier_id, nif_code, supplier_name, version)
+        messagebox.showinfo("Success", f"Supplier added successfully with ID: {new_supplier_id}")
     except Error as e:
         messagebox.showerror("Error", f"Error: {e}")
 
@@ -59,8 +44,11 @@ def submit():
 # ==========================================================
 # Main GUI
 # ==========================================================
-if __name__ == "__main__":
-    root = tk.Tk()
+def main(master=None):
+    """Build the form; as a Toplevel of *master* when opened from the launcher."""
+    global entry_nif, entry_name
+
+    root = tk.Toplevel(master) if master is not None else tk.Tk()
     root.title("Add Supplier")
 
     tk.Label(root, text="Supplier NIF Code:").grid(row=0, column=0, padx=10, pady=5, sticky="e")
@@ -74,4 +62,10 @@ if __name__ == "__main__":
     submit_button = tk.Button(root, text="Add Supplier", command=submit)
     submit_button.grid(row=2, column=0, columnspan=2, pady=10)
 
-    root.mainloop()
+    if master is None:
+        root.mainloop()
+    return root
+
+
+if __name__ == "__main__":
+    main()
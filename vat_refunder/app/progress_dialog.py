@@ -0,0 +1,77 @@
+"""
+Progress window for background report jobs (report_jobs.ReportJob).
+
+run() starts the job and returns at once. The window polls job.events with
+after() every POLL_MS, shows rows fetched / pages rendered, and offers
+Cancel. When the job ends the window closes and, back on the Tk thread,
+on_done(result) runs, or the error / "cancelled" message is shown.
+"""
+
+import queue
+from tkinter import Toplevel, Label, Button, StringVar, ttk, messagebox
+from mysql.connector import Error
+from report_jobs import ReportJob
+
+POLL_MS = 100
+
+
+def run(parent, title, work, on_done):
+    """Run work(progress) in the background; on_done(result) is called on the Tk thread."""
+    job = ReportJob(work)
+
+    window = Toplevel(parent)
+    window.title(title)
+    window.resizable(False, False)
+    window.transient(parent)
+    status = StringVar(value="Starting…")
+    Label(window, textvariable=status, width=48, anchor="w").pack(padx=12, pady=(12, 6))
+    bar = ttk.Progressbar(window, mode="indeterminate", length=320)
+    bar.pack(padx=12)
+    bar.start(15)
+
+    def cancel():
+        status.set("Cancelling…")
+        cancel_button.config(state="disabled")
+        job.cancel()
+
+    cancel_button = Button(window, text="Cancel", command=cancel)
+    cancel_button.pack(pady=10)
+    window.protocol("WM_DELETE_WINDOW", cancel)
+
+    def show_progress(stage, rows, pages, expected_pages):
+        if job.progress.cancelled:
+            return
+        if expected_pages and str(bar["mode"]) != "determinate":
+            bar.stop()
+            bar.config(mode="determinate", maximum=expected_pages)
+        if str(bar["mode"]) == "determinate":
+            bar["value"] = min(pages, bar["maximum"])
+        text = f"Rows fetched: {rows:,}    Pages rendered: {pages:,}"
+        status.set(f"{stage}\n{text}" if stage else text)
+
+    def poll():
+        last = None
+        while True:
+            try:
+                kind, payload = job.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                last = payload  # only the newest counts are worth drawing
+                continue
+            window.destroy()
+            if kind == "done":
+                on_done(payload)
+            elif kind == "cancelled":
+                messagebox.showinfo("Cancelled", "Report generation was cancelled.", parent=parent)
+            else:
+                heading = "Database Error" if isinstance(payload, Error) else "Error"
+                messagebox.showerror(heading, f"Error: {payload}", parent=parent)
+            return
+        if last is not None:
+            show_progress(*last)
+        window.after(POLL_MS, poll)
+
+    job.start()
+    window.after(POLL_MS, poll)
+    return job
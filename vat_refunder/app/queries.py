@@ -0,0 +1,146 @@
+"""
+Query layer: schema capabilities and reusable server-side prepared statements.
+
+- capabilities() reads information_schema once per process: the tables and
+  views of the database and their columns. Callers pick the right SQL up
+  front (has_column) instead of trying a statement and catching Error, which
+  cost a failed round trip on every call where a column was missing.
+- session() checks a connection out like db.db_cursor(), and its execute()
+  runs SQL as a server-side prepared statement. The prepared cursor is kept
+  with the connection and reused, so the server parses each hot statement
+  (invoice / voucher inserts in invoices_repo.py, report selects) once per
+  connection; later calls only send the parameters.
+
+Prepared statements belong to the server session. They outlive a checkout
+because the pool keeps sessions (db.get_pool()); after a reconnect the
+connection has a new id and its statements are prepared again.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from mysql.connector import Error
+import db  # shared pooled DB connector
+
+SCHEMA_QUERY = """
+SELECT TABLE_NAME, COLUMN_NAME
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+DRAIN_BATCH = 500  # rows per fetchmany() when discarding an unread result
+
+_lock = threading.Lock()
+_columns = None  # table / view -> frozenset of lower-case column names
+
+
+# ==========================================================
+# Schema capabilities
+# ==========================================================
+def capabilities():
+    """{table or view: frozenset of lower-case column names}; read once per process.
+
+    Raises mysql Error if information_schema cannot be read (nothing is cached then).
+    """
+    global _columns
+    with _lock:
+        if _columns is None:
+            found = {}
+            with db.db_cursor() as cur:
+                cur.execute(SCHEMA_QUERY)
+                for table, column in cur.fetchall():
+                    found.setdefault(table, set()).add(column.lower())
+            _columns = {table: frozenset(columns) for table, columns in found.items()}
+        return _columns
+
+
+def has_table(name):
+    """True if the table or view *name* exists."""
+    return name in capabilities()
+
+
+def has_column(table, column):
+    """True if *table* (or view) has *column*; column names compare case-insensitively."""
+    return column.lower() in capabilities().get(table, ())
+
+
+def forget_schema():
+    """Read information_schema again on next use (after a migration in this process)."""
+    global _columns
+    with _lock:
+        _columns = None
+
+
+# ==========================================================
+# Prepared statements
+# ==========================================================
+def _statements(cnx):
+    """{sql: (sql, prepared cursor)} of *cnx*'s current server session."""
+    raw = db.raw_connection(cnx)
+    cache = getattr(raw, "_vat_prepared", None)
+    if cache is None or cache[0] != raw.connection_id:
+        cache = raw._vat_prepared = (raw.connection_id, {})
+    return cache[1]
+
+
+class Session:
+    """One checked-out connection: execute() for prepared statements, .cursor for the rest."""
+
+    def __init__(self, cnx):
+        self.cursor = cnx.cursor()
+        self._cnx = cnx
+        self._statements = _statements(cnx)
+        self._last = None
+
+    def execute(self, sql, params=()):
+        """Run *sql* as a prepared statement (prepared on first use) and return its cursor.
+
+        Its rows must be read before the next execute(); what is left of
+        them is discarded then.
+        """
+        self._finish()
+        entry = self._statements.get(sql)
+        if entry is None:
+            entry = self._statements[sql] = (sql, self._cnx.cursor(prepared=True))
+        # the cursor re-prepares unless it gets the very same string object back
+        sql, cur = entry
+        cur.execute(sql, params)
+        self._last = cur
+        return cur
+
+    def fetchall(self, sql, params=()):
+        return self.execute(sql, params).fetchall()
+
+    def exists(self, sql, params=()):
+        """True if *sql* returns a row."""
+        return bool(self.fetchall(sql, params))
+
+    def insert(self, sql, params):
+        """Run an INSERT; returns the AUTO_INCREMENT id it generated."""
+        return self.execute(sql, params).lastrowid
+
+    def _finish(self):
+        # the connection would otherwise try to skip a binary result as text rows
+        cur, self._last = self._last, None
+        if cur is None:
+            return
+        try:
+            while cur.fetchmany(DRAIN_BATCH):
+                pass
+        except Error:
+            pass  # result already ended (killed query, lost connection)
+
+    def close(self):
+        self._finish()
+        self.cursor.close()
+
+
+@contextmanager
+def session(commit=False):
+    """Like db.db_cursor(), but yields a Session; the prepared cursors stay open."""
+    with db.db_connection(commit) as cnx:
+        s = Session(cnx)
+        try:
+            yield s
+        finally:
+            s.close()
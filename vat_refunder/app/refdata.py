@@ -0,0 +1,133 @@
+"""
+Process-wide cache for the lookup tables the entry forms load on open:
+NIF_Codes, Head_of_Accounts, Colleagues, Recipients and Refund_Status.
+
+Each cached table remembers the Table_Versions counter it was loaded at
+(see db/init/002_table_versions.sql). get() reads all counters with one
+small query and reloads only the tables whose counter moved; a table with
+no counter row is reloaded every time.
+
+Writers that already hold the new row (new_supplier.add_supplier) patch the
+cache in place and notify subscribers, so open forms pick up the change
+without a reload.
+"""
+
+import threading
+from mysql.connector import Error
+from db import db_cursor  # shared pooled DB connector
+
+QUERIES = {
+    "NIF_Codes": "SELECT Supplier_ID, Supplier_Name, Supplier_NIF_Code FROM NIF_Codes",
+    "Head_of_Accounts": "SELECT Head_of_Accounts_ID, Name FROM Head_of_Accounts",
+    "Colleagues": "SELECT Colleague_ID, Colleague_Name FROM Colleagues WHERE rank_id BETWEEN 1 AND 5 ORDER BY rank_id",
+    "Recipients": "SELECT recipient_id, Name FROM Recipients",
+    "Refund_Status": "SELECT Refund_Status_ID, Refund_Status_Type FROM Refund_Status",
+}
+
+_lock = threading.RLock()
+_cache = {}        # table -> (version, rows)
+_listeners = {}    # table -> [callback(rows)]
+
+
+def _read_versions(cur):
+    try:
+        cur.execute("SELECT Table_Name, Version FROM Table_Versions")
+        return dict(cur.fetchall())
+    except Error:
+        return {}  # counters not installed yet: treat every table as changed
+
+
+def current_version(cur, table):
+    """Counter for *table* as seen by *cur*'s transaction, or None."""
+    try:
+        cur.execute("SELECT Version FROM Table_Versions WHERE Table_Name = %s", (table,))
+        row = cur.fetchone()
+        return row[0] if row else None
+    except Error:
+        return None
+
+
+def get(*tables):
+    """Return the rows of each requested table, reloading only stale ones."""
+    changed = []
+    with _lock:
+        with db_cursor() as cur:
+            versions = _read_versions(cur)
+            result = []
+            for table in tables:
+                version = versions.get(table)
+                cached = _cache.get(table)
+                if cached is None or version is None or cached[0] != version:
+                    cur.execute(QUERIES[table])
+                    rows = cur.fetchall()
+                    if cached is not None and cached[1] != rows:
+                        changed.append((table, rows))
+                    cached = (version, rows)
+                    _cache[table] = cached
+                result.append(cached[1])
+    for table, rows in changed:
+        _notify(table, rows)
+    return result
+
+
+def suppliers():
+    """[(Supplier_ID, Supplier_Name, Supplier_NIF_Code), ...]"""
+    return get("NIF_Codes")[0]
+
+
+def budget_heads():
+    """{Name: Head_of_Accounts_ID}"""
+    return {name: head_id for head_id, name in get("Head_of_Accounts")[0]}
+
+
+def add_supplier(supplier_id, nif_code, supplier_name, version=None):
+    """Patch a freshly inserted supplier into the cache and notify forms.
+
+    *version* is the NIF_Codes counter read in the inserting transaction. If
+    it is exactly one past the cached version nobody else wrote meanwhile and
+    the cache stays current; otherwise the next get() reloads the table.
+    """
+    with _lock:
+        cached = _cache.get("NIF_Codes")
+        if cached is None:
+            return
+        old_version, rows = cached
+        rows = rows + [(supplier_id, supplier_name, nif_code)]
+        if version is None or old_version is None or version != old_version + 1:
+            version = None
+        _cache["NIF_Codes"] = (version, rows)
+    _notify("NIF_Codes", rows)
+
+
+def invalidate(table=None):
+    with _lock:
+        if table is None:
+            _cache.clear()
+        else:
+            _cache.pop(table, None)
+
+
+def subscribe(table, callback, widget=None):
+    """Call *callback(rows)* whenever *table* changes in the cache.
+
+    Returns an unsubscribe function. With *widget* the subscription is dropped
+    automatically when that widget is destroyed.
+    """
+    with _lock:
+        _listeners.setdefault(table, []).append(callback)
+
+    def unsubscribe():
+        with _lock:
+            if callback in _listeners.get(table, []):
+                _listeners[table].remove(callback)
+
+    if widget is not None:
+        widget.bind("<Destroy>", lambda e: unsubscribe() if e.widget is widget else None, add="+")
+    return unsubscribe
+
+
+def _notify(table, rows):
+    with _lock:
+        callbacks = list(_listeners.get(table, []))
+    for callback in callbacks:
+        callback(rows)
@@ -0,0 +1,159 @@
+"""
+Content-addressed cache for generated reports.
+
+A report is identified by its type, its period and a cheap fingerprint of
+the data behind it:
+- per invoice table, COUNT(*) and BIT_XOR(CRC32(row)) over the period's
+  refundable rows (read from the covering IDX_I*_Report index range, so no
+  row lookups), which changes on any insert, update or delete;
+- the Table_Versions counters of the lookup tables the report joins
+  (supplier names, vouchers, budget heads);
+- a hash of the rendering code, so a layout change never serves old files.
+
+Cached artifacts live in CACHE_DIR as <key>.<name> plus a <key>.json with the
+report's summary (row counts, truncations). A hit copies the artifacts to
+the requested paths and touches them; the directory is kept under
+CACHE_MAX_MB by evicting the least recently used entries.
+
+The cache is best effort: if a fingerprint cannot be computed (missing
+Table_Versions counter) or the cache directory misbehaves, callers simply
+build the report as before.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from mysql.connector import Error
+from db import db_cursor  # shared pooled DB connector
+
+CACHE_DIR = os.path.expanduser(os.getenv("REPORT_CACHE_DIR", "~/Desktop/exports/.report_cache"))
+CACHE_MAX_MB = float(os.getenv("REPORT_CACHE_MB", "500"))
+CACHE_FORMAT = 1  # bump to invalidate every entry
+
+# report -> (invoice tables checksummed for the period, Table_Versions counters)
+REPORTS = {
+    "oficial_pdf": (("Invoices_Chancery", "Invoices_Residence"), ("NIF_Codes",)),
+    "oficial_csv": (("Invoices_Chancery", "Invoices_Residence"), ("NIF_Codes",)),
+    "vouchers_pdf": (("Invoices_Chancery", "Invoices_Residence"), ("NIF_Codes", "Vouchers", "Head_of_Accounts")),
+    "vouchers_csv": (("Invoices_Chancery", "Invoices_Residence"), ("NIF_Codes", "Vouchers", "Head_of_Accounts")),
+}
+
+CHECKSUM_QUERY = """
+SELECT COUNT(*),
+       COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', ID, Supplier_ID, Number, Date, Total, Vat, Voucher_ID))), 0)
+FROM {table}
+WHERE Year = %s AND Quarter = %s AND Refundable = 1
+"""
+
+_code_hashes = {}
+
+
+def _code_hash(report):
+    """Hash of the modules that render *report* (computed once per process)."""
+    if report not in _code_hashes:
+        modules = ["report_pdf.py", ("vat_oficial.py" if report.startswith("oficial") else "vat_vouchers.py")]
+        h = hashlib.sha256()
+        for name in modules:
+            with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), "rb") as f:
+                h.update(f.read())
+        _code_hashes[report] = h.hexdigest()
+    return _code_hashes[report]
+
+
+def key_for(report, quarter, year):
+    """Cache key for *report* over the period, or None if it cannot be cached."""
+    tables, counters = REPORTS[report]
+    try:
+        with db_cursor() as cur:
+            parts = [report, str(quarter), str(year), str(CACHE_FORMAT), _code_hash(report)]
+            for table in tables:
+                cur.execute(CHECKSUM_QUERY.format(table=table), (year, quarter))
+                count, checksum = cur.fetchone()
+                parts.append(f"{table}:{count}:{checksum}")
+            placeholders = ", ".join(["%s"] * len(counters))
+            cur.execute(f"SELECT Table_Name, Version FROM Table_Versions WHERE Table_Name IN ({placeholders})",
+                        counters)
+            versions = dict(cur.fetchall())
+    except (Error, OSError):
+        return None
+    if set(versions) != set(counters):
+        return None  # a table without a counter could change unnoticed
+    parts += [f"{name}:{versions[name]}" for name in counters]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:40]
+
+
+def _entry(key, name):
+    return os.path.join(CACHE_DIR, f"{key}.{name}")
+
+
+def restore(key, outputs):
+    """Copy a cached report to *outputs* ({name: path}); returns its summary or None."""
+    if key is None:
+        return None
+    try:
+        with open(_entry(key, "json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        for name in meta["files"]:
+            shutil.copyfile(_entry(key, name), outputs[name])
+        now = time.time()
+        for path in glob.glob(_entry(key, "*")):
+            os.utime(path, (now, now))
+    except (OSError, ValueError, KeyError):
+        return None
+    return meta["summary"]
+
+
+def save(key, outputs, summary):
+    """Store the files of *outputs* that were written, with *summary*; never raises."""
+    if key is None:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        files = [name for name, path in outputs.items() if os.path.exists(path)]
+        for name in files:
+            _atomic_copy(outputs[name], _entry(key, name))
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"files": files, "summary": summary}, f)
+        os.replace(tmp, _entry(key, "json"))  # the entry only counts once this exists
+        evict()
+    except OSError:
+        pass
+
+
+def _atomic_copy(src, dest):
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    os.close(fd)
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+def evict(max_bytes=None):
+    """Drop least recently used entries until the cache fits in *max_bytes*."""
+    max_bytes = CACHE_MAX_MB * 2**20 if max_bytes is None else max_bytes
+    entries = {}
+    for path in glob.glob(os.path.join(CACHE_DIR, "*")):
+        if path.endswith(".tmp"):
+            continue  # another process is still writing it
+        key = os.path.basename(path).split(".", 1)[0]
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        size, atime = entries.get(key, (0, 0))
+        entries[key] = (size + st.st_size, max(atime, st.st_mtime))
+    total = sum(size for size, _ in entries.values())
+    for key, (size, _) in sorted(entries.items(), key=lambda kv: kv[1][1]):
+        if total <= max_bytes:
+            break
+        for path in glob.glob(_entry(key, "*")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= size
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Headless report generation: python -m vat_refunder report ...
+
+- Calls the same build_* workers as the dialogs (report cache, export
+  watermarks and changes-only exports included), without importing tkinter,
+  so it runs over SSH and from cron.
+- Every report x period x format is one task; tasks run concurrently in a
+  ProcessPoolExecutor (--jobs, one per core by default), each worker with
+  its own small DB pool.
+- Files are written straight into --out-dir under stable names
+  (VAT_Q4_2024.pdf, VatVouchers_Q4_2024_Chancery.csv, ...); changes-only
+  exports carry the run's timestamp, like the ones from the dialogs.
+- Colleague reports are always a PDF + CSV pair; without --colleague every
+  colleague gets their own pair (vat_colleague.generate_all).
+
+Exit status:
+  0    every report was written
+  1    at least one report failed (database, disk, ...)
+  2    bad arguments
+  3    nothing to report: no report had data (or changes) for its period
+  130  interrupted
+
+Usage:
+  python -m vat_refunder report oficial --year 2024 --quarter 4 --format pdf csv
+  python -m vat_refunder report oficial vouchers --previous --out-dir /srv/exports --jobs 4
+  python -m vat_refunder report colleague --colleague 12 15 --year 2024 --quarter 1 2
+  python -m vat_refunder report vouchers --previous --changes --format csv
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from functools import partial
+
+import db
+import export_changes
+import vat_colleague
+import vat_oficial
+import vat_vouchers
+
+# ==========================================================
+# Config
+# ==========================================================
+OUTPUT_DIR = os.path.expanduser("~/Desktop/exports")
+REPORT_TYPES = ("oficial", "vouchers", "colleague")
+FORMATS = ("pdf", "csv")
+WORKER_POOL_SIZE = 2  # DB connections per worker process; tasks run one at a time
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NO_DATA = 3
+EXIT_INTERRUPTED = 130
+
+
+def current_period(today=None):
+    today = today or datetime.now()
+    return today.year, (today.month - 1) // 3 + 1
+
+
+def previous_period(today=None):
+    """The last completed quarter (what a quarter-end cron job wants)."""
+    year, quarter = current_period(today)
+    return (year, quarter - 1) if quarter > 1 else (year - 1, 4)
+
+
+def build_tasks(reports, periods, formats, colleagues=(), changes=False):
+    """One task per report, period and format; colleague tasks per ID (or all colleagues)."""
+    tasks = []
+    for report in reports:
+        for year, quarter in periods:
+            if report == "colleague":
+                for colleague_id in colleagues or [None]:
+                    tasks.append(dict(report=report, year=year, quarter=quarter, colleague=colleague_id,
+                                      format="pdf+csv", changes=changes))
+            else:
+                for fmt in formats:
+                    tasks.append(dict(report=report, year=year, quarter=quarter, colleague=None,
+                                      format=fmt, changes=changes))
+    return tasks
+
+
+# ==========================================================
+# Workers
+# ==========================================================
+def _existing(paths):
+    return [path for path in paths if os.path.exists(path)]
+
+
+def _changes_extra(summary):
+    return summary["new"] + summary["changed"], {"summary": export_changes.format_summary(summary)}
+
+
+def _oficial(task, out_dir, stamp):
+    q, y = task["quarter"], task["year"]
+    base = os.path.join(out_dir, f"VAT_Q{q}_{y}")
+    if task["changes"]:
+        base = f"{base}_{stamp}_changes"
+        result = vat_oficial.build_changes_report(q, y, base, task["format"] == "pdf")
+        rows, extra = _changes_extra(result["summary"])
+        files = _existing(base + suffix for suffix in (".pdf", ".csv", "_truncated_log.csv", "_changes.txt"))
+        return files, rows, dict(extra, truncated=result["truncated"])
+    if task["format"] == "pdf":
+        result = vat_oficial.build_pdf_report(q, y, base + ".pdf")
+        return _existing([base + ".pdf"]), result["rows"], {"cached": result["cached"]}
+    result = vat_oficial.build_csv_report(q, y, base + ".csv", base + "_truncated_log.csv")
+    return (_existing([base + ".csv", base + "_truncated_log.csv"]), result["written"],
+            {"cached": result["cached"], "truncated": result["truncated"]})
+
+
+def _vouchers(task, out_dir, stamp):
+    q, y = task["quarter"], task["year"]
+    base = os.path.join(out_dir, f"VatVouchers_Q{q}_{y}")
+    csv_paths = [f"{base}_{name}.csv" for name, _ in vat_vouchers.TABLES]
+    if task["changes"]:
+        base = f"{base}_{stamp}_changes"
+        summary = vat_vouchers.build_changes_report(q, y, base, task["format"] == "pdf")
+        rows, extra = _changes_extra(summary)
+        files = _existing([f"{base}.pdf", f"{base}_changes.txt"] + [f"{base}_{name}.csv" for name, _ in vat_vouchers.TABLES])
+        return files, rows, extra
+    if task["format"] == "pdf":
+        result = vat_vouchers.build_pdf_report(q, y, base + ".pdf")
+        return _existing([base + ".pdf"]), result["rows"], {"cached": result["cached"]}
+    result = vat_vouchers.build_csv_report(q, y, *csv_paths)
+    return _existing(csv_paths), result["chancery"] + result["residence"], {"cached": result["cached"]}
+
+
+def _colleague(task, out_dir, stamp):
+    q, y, colleague_id = task["quarter"], task["year"], task["colleague"]
+    if task["changes"]:
+        # file names come from the colleague's name; build_changes_report does not return them
+        rows, extra = _changes_extra(vat_colleague.build_changes_report(colleague_id, q, y, out_dir))
+        return [], rows, extra
+    if colleague_id is not None:
+        pdf, csv_file, rows = vat_colleague.build_report(colleague_id, q, y, out_dir)
+        return ([pdf, csv_file] if rows else []), rows, {}
+    # the outer pool already runs one task per core: render this period's colleagues one at a time
+    results, errors = vat_colleague.generate_all(q, y, out_dir, workers=1)
+    files = [path for _, pdf, csv_file, _ in results for path in (pdf, csv_file)]
+    return files, sum(rows for *_, rows in results), {"failed": [f"{name}: {msg}" for name, msg in errors]}
+
+
+RUNNERS = {"oficial": _oficial, "vouchers": _vouchers, "colleague": _colleague}
+
+
+def run_task(task, out_dir, stamp):
+    """Run one task; never raises, the outcome goes into the returned entry."""
+    entry = dict(task, files=[], rows=0)
+    t0 = time.perf_counter()
+    try:
+        files, rows, extra = RUNNERS[task["report"]](task, out_dir, stamp)
+        entry.update(extra, files=files, rows=rows, status="ok" if rows else "empty")
+        if entry.get("failed"):
+            entry.update(status="error", error="; ".join(entry["failed"]))
+    except Exception as e:
+        entry.update(status="error", error=f"{type(e).__name__}: {e}")
+    entry["seconds"] = round(time.perf_counter() - t0, 3)
+    return entry
+
+
+# ==========================================================
+# Driver
+# ==========================================================
+def run_reports(tasks, out_dir=OUTPUT_DIR, jobs=None, on_done=None):
+    """Run *tasks* concurrently into *out_dir*; returns their entries in task order.
+
+    on_done(done, total, entry) is called in this process as tasks finish.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    workers = max(1, min(jobs or os.cpu_count() or 1, len(tasks)))
+    entries = [None] * len(tasks)
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=partial(db.reset_pool, WORKER_POOL_SIZE)) as pool:
+        futures = {pool.submit(run_task, task, out_dir, stamp): i for i, task in enumerate(tasks)}
+        try:
+            for done, fut in enumerate(as_completed(futures), start=1):
+                entries[futures[fut]] = entry = fut.result()
+                if on_done:
+                    on_done(done, len(tasks), entry)
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return entries
+
+
+def exit_status(entries):
+    if any(e["status"] == "error" for e in entries):
+        return EXIT_FAILED
+    if all(e["status"] == "empty" for e in entries):
+        return EXIT_NO_DATA
+    return EXIT_OK
+
+
+def _print_entry(done, total, entry):
+    who = ""
+    if entry["report"] == "colleague":
+        who = f" colleague {entry['colleague']}" if entry["colleague"] is not None else " all colleagues"
+    what = f"{entry['report']}{who} {'changes ' if entry['changes'] else ''}{entry['format']}"
+    notes = [f"{entry['rows']} rows"]
+    if entry.get("cached"):
+        notes.append("from cache")
+    if entry.get("truncated"):
+        notes.append(f"{entry['truncated']} truncated")
+    line = (f"[{done}/{total}] {what} Q{entry['quarter']} {entry['year']}: {entry['status']} "
+            f"({', '.join(notes)}, {entry['seconds']:.2f}s)")
+    if entry["status"] == "error":
+        print(f"{line}\n  {entry['error']}", file=sys.stderr)
+        return
+    print(line)
+    for path in entry["files"]:
+        print(f"  {path}")
+    for summary_line in entry.get("summary", ()):
+        print(f"  {summary_line}")
+
+
+def _print_failure(done, total, entry):
+    if entry["status"] == "error":
+        _print_entry(done, total, entry)
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m vat_refunder report",
+                                 description="Generate VAT reports without the GUI.")
+    ap.add_argument("reports", nargs="+", choices=REPORT_TYPES, metavar="REPORT",
+                    help="one or more of: " + ", ".join(REPORT_TYPES))
+    ap.add_argument("--year", nargs="+", type=int, help="fiscal years (default: the current year)")
+    ap.add_argument("--quarter", nargs="+", type=int, choices=(1, 2, 3, 4),
+                    help="quarters (default: the current quarter)")
+    ap.add_argument("--previous", action="store_true",
+                    help="the last completed quarter instead of --year / --quarter")
+    ap.add_argument("--format", nargs="+", choices=FORMATS, default=["pdf"], dest="formats",
+                    help="oficial / vouchers output (default: pdf); colleague is always PDF + CSV")
+    ap.add_argument("--out-dir", default=OUTPUT_DIR, help=f"output folder (default: {OUTPUT_DIR})")
+    ap.add_argument("--colleague", nargs="+", type=int, default=[],
+                    help="colleague IDs for 'colleague' (default: every colleague)")
+    ap.add_argument("--changes", action="store_true",
+                    help="only rows added or changed since the last export, plus a _changes.txt summary")
+    ap.add_argument("--jobs", type=int, help="reports rendered at once (default: one per core)")
+    ap.add_argument("-q", "--quiet", action="store_true", help="print failures and the totals only")
+    args = ap.parse_args(argv)
+
+    if args.previous and (args.year or args.quarter):
+        ap.error("--previous cannot be combined with --year / --quarter")
+    if args.changes and len(args.formats) > 1:
+        # the first export would move the watermark and leave the second one empty
+        ap.error("--changes takes a single --format")
+    if args.jobs is not None and args.jobs < 1:
+        ap.error("--jobs must be at least 1")
+    if args.colleague and "colleague" not in args.reports:
+        ap.error("--colleague only applies to the 'colleague' report")
+
+    if args.previous:
+        args.periods = [previous_period()]
+    else:
+        year, quarter = current_period()
+        args.periods = [(y, q) for y in sorted(set(args.year or [year]))
+                        for q in sorted(set(args.quarter or [quarter]))]
+    return args
+
+
+def main(argv=None):
+    try:
+        args = parse_args(argv)
+    except SystemExit as e:  # argparse: --help exits 0, usage errors 2
+        return e.code
+    tasks = build_tasks(dict.fromkeys(args.reports), args.periods, dict.fromkeys(args.formats),
+                        args.colleague, args.changes)
+    try:
+        entries = run_reports(tasks, args.out_dir, args.jobs, _print_failure if args.quiet else _print_entry)
+    except KeyboardInterrupt:
+        print("Interrupted.", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except OSError as e:  # --out-dir cannot be created
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_FAILED
+
+    counts = {status: sum(e["status"] == status for e in entries) for status in ("ok", "empty", "error")}
+    print(f"{len(entries)} reports ({counts['ok']} ok, {counts['empty']} empty, {counts['error']} failed), "
+          f"{sum(e['rows'] for e in entries)} rows -> {args.out_dir}")
+    return exit_status(entries)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
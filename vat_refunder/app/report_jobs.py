@@ -0,0 +1,167 @@
+"""
+Background report jobs: run the queries and the ReportLab build off the Tk
+main thread, with progress and cancel.
+
+- ReportJob runs work(progress) on a daemon thread. Everything it has to
+  tell the UI goes through job.events, a queue.Queue the UI drains with
+  after() (see progress_dialog.py); the worker never touches Tk.
+- Progress counts rows fetched and pages rendered. add_rows() / page() are
+  called from the fetch loops and from the PDF canvas after every page, and
+  raise Cancelled once cancel() was called, which unwinds the build.
+- A query that is still running on the server is interrupted as well:
+  query(cur) records the connection id, and cancel() sends KILL QUERY for
+  it from a separate connection.
+
+This module does not import tkinter, so command-line tools can use the same
+progress hooks.
+"""
+
+import os
+import queue
+import threading
+from contextlib import contextmanager, nullcontext
+
+from mysql.connector import Error
+import db  # shared pooled DB connector
+
+
+class Cancelled(Exception):
+    """The user cancelled the job."""
+
+
+class Progress:
+    def __init__(self, events=None):
+        self.rows = 0
+        self.pages = 0
+        self.expected_pages = None
+        self.stage = ""
+        self._events = events
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._connections = set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def _post(self):
+        if self._events is not None:
+            self._events.put(("progress", (self.stage, self.rows, self.pages, self.expected_pages)))
+
+    def set_stage(self, stage):
+        self.stage = stage
+        self._post()
+        self.check()
+
+    def add_rows(self, n):
+        self.rows += n
+        self._post()
+        self.check()
+
+    def expect_pages(self, n):
+        self.expected_pages = n
+        self._post()
+
+    def page(self, number):
+        """Canvas hook: page *number* was written."""
+        self.pages = number
+        self._post()
+        self.check()
+
+    @contextmanager
+    def query(self, cur):
+        """Make the statements run on *cur* killable by cancel()."""
+        cur.execute("SELECT CONNECTION_ID()")
+        connection_id = cur.fetchall()[0][0]
+        with self._lock:
+            self._connections.add(connection_id)
+        try:
+            yield cur
+        except Error:
+            if self.cancelled:
+                raise Cancelled()
+            raise
+        finally:
+            with self._lock:
+                self._connections.discard(connection_id)
+
+    def cancel(self):
+        """Ask the worker to stop; returns at once (KILL QUERY runs on its own thread)."""
+        self._cancel.set()
+        with self._lock:
+            connections = list(self._connections)
+        if connections:
+            threading.Thread(target=_kill_queries, args=(connections,), daemon=True).start()
+
+
+def _kill_queries(connection_ids):
+    # A separate, unpooled connection: the pool may be exhausted by the job itself.
+    try:
+        cnx = db.connect()
+    except Error:
+        return
+    try:
+        cur = cnx.cursor()
+        for connection_id in connection_ids:
+            try:
+                cur.execute(f"KILL QUERY {int(connection_id)}")
+            except Error:
+                pass  # already finished
+        cur.close()
+    finally:
+        cnx.close()
+
+
+def tracked(cur, progress):
+    """progress.query(cur), or nothing when there is no progress to report to."""
+    return progress.query(cur) if progress is not None else nullcontext(cur)
+
+
+@contextmanager
+def removed_on_failure(*paths):
+    """Delete half-written *paths* if the block raises (including Cancelled)."""
+    try:
+        yield
+    except BaseException:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise
+
+
+class ReportJob:
+    """work(progress) on a daemon thread; outcome posted to .events.
+
+    Events are (kind, payload) tuples:
+      ("progress", (stage, rows, pages, expected_pages))
+      ("done", result) | ("cancelled", None) | ("error", exception)
+    """
+
+    def __init__(self, work):
+        self.events = queue.Queue()
+        self.progress = Progress(self.events)
+        self._work = work
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self.progress.cancel()
+
+    def _run(self):
+        try:
+            result = self._work(self.progress)
+        except Cancelled:
+            self.events.put(("cancelled", None))
+        except Exception as e:
+            self.events.put(("error", e))
+        else:
+            self.events.put(("done", result))
@@ -0,0 +1,171 @@
+"""
+Shared ReportLab building blocks for the report generators.
+
+High-volume table rendering:
+- Cells are plain strings; a cell becomes a Paragraph only when its column
+  may wrap AND the text is wider than the column, so most rows cost no
+  paragraph layout at all.
+- Rows are pre-chunked into page-sized Tables (header repeated), so
+  ReportLab never has to split one giant table across hundreds of pages.
+- Paragraph and table styles are built once at import and shared.
+
+Page numbering: NumberedCanvas draws the "n/N" total as a reference to one
+form XObject that is only defined in save(), so it no longer keeps a copy
+of the canvas __dict__ per page to replay at the end. Memory still grows
+with the page count (ReportLab holds every finished page stream until
+save()), but at about half the slope: tracemalloc peaks of 3.2 MiB at 250
+pages and 12.6 MiB at 1,000, against 5.9 and 23.3 MiB for the snapshot
+canvas (benchmarks/bench_canvas.py). It is not faster. The generation time
+is kept in the PDF metadata, off the pages.
+"""
+
+from datetime import datetime
+from functools import partial
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
+
+# ==========================================================
+# Styles (built once)
+# ==========================================================
+STYLES = getSampleStyleSheet()
+HEADER_STYLE = STYLES["Heading4"]
+CELL_FONT = "Helvetica"
+CELL_FONT_SIZE = 8
+CELL_STYLE = ParagraphStyle(name="Cell", parent=STYLES["Normal"], fontName=CELL_FONT,
+                            fontSize=CELL_FONT_SIZE, leading=CELL_FONT_SIZE * 1.2)
+TOTAL_STYLE = ParagraphStyle(name="Total", parent=STYLES["Normal"], fontSize=10,
+                             alignment=TA_RIGHT, spaceBefore=6, spaceAfter=12)
+
+CELL_PADDING = 6 + 6  # TableStyle default LEFTPADDING + RIGHTPADDING
+ROW_HEIGHT = CELL_FONT_SIZE * 1.2 + 3 + 3  # one text line + TOP/BOTTOMPADDING
+
+BASE_TABLE_COMMANDS = [
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightblue),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+    ("FONTSIZE", (0, 0), (-1, -1), CELL_FONT_SIZE),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.whitesmoke]),
+]
+
+
+def table_style(extra_commands=()):
+    """A TableStyle with the house look plus *extra_commands*; build it once per report type."""
+    return TableStyle(BASE_TABLE_COMMANDS + list(extra_commands))
+
+
+# ==========================================================
+# Cells and tables
+# ==========================================================
+def header_cells(titles):
+    return [Paragraph(t, HEADER_STYLE) for t in titles]
+
+
+def cell(text, width):
+    """Plain string if it fits on one line of *width*, else a wrapping Paragraph."""
+    if stringWidth(text, CELL_FONT, CELL_FONT_SIZE) <= width - CELL_PADDING:
+        return text
+    return Paragraph(escape(text), CELL_STYLE)
+
+
+def rows_per_page(frame_height):
+    """Rows of single-line cells that fit a frame under a header row."""
+    return max(10, int(frame_height // ROW_HEIGHT) - 2) // 2 * 2  # even: keeps row banding aligned
+
+
+def chunked_tables(titles, rows, col_widths, style, wrap_cols=(), chunk_rows=40):
+    """Yield page-sized Tables for *rows* (iterables of strings).
+
+    Only columns listed in *wrap_cols* are ever turned into Paragraphs.
+    """
+    wrap = [(i, col_widths[i]) for i in wrap_cols]
+    chunk = []
+    for row in rows:
+        row = list(row)
+        for i, width in wrap:
+            row[i] = cell(row[i], width)
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield _table(titles, chunk, col_widths, style)
+            chunk = []
+    if chunk:
+        yield _table(titles, chunk, col_widths, style)
+
+
+def _table(titles, chunk, col_widths, style):
+    table = Table([header_cells(titles)] + chunk, colWidths=col_widths, repeatRows=1)
+    table.setStyle(style)
+    return table
+
+
+# ==========================================================
+# Canvas with Page Numbers
+# ==========================================================
+class NumberedCanvas(canvas.Canvas):
+    """Stamps "n/N" on every page without keeping pages around.
+
+    N is unknown until save(), so every page draws the same form XObject
+    (TOTAL_FORM) right after "n/"; save() defines that form once with the
+    final count and the PDF viewer resolves the reference.
+
+    The generation time goes into the document metadata (the doc template's
+    subject=generated_subject(), and the PDF creation date), not onto the
+    pages, so the same data always renders the same page content (see
+    report_cache.py). It cannot be set here: doc.build() overwrites the
+    canvas subject with the template's.
+
+    on_page(n) is called after page n is written (progress, cancel).
+    """
+    TOTAL_FORM = "PageTotal"
+    FOOTER_FONT = ("Helvetica", 8)
+
+    def __init__(self, *args, on_page=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._page_count = 0
+        self._on_page = on_page
+
+    def showPage(self):
+        self._page_count += 1
+        self._draw_footer()
+        super().showPage()
+        if self._on_page is not None:
+            self._on_page(self._page_count)
+
+    def save(self):
+        if self._code:  # drawing after the last showPage(): finish that page first
+            self.showPage()
+        self.beginForm(self.TOTAL_FORM)
+        self.setFont(*self.FOOTER_FONT)
+        self.drawString(0, 0, str(self._page_count))
+        self.endForm()
+        super().save()
+
+    def _draw_footer(self):
+        width, height = self._pagesize
+        self.saveState()
+        self.setFont(*self.FOOTER_FONT)
+        # "n/" ends on the centre line and the total follows it
+        self.drawRightString(width / 2.0, 15 * mm, f"{self._pageNumber}/")
+        self.translate(width / 2.0, 15 * mm)
+        self.doForm(self.TOTAL_FORM)
+        self.restoreState()
+
+
+def generated_subject():
+    """PDF Subject for a report rendered now (pass as the doc template's subject=)."""
+    return f"Generated on: {datetime.now():%Y-%m-%d %H:%M:%S}"
+
+
+def canvas_maker(progress=None):
+    """canvasmaker for doc.build(): NumberedCanvas, reporting pages to *progress*."""
+    if progress is None:
+        return NumberedCanvas
+    return partial(NumberedCanvas, on_page=progress.page)
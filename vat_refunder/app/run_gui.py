@@ -1,23 +1,48 @@
-import subprocess, sys, os, tkinter as tk
-HERE = os.path.dirname(os.path.abspath(__file__))
+import importlib, tkinter as tk
+import journal  # local write-ahead journal, synced to MySQL in the background
 
-def run(script):
-    subprocess.Popen([sys.executable, os.path.join(HERE, script)])
+# Forms run inside this process as Toplevel windows. Each module is imported
+# on first click and kept in sys.modules, so later windows reuse the already
+# loaded tkinter/reportlab/mysql modules and the shared DB pool. Forms keep
+# their widgets in module globals, so each form has at most one open window.
+_windows = {}
+
+def run(module_name):
+    win = _windows.get(module_name)
+    if win is not None and win.winfo_exists():
+        win.deiconify()
+        win.lift()
+        win.focus_force()
+        return
+    module = importlib.import_module(module_name)
+    _windows[module_name] = module.main(root)
 
 root = tk.Tk()
 root.title("VAT Refunder")
 buttons = [
-    ("Log Chancery Invoice",  "invoice_chy.py"),
-    ("Log Personal Invoice",  "invoice_pers.py"),
-    ("Log Residence Invoice", "invoice_res.py"),
-    ("Log New Supplier", "new_supplier.py"),
-    ("Log Voucher",           "vouchers.py"),
-    ("Print Official VAT", "vat_oficial.py"),
-    ("Print Personal VAT ", "vat_colleague.py"),
-    ("Print Invoice-to-Voucher Report", "vat_vouchers.py"),
+    ("Log Chancery Invoice",  "invoice_chy"),
+    ("Log Personal Invoice",  "invoice_pers"),
+    ("Log Residence Invoice", "invoice_res"),
+    ("Log New Supplier", "new_supplier"),
+    ("Log Voucher",           "vouchers"),
+    ("Bulk Import Invoices",  "bulk_import"),
+    ("Print Official VAT", "vat_oficial"),
+    ("Print Personal VAT ", "vat_colleague"),
+    ("Print Invoice-to-Voucher Report", "vat_vouchers"),
+    ("VAT Dashboard", "vat_dashboard"),
+    ("Review Journal Entries", "journal_review"),
 ]
-for text, script in buttons:
-    tk.Button(root, text=text, width=28, command=lambda s=script: run(s)).pack(padx=16, pady=8)
+for text, module_name in buttons:
+    tk.Button(root, text=text, width=28, command=lambda m=module_name: run(m)).pack(padx=16, pady=8)
+
+tk.Label(root, text="Entries are saved to MySQL (Docker) in the background.").pack(pady=(6,0))
+journal_label = tk.Label(root, text="")
+journal_label.pack(pady=(0,12))
+
+def show_journal_status():
+    # the syncer starts with the first call to journal.default()
+    journal_label.config(text=journal.status_text())
+    root.after(2000, show_journal_status)
 
-tk.Label(root, text="MySQL must be running (Docker).").pack(pady=(6,12))
-root.mainloop()
\ No newline at end of file
+show_journal_status()
+root.mainloop()
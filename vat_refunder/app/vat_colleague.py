@@ -2,41 +2,24 @@
 
 import os
 import csv
-from contextlib import contextmanager
-from mysql.connector import Error
-from db import get_cnx  # central DB connector
-from tkinter import Tk, Label, Button, Entry, StringVar, LEFT, RIGHT, E, W, N, S, END
-from tkinter import messagebox, filedialog
+from concurrent.futures import ProcessPoolExecutor
+from db import db_cursor  # shared pooled DB connector
 import time
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import mm
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+import report_pdf  # shared page numbering
+import export_changes  # watermarks for "changes since the last export"
+import report_jobs  # background thread, progress and cancel
+# tkinter / progress_dialog are imported in the GUI functions: the workers run headless too
 from datetime import datetime
 
-# ==========================================================
-# Context manager for automatic cleanup
-# ==========================================================
-@contextmanager
-def db_cursor(commit=False):
-    cnx = get_cnx()
-    cur = cnx.cursor()
-    try:
-        yield cur
-        if commit:
-            cnx.commit()
-    except Exception as e:
-        cnx.rollback()
-        raise e
-    finally:
-        cur.close()
-        cnx.close()
-
 # ==========================================================
 # Define output directory
 # ==========================================================
-DEFAULT_OUTPUT_DIR = "~Desktop/exports"
+DEFAULT_OUTPUT_DIR = os.path.expanduser("~/Desktop/exports")
 
 # Global variable for output directory (user can browse)
 OUTPUT_DIR = DEFAULT_OUTPUT_DIR
@@ -45,70 +28,115 @@ OUTPUT_DIR = DEFAULT_OUTPUT_DIR
 # Define functions
 # ==========================================================
 
-def fetch_data(Colleague_ID, quarter, fiscal_year):
-    try:
-        with db_cursor(commit=False) as cur:
-            cur.callproc('GetRelFactColleague', [Colleague_ID, quarter, fiscal_year])
-            data = []
-            for result in cur.stored_results():
-                data = result.fetchall()
-            return data
-    except Error as e:
-        messagebox.showerror("Error", f"Error: {e}")
-
-def generate_csv(data, output_file):
+def fetch_rows(Colleague_ID, quarter, fiscal_year, progress=None):
+    """Rows of GetRelFactColleague; raises mysql Error (report_jobs.Cancelled when cancelled)."""
+    with db_cursor(commit=False) as cur, report_jobs.tracked(cur, progress):
+        cur.callproc('GetRelFactColleague', [Colleague_ID, quarter, fiscal_year])
+        data = []
+        for result in cur.stored_results():
+            data = result.fetchall()
+    if progress is not None:
+        progress.add_rows(len(data))
+    return data
+
+# GetRelFactColleague has no change columns of its own; its rows are matched to
+# Invoices_Personal by invoice number (row[5]).
+CHANGED_PERSONAL_QUERY = """
+SELECT Number, Created_At > %s AS Is_New
+FROM Invoices_Personal
+WHERE Updated_At > %s
+"""
+
+COLLEAGUE_IDS_QUERY = "SELECT Number, Colleague_ID FROM Invoices_Personal WHERE Number IN ({numbers})"
+ID_LOOKUP_CHUNK = 1000
+
+def colleague_ids(rows):
+    """{invoice number: Colleague_ID} for the personal invoices in *rows*; raises mysql Error."""
+    numbers = list(dict.fromkeys(str(row[5]) for row in rows))
+    ids = {}
+    with db_cursor(commit=False) as cur:
+        for start in range(0, len(numbers), ID_LOOKUP_CHUNK):
+            chunk = numbers[start:start + ID_LOOKUP_CHUNK]
+            cur.execute(COLLEAGUE_IDS_QUERY.format(numbers=", ".join(["%s"] * len(chunk))), chunk)
+            ids.update((str(number), colleague_id) for number, colleague_id in cur.fetchall())
+    return ids
+
+def changed_numbers(Colleague_ID, since):
+    """{invoice number: is_new} of personal invoices changed after *since*; raises mysql Error."""
+    query, params = CHANGED_PERSONAL_QUERY, [since, since]
+    if Colleague_ID is not None:
+        query += " AND Colleague_ID = %s"
+        params.append(Colleague_ID)
+    with db_cursor(commit=False) as cur:
+        cur.execute(query, params)
+        return {str(number): bool(is_new) for number, is_new in cur.fetchall()}
+
+def write_csv(data, output_file):
     """
-    Generate CSV summary per Agencia Tributaria guidelines:
+    Write the CSV summary per Agencia Tributaria guidelines:
     Nif Proveedor; Importe total (impuestos incluidos); Nº factura; Cuota IVA; Fecha devengo
-    """
-    if not data:
-        return
 
-    valid_data = [row for row in data if len(row) >= 13]
-    if not valid_data:
-        return
-
-    try:
-        with open(output_file, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile, delimiter=";")
-            for row in valid_data:
-                nif = str(row[3])
-                total = f"{float(row[6]):.2f}".rstrip("0").rstrip(".")
-                invoice_no = str(row[5])
-                iva = f"{float(row[8]):.2f}".rstrip("0").rstrip(".")
-                try:
-                    fecha_obj = datetime.strptime(str(row[7]), "%Y-%m-%d")
-                    fecha = fecha_obj.strftime("%d-%m-%Y")
-                except Exception:
-                    fecha = str(row[7])
-                writer.writerow([nif, total, invoice_no, iva, fecha])
-        messagebox.showinfo("CSV Generated", f"CSV summary generated: {output_file}")
-    except Exception as e:
-        messagebox.showerror("CSV Generation Error", f"Error generating CSV: {e}")
-
-def generate_pdf(data, output_file):
-    if not data:
-        messagebox.showinfo("No Data", "No data available to generate the report.")
-        return
-
-    valid_data = [row for row in data if len(row) >= 13]
+    Returns the number of rows written (0 writes no file). Raises on failure.
+    """
+    valid_data = [row for row in data or [] if len(row) >= 13]
     if not valid_data:
-        messagebox.showinfo("No Valid Data", "No valid data rows found. Skipping PDF generation.")
-        return
-
-    doc = SimpleDocTemplate(output_file, pagesize=A4)
+        return 0
+
+    with open(output_file, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile, delimiter=";")
+        for row in valid_data:
+            nif = str(row[3])
+            total = f"{float(row[6]):.2f}".rstrip("0").rstrip(".")
+            invoice_no = str(row[5])
+            iva = f"{float(row[8]):.2f}".rstrip("0").rstrip(".")
+            try:
+                fecha_obj = datetime.strptime(str(row[7]), "%Y-%m-%d")
+                fecha = fecha_obj.strftime("%d-%m-%Y")
+            except Exception:
+                fecha = str(row[7])
+            writer.writerow([nif, total, invoice_no, iva, fecha])
+    return len(valid_data)
+
+def group_by_period(rows):
+    """{(quarter, fiscal_year): [rows]} in one pass, periods in sorted order."""
+    periods = {}
+    for row in rows:
+        periods.setdefault((row[11], row[12]), []).append(row)
+    return dict(sorted(periods.items()))
+
+def group_by_colleague(rows):
+    """{(name, NIE): [rows]} in one pass, keeping the query's row order."""
+    colleagues = {}
+    for row in rows:
+        if len(row) >= 13:
+            colleagues.setdefault((row[0], row[1]), []).append(row)
+    return colleagues
+
+def colleague_reports(rows):
+    """
+    [(Colleague_ID, rows)] per colleague, for the all-colleagues reports.
+    The ID goes into the file names, so two colleagues with the same name do
+    not write the same files; the NIE stands in for an ID that cannot be
+    looked up. Raises mysql Error.
+    """
+    colleagues = group_by_colleague(rows)
+    ids = colleague_ids([row for group in colleagues.values() for row in group]) if colleagues else {}
+    reports = []
+    for (_, nie), group in colleagues.items():
+        colleague_id = ids.get(str(group[0][5]))
+        reports.append((colleague_id if colleague_id is not None else str(nie).replace(" ", ""), group))
+    return reports
+
+def render_pdf(valid_data, output_file, progress=None):
+    """Build the PDF (one section per quarter) without dialogs; raises on failure."""
+    doc = SimpleDocTemplate(output_file, pagesize=A4, subject=report_pdf.generated_subject())
     elements = []
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(name='QuarterHeader', parent=styles['Heading2'], alignment=1, spaceAfter=10))
     styles.add(ParagraphStyle(name='TableHeader', parent=styles['Normal'], fontSize=9, leading=12, alignment=1, textColor=colors.white))
     styles.add(ParagraphStyle(name='TableCell', parent=styles['Normal'], fontSize=8, leading=10))
 
-    quarters = sorted(set((row[11], row[12]) for row in valid_data))
-
-    for quarter, fiscal_year in quarters:
-        quarter_data = [row for row in valid_data if row[11] == quarter and row[12] == fiscal_year]
-        if not quarter_data:
-            continue
+    for (quarter, fiscal_year), quarter_data in group_by_period(valid_data).items():
         if elements:
             elements.append(PageBreak())
         colleague_name = quarter_data[0][0]
@@ -157,64 +185,188 @@ def generate_pdf(data, output_file):
         elements.append(Spacer(1, 12))
         elements.append(Paragraph(f"<b>Total Cuotas IVA para Trimestre {quarter}: € {vat_total:,.2f}</b>", styles['Normal']))
 
-    try:
-        doc.build(elements)
-        messagebox.showinfo("Report Generated", f"PDF report generated: {output_file}")
-    except Exception as e:
-        messagebox.showerror("PDF Generation Error", f"An error occurred: {e}")
-
-def generate_report(Colleague_ID, quarter, fiscal_year):
-    data = fetch_data(Colleague_ID, quarter, fiscal_year)
-    if not data:
-        messagebox.showwarning("No Data", "No data found for the provided criteria.")
-        return
+    doc.build(elements, canvasmaker=report_pdf.canvas_maker(progress))
 
+def report_filenames(data, quarter, fiscal_year, Colleague_ID=None):
+    """(pdf, csv) file names for a colleague's report, from the first row's name
+    and, when given, the Colleague_ID (names are not unique)."""
     colleague_full_name = data[0][0]
     name_parts = colleague_full_name.strip().split()
     name = name_parts[0]
     surname = "_".join(name_parts[1:]) if len(name_parts) > 1 else ""
-
     name_sanitized = name.replace(" ", "_")
     surname_sanitized = surname.replace(" ", "_")
-
     quarter_str = f"Q{quarter}" if quarter else "AllQuarters"
     fiscal_year_str = str(fiscal_year) if fiscal_year else "AllYears"
+    id_str = f"_{Colleague_ID}" if Colleague_ID is not None else ""
+    pdf_filename = f"RelFactColleague_report_{name_sanitized}_{surname_sanitized}{id_str}_{quarter_str}_{fiscal_year_str}.pdf"
+    csv_filename = f"RelFactColleague_summary_{name_sanitized}_{surname_sanitized}{id_str}_{quarter_str}_{fiscal_year_str}.csv"
+    return pdf_filename, csv_filename
 
-    pdf_filename = f"RelFactColleague_report_{name_sanitized}_{surname_sanitized}_{quarter_str}_{fiscal_year_str}.pdf"
-    csv_filename = f"RelFactColleague_summary_{name_sanitized}_{surname_sanitized}_{quarter_str}_{fiscal_year_str}.csv"
+def _period_totals(valid_data):
+    """(rows, VAT) of a full report, stored with the export watermark."""
+    return len(valid_data), sum(float(row[8] or 0) for row in valid_data)
 
-    output_pdf = os.path.join(OUTPUT_DIR, pdf_filename)
-    output_csv = os.path.join(OUTPUT_DIR, csv_filename)
+def build_report(Colleague_ID, quarter, fiscal_year, output_dir, progress=None):
+    """
+    Worker: PDF + CSV for one colleague (or all, Colleague_ID None) without
+    dialogs. Returns (pdf, csv, rows); rows 0 means no data and no files.
+    """
+    export = export_changes.start("colleague", quarter, fiscal_year, Colleague_ID)
+    valid_data = [row for row in fetch_rows(Colleague_ID, quarter, fiscal_year, progress) if len(row) >= 13]
+    if not valid_data:
+        return None, None, 0
+    pdf_filename, csv_filename = report_filenames(valid_data, quarter, fiscal_year, Colleague_ID)
+    output_pdf = os.path.join(output_dir, pdf_filename)
+    output_csv = os.path.join(output_dir, csv_filename)
+    with report_jobs.removed_on_failure(output_pdf, output_csv):
+        render_pdf(valid_data, output_pdf, progress)
+        write_csv(valid_data, output_csv)
+    if export:
+        export.totals = _period_totals(valid_data)
+        export.commit()
+    return output_pdf, output_csv, len(valid_data)
+
+def build_changes_report(Colleague_ID, quarter, fiscal_year, output_dir, progress=None):
+    """
+    Worker: the rows whose personal invoice was added or edited since the
+    last export, as *_changes.pdf/.csv plus a _changes.txt summary.
+    Returns the export_changes summary.
+    """
+    export = export_changes.Export("colleague", quarter, fiscal_year, Colleague_ID)
+    valid_data = [row for row in fetch_rows(Colleague_ID, quarter, fiscal_year, progress) if len(row) >= 13]
+    changed = changed_numbers(Colleague_ID, export.since)
+    export.totals = _period_totals(valid_data)
+    rows = [row for row in valid_data if str(row[5]) in changed]
+    new = sum(changed[str(row[5])] for row in rows)
+    summary = export.summary(new, len(rows) - new)
+
+    paths = [os.path.join(output_dir, f"RelFactColleague_changes_{Colleague_ID or 'all'}.txt")]
+    if rows:
+        pdf_filename, csv_filename = report_filenames(rows, quarter, fiscal_year, Colleague_ID)
+        pdf_base, csv_base = os.path.splitext(pdf_filename)[0], os.path.splitext(csv_filename)[0]
+        paths = [os.path.join(output_dir, name)
+                 for name in (pdf_base + "_changes.txt", pdf_base + "_changes.pdf", csv_base + "_changes.csv")]
+    with report_jobs.removed_on_failure(*paths):
+        if rows:
+            render_pdf(rows, paths[1], progress)
+            write_csv(rows, paths[2])
+        export_changes.write_summary(summary, paths[0])
+    export.commit()
+    return summary
 
-    generate_pdf(data, output_pdf)
-    generate_csv(data, output_csv)
+# ==========================================================
+# All colleagues: one query, grouped, rendered in parallel
+# ==========================================================
+def _render_colleague(Colleague_ID, rows, quarter, fiscal_year, output_dir):
+    """Worker: write one colleague's PDF + CSV pair; returns (pdf, csv, rows)."""
+    pdf_filename, csv_filename = report_filenames(rows, quarter, fiscal_year, Colleague_ID)
+    output_pdf = os.path.join(output_dir, pdf_filename)
+    output_csv = os.path.join(output_dir, csv_filename)
+    render_pdf(rows, output_pdf)
+    write_csv(rows, output_csv)
+    return output_pdf, output_csv, len(rows)
+
+def generate_all(quarter, fiscal_year, output_dir, workers=None, progress=None):
+    """
+    Fetch every colleague's rows for the period with ONE GetRelFactColleague
+    call (Colleague_ID NULL), group them by colleague, and render the
+    per-colleague PDF/CSV pairs (named with the Colleague_ID) across a
+    process pool.
+
+    Returns (results, errors): results are (name, pdf, csv, rows) tuples,
+    errors are (name, message). Raises mysql Error if the fetch fails, and
+    report_jobs.Cancelled (dropping the reports not started yet) on cancel.
+    """
+    colleagues = colleague_reports(fetch_rows(None, quarter, fiscal_year, progress))
+    results, errors = [], []
+    if not colleagues:
+        return results, errors
+    workers = min(workers or os.cpu_count() or 1, len(colleagues))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (rows[0][0], pool.submit(_render_colleague, colleague_id, rows, quarter, fiscal_year, output_dir))
+            for colleague_id, rows in colleagues
+        ]
+        try:
+            for done, (name, fut) in enumerate(futures, 1):
+                try:
+                    results.append((name,) + fut.result())
+                except Exception as e:
+                    errors.append((name, str(e)))
+                if progress is not None:
+                    progress.set_stage(f"Colleague reports: {done} / {len(futures)}")
+        except report_jobs.Cancelled:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    return results, errors
+
+def select_and_generate_all():
+    from tkinter import messagebox
+    import progress_dialog
+    period = _period_inputs()
+    if period is None:
+        return
+    quarter, fiscal_year = period
+    try:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+    except OSError as e:
+        messagebox.showerror("Error", f"Error: {e}")
+        return
+    output_dir = OUTPUT_DIR
 
-def select_and_generate_report():
-    Colleague_ID_input = Colleague_ID_var.get().strip()
+    def done(outcome):
+        results, errors = outcome
+        if not results and not errors:
+            messagebox.showwarning("No Data", "No data found for the provided criteria.")
+            return
+        summary = f"{len(results)} colleague reports generated in:\n{output_dir}"
+        if errors:
+            summary += "\n\nFailed:\n" + "\n".join(f"{name}: {msg}" for name, msg in errors)
+            messagebox.showwarning("Reports Generated With Errors", summary)
+        else:
+            messagebox.showinfo("Reports Generated", summary)
+
+    progress_dialog.run(window, "Generating colleague reports",
+                        lambda progress: generate_all(quarter, fiscal_year, output_dir, progress=progress), done)
+
+def _period_inputs():
+    """(quarter, fiscal_year) from the form (None = all); None after an error dialog."""
+    from tkinter import messagebox
     quarter_input = quarter_var.get().strip()
     fiscal_year_input = fiscal_year_var.get().strip()
-
-    try:
-        Colleague_ID = int(Colleague_ID_input) if Colleague_ID_input else None
-    except ValueError:
-        messagebox.showerror("Invalid Input", "Colleague ID must be an integer.")
-        return
     try:
         quarter = int(quarter_input) if quarter_input else None
     except ValueError:
         messagebox.showerror("Invalid Input", "Quarter must be 1–4.")
-        return
+        return None
     try:
         fiscal_year = int(fiscal_year_input) if fiscal_year_input else None
     except ValueError:
         messagebox.showerror("Invalid Input", "Fiscal Year must be valid.")
-        return
+        return None
     if quarter is not None and not (1 <= quarter <= 4):
         messagebox.showerror("Invalid Input", "Quarter must be between 1 and 4.")
-        return
+        return None
     if fiscal_year is not None and not (1900 <= fiscal_year <= 2100):
         messagebox.showerror("Invalid Input", "Fiscal Year must be 1900–2100.")
+        return None
+    return quarter, fiscal_year
+
+def select_and_generate_report():
+    from tkinter import messagebox
+    import progress_dialog
+    Colleague_ID_input = Colleague_ID_var.get().strip()
+
+    try:
+        Colleague_ID = int(Colleague_ID_input) if Colleague_ID_input else None
+    except ValueError:
+        messagebox.showerror("Invalid Input", "Colleague ID must be an integer.")
+        return
+    period = _period_inputs()
+    if period is None:
         return
+    quarter, fiscal_year = period
 
     if not os.path.exists(OUTPUT_DIR):
         try:
@@ -222,17 +374,39 @@ def select_and_generate_report():
         except OSError as e:
             messagebox.showerror("Directory Error", f"Could not create output directory: {e}")
             return
-    generate_report(Colleague_ID, quarter, fiscal_year)
+    output_dir = OUTPUT_DIR
+    if only_changes_var.get():
+        progress_dialog.run(
+            window, "Exporting changes",
+            lambda progress: build_changes_report(Colleague_ID, quarter, fiscal_year, output_dir, progress),
+            lambda summary: messagebox.showinfo(
+                "Changes Exported", "\n".join(export_changes.format_summary(summary)) + f"\n\nSaved to:\n{output_dir}"))
+    else:
+        progress_dialog.run(
+            window, "Generating report",
+            lambda progress: build_report(Colleague_ID, quarter, fiscal_year, output_dir, progress),
+            _show_report_result)
+
+def _show_report_result(result):
+    from tkinter import messagebox
+    output_pdf, output_csv, rows = result
+    if not rows:
+        messagebox.showwarning("No Data", "No data found for the provided criteria.")
+    else:
+        messagebox.showinfo("Report Generated", f"PDF report generated: {output_pdf}\nCSV summary generated: {output_csv}")
 
 def browse_directory():
     global OUTPUT_DIR
+    from tkinter import filedialog
     directory = filedialog.askdirectory(initialdir=DEFAULT_OUTPUT_DIR, title="Select Output Directory")
     if directory:
         OUTPUT_DIR = directory
         output_dir_var.set(OUTPUT_DIR)
 
-def main():
-    root = Tk()
+def main(master=None):
+    from tkinter import Tk, Toplevel, Label, Button, Entry, StringVar, IntVar, Checkbutton, E, W
+    global window
+    root = window = Toplevel(master) if master is not None else Tk()
     root.title("Generate RelFactColleague Report")
 
     root.columnconfigure(1, weight=1)
@@ -259,10 +433,19 @@ def main():
     Entry(root, textvariable=output_dir_var, state="readonly").grid(row=3, column=1, padx=10, pady=5, sticky=W+E)
     Button(root, text="Browse", command=browse_directory).grid(row=3, column=2, padx=5, pady=5)
 
+    global only_changes_var
+    only_changes_var = IntVar(value=0)
+    Checkbutton(root, text="Only changes since the last export", variable=only_changes_var).grid(
+        row=4, column=0, columnspan=3, pady=(10, 0))
+
     generate_button = Button(root, text="Generate Report", command=select_and_generate_report)
-    generate_button.grid(row=4, column=0, columnspan=3, pady=15)
+    generate_button.grid(row=5, column=0, columnspan=3, pady=(15, 5))
+    Button(root, text="Generate for All Colleagues", command=select_and_generate_all).grid(
+        row=6, column=0, columnspan=3, pady=(0, 15))
 
-    root.mainloop()
+    if master is None:
+        root.mainloop()
+    return root
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+VAT dashboard: quarter and year totals per entity from the rollup tables.
+
+Vat_Rollup_Quarter and Vat_Rollup_Supplier (db/init/003_vat_rollups.sql) are
+kept current by triggers on the invoice tables, so every figure here is a
+primary-key range read of a handful of rows, not a scan over the invoices.
+Only refundable invoices are counted, as in the reports.
+"""
+
+from tkinter import Tk, Toplevel, Label, Button, OptionMenu, StringVar, Frame, ttk, messagebox
+from datetime import datetime
+from mysql.connector import Error
+from db import db_cursor  # shared pooled DB connector
+
+ENTITIES = ("Chancery", "Residence", "Personal")
+TOP_SUPPLIERS = 20
+
+# ==========================================================
+# Queries
+# ==========================================================
+YEARS_QUERY = "SELECT DISTINCT Year FROM Vat_Rollup_Quarter WHERE Year > 0 ORDER BY Year DESC"
+
+QUARTER_TOTALS_QUERY = """
+SELECT Entity, Quarter, Invoice_Count, Total, Vat
+FROM Vat_Rollup_Quarter
+WHERE Year = %s AND Refundable = %s AND Invoice_Count <> 0
+"""
+
+TOP_SUPPLIERS_QUERY = """
+SELECT r.Entity, COALESCE(n.Supplier_Name, '(no supplier)'), r.Invoice_Count, r.Total, r.Vat
+FROM Vat_Rollup_Supplier r
+LEFT JOIN NIF_Codes n ON n.Supplier_ID = r.Supplier_ID
+WHERE r.Year = %s AND r.Quarter = %s AND r.Refundable = %s AND r.Invoice_Count <> 0
+ORDER BY r.Vat DESC
+LIMIT %s
+"""
+
+
+def available_years():
+    with db_cursor() as cur:
+        cur.execute(YEARS_QUERY)
+        return [row[0] for row in cur.fetchall()]
+
+
+def quarter_totals(year, refundable=1):
+    """{(entity, quarter): (invoices, total, vat)} for one year."""
+    with db_cursor() as cur:
+        cur.execute(QUARTER_TOTALS_QUERY, (year, refundable))
+        return {(entity, q): (n, total, vat) for entity, q, n, total, vat in cur.fetchall()}
+
+
+def top_suppliers(year, quarter, limit=TOP_SUPPLIERS, refundable=1):
+    """[(entity, supplier, invoices, total, vat)] with the most VAT in the period."""
+    with db_cursor() as cur:
+        cur.execute(TOP_SUPPLIERS_QUERY, (year, quarter, refundable, limit))
+        return cur.fetchall()
+
+
+# ==========================================================
+# GUI
+# ==========================================================
+def _money(x):
+    return f"{x:,.2f}"
+
+
+def main(master=None):
+    """Build the dashboard; as a Toplevel of *master* when opened from the launcher."""
+    root = Toplevel(master) if master is not None else Tk()
+    root.title("VAT Dashboard")
+
+    try:
+        years = [str(y) for y in available_years()] or [str(datetime.now().year)]
+    except Error as e:
+        messagebox.showerror("Database Error", f"Error: {e}", parent=root)
+        years = [str(datetime.now().year)]
+    year_var = StringVar(value=years[0])
+    quarter_var = StringVar(value=str((datetime.now().month - 1) // 3 + 1))
+
+    bar = Frame(root)
+    bar.pack(fill="x", padx=10, pady=8)
+    Label(bar, text="Year").pack(side="left")
+    OptionMenu(bar, year_var, *years).pack(side="left", padx=(4, 12))
+    Label(bar, text="Suppliers for quarter").pack(side="left")
+    OptionMenu(bar, quarter_var, "1", "2", "3", "4").pack(side="left", padx=4)
+
+    columns = ("period", "entity", "invoices", "total", "vat")
+    totals = ttk.Treeview(root, columns=columns, show="headings", height=18)
+    for col, title, width in zip(columns, ("Period", "Entity", "Invoices", "Total (€)", "Cuota IVA (€)"),
+                                 (80, 100, 80, 120, 120)):
+        totals.heading(col, text=title)
+        totals.column(col, width=width, anchor="w" if col in ("period", "entity") else "e")
+    totals.pack(fill="both", expand=True, padx=10)
+
+    sup_columns = ("entity", "supplier", "invoices", "total", "vat")
+    suppliers = ttk.Treeview(root, columns=sup_columns, show="headings", height=10)
+    for col, title, width in zip(sup_columns, ("Entity", "Supplier", "Invoices", "Total (€)", "Cuota IVA (€)"),
+                                 (90, 240, 70, 110, 110)):
+        suppliers.heading(col, text=title)
+        suppliers.column(col, width=width, anchor="w" if col in ("entity", "supplier") else "e")
+    suppliers.pack(fill="both", expand=True, padx=10, pady=(8, 0))
+
+    def refresh(*_):
+        year = int(year_var.get())
+        try:
+            by_quarter = quarter_totals(year)
+            top = top_suppliers(year, int(quarter_var.get()))
+        except Error as e:
+            messagebox.showerror("Database Error", f"Error: {e}", parent=root)
+            return
+
+        totals.delete(*totals.get_children())
+        year_sum = {}
+        for q in (1, 2, 3, 4):
+            for entity in ENTITIES:
+                n, total, vat = by_quarter.get((entity, q), (0, 0, 0))
+                ys = year_sum.setdefault(entity, [0, 0, 0])
+                ys[0] += n
+                ys[1] += total
+                ys[2] += vat
+                totals.insert("", "end", values=(f"Q{q} {year}", entity, n, _money(total), _money(vat)))
+        for entity in ENTITIES:
+            n, total, vat = year_sum[entity]
+            totals.insert("", "end", values=(f"Year {year}", entity, n, _money(total), _money(vat)))
+
+        suppliers.delete(*suppliers.get_children())
+        for entity, name, n, total, vat in top:
+            suppliers.insert("", "end", values=(entity, name, n, _money(total), _money(vat)))
+
+    year_var.trace_add("write", refresh)
+    quarter_var.trace_add("write", refresh)
+    Button(root, text="Refresh", command=refresh).pack(pady=8)
+    refresh()
+
+    if master is None:
+        root.mainloop()
+    return root
+
+
+if __name__ == "__main__":
+    main()
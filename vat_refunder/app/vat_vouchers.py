@@ -2,55 +2,17 @@
 import os, csv
 from pathlib import Path
 from datetime import datetime
-from contextlib import contextmanager
-from mysql.connector import Error
-from db import get_cnx  # central DB connector
-from tkinter import Tk, Label, Button, OptionMenu, StringVar, Radiobutton, IntVar, messagebox
+import queries  # prepared report selects (one parse per pooled connection)
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib import colors
 from reportlab.lib.units import mm
-from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer, PageBreak
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_RIGHT
-from reportlab.pdfgen import canvas
-
-# ==========================================================
-# Context manager for automatic cleanup
-# ==========================================================
-@contextmanager
-def db_cursor(commit=False):
-    cnx = get_cnx()
-    cur = cnx.cursor()
-    try:
-        yield cur
-        if commit:
-            cnx.commit()
-    except Exception as e:
-        cnx.rollback()
-        raise e
-    finally:
-        cur.close()
-        cnx.close()
-
-# ==========================================================
-# Canvas with Page Numbers
-# ==========================================================
-
-class NumberedCanvas(canvas.Canvas):
-    def __init__(self,*a,**k):
-        super().__init__(*a,**k); self._saved=[]
-    def showPage(self):
-        self._saved.append(dict(self.__dict__)); self._startPage()
-    def save(self):
-        n=len(self._saved)
-        for st in self._saved:
-            self.__dict__.update(st); self._draw(n); super().showPage()
-        super().save()
-    def _draw(self,n):
-        ts=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        w,h=self._pagesize
-        self.setFont("Helvetica",6); self.drawString(15*mm,h-10*mm,f"Generated on: {ts}")
-        self.setFont("Helvetica",8); self.drawCentredString(w/2,15*mm,f"{self._pageNumber}/{n}")
+import report_pdf  # shared table rendering and page numbering
+import report_cache  # skip rebuilding reports whose data has not changed
+import export_changes  # watermarks for "changes since the last export"
+import report_jobs  # background thread, progress and cancel
+# tkinter / progress_dialog are imported in main(): the build_* workers run headless too
 
 # ==========================================================
 # Output Directory setup
@@ -79,56 +41,94 @@ WHERE i.Quarter = %s AND i.Year = %s AND i.Refundable = 1
 ORDER BY i.Date, i.Number
 """
 
-def fetch(table, q, y):
-    try:
-        with db_cursor(commit=False) as cur:
-            cur.execute(BASE_QUERY.format(table=table),(q,y))
-            rows=cur.fetchall(); cur.close(); return rows
-    except Error as e:
-        messagebox.showerror("Error", f"Error: {e}")
-  
+TABLES = (("Chancery", "Invoices_Chancery"), ("Residence", "Invoices_Residence"))
+
+# Rows changed since the last export: the invoice itself changed (IDX_I*_Changes
+# range), or the voucher it points to did (IDX_Vouchers_Updated range).
+# Same columns as BASE_QUERY plus Is_New; UNION drops rows found both ways.
+CHANGES_SELECT = """
+SELECT
+  n.Supplier_Name          AS Proveedor,
+  i.`Number`               AS Numero_Factura,
+  i.Date                   AS Fecha_Devengo,
+  i.Total                  AS Importe_Total_Impuestos_Incluidos,
+  i.Vat                    AS Cuotas_IVA,
+  v.Voucher_Number,
+  ha.Name                  AS Head_of_Accounts,
+  i.Created_At > %s        AS Is_New
+"""
+
+CHANGES_QUERY = CHANGES_SELECT + """
+FROM {table} i
+LEFT JOIN NIF_Codes       n  ON i.Supplier_ID = n.Supplier_ID
+LEFT JOIN Vouchers        v  ON i.Voucher_ID = v.Voucher_ID
+LEFT JOIN Head_of_Accounts ha ON v.Head_of_Accounts_ID = ha.Head_of_Accounts_ID
+WHERE i.Quarter = %s AND i.Year = %s AND i.Refundable = 1 AND i.Updated_At > %s
+UNION
+""" + CHANGES_SELECT + """
+FROM Vouchers v
+JOIN {table} i            ON i.Voucher_ID = v.Voucher_ID
+LEFT JOIN NIF_Codes       n  ON i.Supplier_ID = n.Supplier_ID
+LEFT JOIN Head_of_Accounts ha ON v.Head_of_Accounts_ID = ha.Head_of_Accounts_ID
+WHERE v.Updated_At > %s AND i.Quarter = %s AND i.Year = %s AND i.Refundable = 1
+ORDER BY Fecha_Devengo, Numero_Factura
+"""
+
+FETCH_BATCH = 500  # rows per fetchmany(), one progress update each
+
+def _fetch(cur, progress):
+    rows=[]
+    while True:
+        batch=cur.fetchmany(FETCH_BATCH)
+        if not batch: return rows
+        rows.extend(batch)
+        if progress is not None: progress.add_rows(len(batch))
+
+def fetch_rows(table, q, y, progress=None):
+    """Rows for one table and period; raises mysql Error (report_jobs.Cancelled when cancelled)."""
+    with queries.session() as s, report_jobs.tracked(s.cursor, progress):
+        return _fetch(s.execute(BASE_QUERY.format(table=table), (q,y)), progress)
+
+def fetch_changes(table, q, y, since, progress=None):
+    """Rows of the period added or changed after *since*, plus Is_New; raises mysql Error."""
+    with queries.session() as s, report_jobs.tracked(s.cursor, progress):
+        return _fetch(s.execute(CHANGES_QUERY.format(table=table), (since, q, y, since, since, since, q, y)), progress)
+
 # ==========================================================
 # PDF helpers
 # ==========================================================
 
-styles=getSampleStyleSheet()
+styles=report_pdf.STYLES
 total_style=ParagraphStyle(name='Total', parent=styles['Normal'], fontSize=9, alignment=TA_RIGHT, spaceAfter=8)
 
 HEADERS = [
     "Proveedor","Nº Factura","Fecha Devengo","Importe Total (€)","Cuota IVA (€)","Voucher Nº","Head of Accounts"
 ]
 COLS = [50*mm,35*mm,25*mm,28*mm,25*mm,25*mm,35*mm]
+WRAP_COLS = (0, 1, 6)  # Proveedor, Nº Factura, Head of Accounts
+TABLE_STYLE = report_pdf.table_style()
 
-def table_for(data):
-    tdata=[[Paragraph(h, styles['Heading4']) for h in HEADERS]]
+def pdf_rows(data):
     for r in data:
-        tdata.append([
-            Paragraph(str(r[0] or ""), styles['Normal']),
-            Paragraph(str(r[1] or ""), styles['Normal']),
-            Paragraph(str(r[2] or ""), styles['Normal']),
-            Paragraph(f"{(r[3] or 0):,.2f}", styles['Normal']),
-            Paragraph(f"{(r[4] or 0):,.2f}", styles['Normal']),
-            Paragraph("" if r[5] is None else str(r[5]), styles['Normal']),
-            Paragraph(str(r[6] or ""), styles['Normal']),
-        ])
-    t=Table(tdata, colWidths=COLS, repeatRows=1)
-    t.setStyle(TableStyle([
-        ('BACKGROUND',(0,0),(-1,0),colors.lightblue),
-        ('TEXTCOLOR',(0,0),(-1,0),colors.white),
-        ('FONTNAME',(0,0),(-1,0),'Helvetica-Bold'),
-        ('GRID',(0,0),(-1,-1),0.25,colors.grey),
-        ('FONTSIZE',(0,0),(-1,-1),8),
-        ('VALIGN',(0,0),(-1,-1),'TOP'),
-        ('ROWBACKGROUNDS',(0,1),(-1,-1),[colors.white, colors.whitesmoke]),
-    ]))
-    return t
-
-def build_pdf(ch_data, rs_data, out_file, year, quarter):
-    if not ch_data and not rs_data:
-        messagebox.showinfo("No Data","No data for the selected period."); return
+        yield [
+            str(r[0] or ""), str(r[1] or ""), str(r[2] or ""),
+            f"{(r[3] or 0):,.2f}", f"{(r[4] or 0):,.2f}",
+            "" if r[5] is None else str(r[5]), str(r[6] or ""),
+        ]
+
+def tables_for(data, chunk_rows):
+    return report_pdf.chunked_tables(HEADERS, pdf_rows(data), COLS, TABLE_STYLE,
+                                     wrap_cols=WRAP_COLS, chunk_rows=chunk_rows)
+
+def render_pdf(ch_data, rs_data, out_file, year, quarter, progress=None):
+    """Build the PDF without any dialogs; raises on failure. *progress* hears about every page."""
     doc=BaseDocTemplate(out_file, pagesize=landscape(A4),
-                        rightMargin=15*mm,leftMargin=15*mm,topMargin=15*mm,bottomMargin=15*mm)
+                        rightMargin=15*mm,leftMargin=15*mm,topMargin=15*mm,bottomMargin=15*mm,
+                        subject=report_pdf.generated_subject())
     frame=Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height-20*mm)
+    chunk_rows=report_pdf.rows_per_page(doc.height-20*mm)
+    if progress is not None:
+        progress.expect_pages(sum(-(-len(rows or ())//chunk_rows) for rows in (ch_data, rs_data)))
     def header(c,_):
         c.saveState(); c.setFont('Helvetica-Bold',12)
         c.drawString(doc.leftMargin, landscape(A4)[1]-20*mm, f"Modelo 362 – Q{quarter} {year}")
@@ -139,7 +139,7 @@ def build_pdf(ch_data, rs_data, out_file, year, quarter):
     if ch_data:
         elems.append(Paragraph("Relación de Facturas – Chancery", styles['Title']))
         elems.append(Spacer(1,6))
-        elems.append(table_for(ch_data))
+        elems.extend(tables_for(ch_data, chunk_rows))
         ch_total=sum((r[4] or 0) for r in ch_data)
         elems.append(Spacer(1,6))
         elems.append(Paragraph(f"<b>Total Cuotas IVA (Chancery): € {ch_total:,.2f}</b>", total_style))
@@ -147,13 +147,12 @@ def build_pdf(ch_data, rs_data, out_file, year, quarter):
         if ch_data: elems.append(PageBreak())
         elems.append(Paragraph("Relación de Facturas – Residence", styles['Title']))
         elems.append(Spacer(1,6))
-        elems.append(table_for(rs_data))
+        elems.extend(tables_for(rs_data, chunk_rows))
         rs_total=sum((r[4] or 0) for r in rs_data)
         elems.append(Spacer(1,6))
         elems.append(Paragraph(f"<b>Total Cuotas IVA (Residence): € {rs_total:,.2f}</b>", total_style))
 
-    doc.build(elems, canvasmaker=NumberedCanvas)
-    messagebox.showinfo("Success", f"PDF generated:\n{out_file}")
+    doc.build(elems, canvasmaker=report_pdf.canvas_maker(progress))
 
 # ==========================================================
 # CSV
@@ -166,12 +165,72 @@ def write_csv(rows, path):
         for r in rows:
             rr=list(r); rr[5] = "" if rr[5] is None else rr[5]; w.writerow(rr)
 
+# ==========================================================
+# Report jobs: no dialogs, run on a background thread by the GUI
+# ==========================================================
+def build_pdf_report(q, y, pdf, progress=None):
+    """PDF for the period, from report_cache when unchanged; returns {"rows", "cached"} (rows 0: no data)."""
+    export = export_changes.start("vouchers", q, y)  # before the fetch: later edits count next time
+    outputs = {"pdf": pdf}
+    key = report_cache.key_for("vouchers_pdf", q, y)
+    summary = report_cache.restore(key, outputs)
+    cached = summary is not None
+    if not cached:
+        ch, rs = (fetch_rows(table, q, y, progress) for _, table in TABLES)
+        if not ch and not rs: return {"rows": 0, "cached": False}
+        with report_jobs.removed_on_failure(pdf):
+            render_pdf(ch, rs, pdf, y, q, progress)
+        summary = {"rows": len(ch) + len(rs)}
+        report_cache.save(key, outputs, summary)
+    if export: export.commit()
+    return dict(summary, cached=cached)
+
+def build_csv_report(q, y, cpath, rpath, progress=None):
+    """One CSV per section, from report_cache when unchanged; returns {"chancery", "residence", "cached"} row counts."""
+    export = export_changes.start("vouchers", q, y)
+    outputs = {"chancery": cpath, "residence": rpath}
+    key = report_cache.key_for("vouchers_csv", q, y)
+    summary = report_cache.restore(key, outputs)
+    cached = summary is not None
+    if not cached:
+        ch, rs = (fetch_rows(table, q, y, progress) for _, table in TABLES)
+        with report_jobs.removed_on_failure(cpath, rpath):
+            if ch: write_csv(ch, cpath)
+            if rs: write_csv(rs, rpath)
+        summary = {"chancery": len(ch), "residence": len(rs)}
+        if not ch and not rs: return dict(summary, cached=False)
+        report_cache.save(key, outputs, summary)
+    if export: export.commit()
+    return dict(summary, cached=cached)
+
+def build_changes_report(q, y, base, as_pdf, progress=None):
+    """Changes since the last export: <base>.pdf or <base>_<Section>.csv, plus <base>_changes.txt; returns the summary."""
+    export = export_changes.Export("vouchers", q, y)
+    sections, new = [], 0
+    for name, table in TABLES:
+        rows, n = export_changes.split_new(fetch_changes(table, q, y, export.since, progress))
+        sections.append((name, rows)); new += n
+    (_, ch), (_, rs) = sections
+    summary = export.summary(new, len(ch) + len(rs) - new)
+    paths = [f"{base}.pdf", f"{base}_changes.txt"] + [f"{base}_{name}.csv" for name, _ in TABLES]
+    with report_jobs.removed_on_failure(*paths):
+        if as_pdf:
+            if ch or rs: render_pdf(ch, rs, f"{base}.pdf", y, q, progress)
+        else:
+            for name, rows in sections:
+                if rows: write_csv(rows, f"{base}_{name}.csv")
+        export_changes.write_summary(summary, f"{base}_changes.txt")
+    export.commit()
+    return summary
+
 # ==========================================================
 # GUI
 # ==========================================================
-def main():
-    root=Tk(); root.title("Generate VAT Report (Chancery + Residence)")
-    quarter=StringVar(); year=StringVar(); out=IntVar(value=1)
+def main(master=None):
+    from tkinter import Tk, Toplevel, Label, Button, OptionMenu, StringVar, Radiobutton, IntVar, Checkbutton, messagebox
+    import progress_dialog
+    root=Toplevel(master) if master is not None else Tk(); root.title("Generate VAT Report (Chancery + Residence)")
+    quarter=StringVar(); year=StringVar(); out=IntVar(value=1); only_changes=IntVar(value=0)
 
     Label(root, text="Quarter").pack(pady=4)
     OptionMenu(root, quarter, '1','2','3','4').pack()
@@ -181,27 +240,35 @@ def main():
     Label(root, text="Output").pack(pady=4)
     Radiobutton(root, text="PDF (single file, both sections)", variable=out, value=1).pack()
     Radiobutton(root, text="CSV (two files: Chancery & Residence)", variable=out, value=2).pack()
+    Checkbutton(root, text="Only changes since the last export", variable=only_changes).pack(pady=(8,0))
 
     def run():
         q, yv = quarter.get(), year.get()
         if not q or not yv:
             messagebox.showwarning("Input Required","Select quarter and year"); return
-        ch = fetch("Invoices_Chancery", q, yv)
-        rs = fetch("Invoices_Residence", q, yv)
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         base = f"VatVouchers_Q{q}_{yv}_{ts}"
-        if out.get()==1:
+        if only_changes.get():
+            progress_dialog.run(root, "Exporting changes",
+                                lambda p: build_changes_report(q, yv, str(OUT_DIR / f"{base}_changes"), out.get()==1, p),
+                                lambda summary: messagebox.showinfo("Changes Exported", "\n".join(export_changes.format_summary(summary)) + f"\n\nSaved to:\n{OUT_DIR}"))
+        elif out.get()==1:
             pdf = OUT_DIR / f"{base}.pdf"
-            build_pdf(ch, rs, str(pdf), yv, q)
+            def done(result):
+                if not result["rows"]: messagebox.showinfo("No Data","No data for the selected period.")
+                elif result["cached"]: messagebox.showinfo("Success", f"PDF generated (unchanged data, from cache):\n{pdf}")
+                else: messagebox.showinfo("Success", f"PDF generated:\n{pdf}")
+            progress_dialog.run(root, "Generating PDF", lambda p: build_pdf_report(q, yv, str(pdf), p), done)
         else:
             cpath = OUT_DIR / f"{base}_Chancery.csv"
             rpath = OUT_DIR / f"{base}_Residence.csv"
-            if ch: write_csv(ch, cpath)
-            if rs: write_csv(rs, rpath)
-            messagebox.showinfo("Success", f"CSV saved:\n{cpath if ch else '(no chancery data)'}\n{rpath if rs else '(no residence data)'}")
+            progress_dialog.run(root, "Generating CSV", lambda p: build_csv_report(q, yv, str(cpath), str(rpath), p),
+                                lambda summary: messagebox.showinfo("Success", f"CSV saved:\n{cpath if summary['chancery'] else '(no chancery data)'}\n{rpath if summary['residence'] else '(no residence data)'}"))
 
     Button(root, text="Generate", command=run).pack(pady=14)
-    root.mainloop()
+    if master is None:
+        root.mainloop()
+    return root
 
 if __name__=="__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: autocomplete lookup over N synthetic suppliers.
+
+Compares the old per-keystroke linear scan (lower() + startswith over the
+whole list) with autocomplete.CompletionIndex prefix and substring lookups. The
+substring timings wait for the background trigram build first, so they
+measure indexed lookups only. Needs no database.
+
+Usage:
+  python benchmarks/bench_autocomplete.py [-n 100000] [--queries 500]
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from autocomplete import CompletionIndex, MAX_RESULTS  # noqa: E402
+
+WORDS = ["Limpiezas", "Suministros", "Hotel", "Papelería", "Transportes", "Seguros",
+         "Electricidad", "Madrid", "Iberia", "Consultores", "Gestión", "Servicios",
+         "Restaurante", "Farmacia", "Telefónica", "Taller", "Mantenimiento", "Jardines"]
+SUFFIXES = ["S.L.", "S.A.", "S.L.U.", "C.B.", ""]
+
+
+def synthetic_suppliers(n, rng):
+    names, nifs = [], []
+    for i in range(n):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        names.append(f"{' '.join(words)} {i:06d} {rng.choice(SUFFIXES)}".strip())
+        nifs.append(rng.choice("ABCDEFGHJ") + "".join(rng.choices(string.digits, k=8)))
+    return names, nifs
+
+
+def linear_scan(items, query):
+    value = query.lower()
+    return [item for item in items if item.lower().startswith(value)]
+
+
+def timed(label, fn, queries):
+    t0 = time.perf_counter()
+    for q in queries:
+        fn(q)
+    per = (time.perf_counter() - t0) / len(queries) * 1e6
+    print(f"{label:<28} {per:10.1f} µs/lookup")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", type=int, default=100_000, help="number of suppliers")
+    ap.add_argument("--queries", type=int, default=500)
+    args = ap.parse_args()
+
+    rng = random.Random(42)
+    names, nifs = synthetic_suppliers(args.n, rng)
+    t0 = time.perf_counter()
+    index = CompletionIndex(names, aliases=nifs)
+    print(f"prefix index build:  {args.n:,} entries in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    index.ready.wait()  # the background build must not compete with the timings below
+    t0 = time.perf_counter()
+    index._build_grams()  # what the builder thread runs, timed on its own
+    print(f"trigram index build: {args.n:,} entries in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    prefixes = [rng.choice(names)[: rng.randint(1, 8)] for _ in range(args.queries)]
+    substrings = [rng.choice(names)[3:9] for _ in range(args.queries)]
+    nif_parts = [rng.choice(nifs)[2:7] for _ in range(args.queries)]
+
+    sorted_names = sorted(names, key=str.lower)
+    timed("linear scan (old)", lambda q: linear_scan(sorted_names, q), prefixes[:50])
+    timed("index prefix", lambda q: index.prefix(q, MAX_RESULTS), prefixes)
+    timed("index substring", lambda q: index.substring(q, MAX_RESULTS), substrings)
+    timed("index NIF substring", lambda q: index.substring(q, MAX_RESULTS), nif_parts)
+    timed("index search (combined)", lambda q: index.search(q), prefixes + substrings)
+
+
+if __name__ == "__main__":
+    main()
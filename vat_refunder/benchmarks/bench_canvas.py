@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of page numbering on an N-page report.
+
+Draws N pages of table-like text through the previous NumberedCanvas (a
+copy of the canvas __dict__ per page, replayed in save()) and through
+report_pdf.NumberedCanvas (no per-page snapshot, total as a form XObject),
+measuring peak Python allocations with tracemalloc. Both still grow with
+the page count, since ReportLab keeps the finished page streams until
+save(); the new canvas at about half the slope.
+Needs no database; files go to a temp dir.
+
+Usage:
+  python benchmarks/bench_canvas.py [--pages 2000] [--lines 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from reportlab.lib.units import mm  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+
+from report_pdf import NumberedCanvas  # noqa: E402
+
+
+class SnapshotCanvas(canvas.Canvas):
+    """The old approach, as it was in vat_oficial / vat_vouchers."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved_page_states = []
+
+    def showPage(self):
+        self._saved_page_states.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        num_pages = len(self._saved_page_states)
+        for state in self._saved_page_states:
+            self.__dict__.update(state)
+            self._draw_footer(num_pages)
+            super().showPage()
+        super().save()
+
+    def _draw_footer(self, page_count):
+        w, h = self._pagesize
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.setFont("Helvetica", 6)
+        self.drawString(15 * mm, h - 10 * mm, f"Generated on: {timestamp}")
+        self.setFont("Helvetica", 8)
+        self.drawCentredString(w / 2.0, 15 * mm, f"{self._pageNumber}/{page_count}")
+
+
+def draw_report(canvas_cls, path, pages, lines):
+    c = canvas_cls(path)
+    for page in range(pages):
+        c.setFont("Helvetica", 8)
+        for line in range(lines):
+            c.drawString(20 * mm, 270 * mm - line * 5 * mm,
+                         f"{page:05d}-{line:02d}  B12345678  Suministros Madrid S.L.  F2024-0001234  1,234.56  214.26")
+        c.showPage()
+    c.save()
+
+
+def measure(label, canvas_cls, path, pages, lines):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    draw_report(canvas_cls, path, pages, lines)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = os.path.getsize(path)
+    print(f"{label:<24} {pages:,} pages  peak {peak / 2**20:8.1f} MiB  {elapsed:6.2f} s  file {size / 2**20:6.1f} MiB")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", type=int, default=2000)
+    ap.add_argument("--lines", type=int, default=50, help="text lines per page")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        measure("snapshot per page (old)", SnapshotCanvas, os.path.join(tmp, "old.pdf"), args.pages, args.lines)
+        measure("form XObject total", NumberedCanvas, os.path.join(tmp, "new.pdf"), args.pages, args.lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: PDF report rendering at 1k / 10k / 50k invoice rows.
+
+Renders synthetic rows through vat_oficial.render_pdf and
+vat_vouchers.render_pdf (plain-string cells, page-sized table chunks) and,
+with --baseline, through the previous approach (one Paragraph per cell in a
+single Table) for comparison. Needs no database; files go to a temp dir.
+
+Usage:
+  python benchmarks/bench_pdf.py [--sizes 1000 10000 50000] [--baseline]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from reportlab.lib import colors  # noqa: E402
+from reportlab.lib.pagesizes import A4  # noqa: E402
+from reportlab.lib.styles import getSampleStyleSheet  # noqa: E402
+from reportlab.lib.units import mm  # noqa: E402
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle  # noqa: E402
+
+import vat_oficial  # noqa: E402
+import vat_vouchers  # noqa: E402
+
+WORDS = ["Limpiezas", "Suministros", "Hotel", "Papelería", "Transportes", "Seguros",
+         "Electricidad", "Madrid", "Iberia", "Consultores", "Gestión", "Servicios"]
+HEADS = ["Maintenance", "Utilities", "Representation", "Office Supplies", "Travel"]
+
+
+def synthetic_rows(n, rng):
+    """(oficial rows, voucher rows) with the column layout each report fetches."""
+    oficial, vouchers = [], []
+    start = datetime.date(2024, 1, 1)
+    for i in range(n):
+        # every 20th supplier name is long enough to wrap
+        words = rng.sample(WORDS, 6 if i % 20 == 0 else rng.randint(1, 2))
+        name = f"{' '.join(words)} S.L."
+        date = start + datetime.timedelta(days=i % 90)
+        total = round(rng.uniform(10, 5000), 2)
+        vat = round(total * 0.21 / 1.21, 2)
+        number = f"F{2024}-{i:07d}"
+        oficial.append((f"B{rng.randint(10**7, 10**8 - 1)}", name, number, date, total, vat))
+        vouchers.append((name, number, date, total, vat, 1000 + i // 10, rng.choice(HEADS)))
+    return oficial, vouchers
+
+
+def baseline_pdf(rows, path):
+    """The pre-chunking approach: a Paragraph per cell, one Table for everything."""
+    styles = getSampleStyleSheet()
+    data = [[Paragraph(h, styles["Heading4"]) for h in vat_oficial.PDF_HEADERS]]
+    for serial, r in enumerate(rows, start=1):
+        data.append([Paragraph(str(v), styles["Normal"]) for v in (serial,) + tuple(r)])
+    table = Table(data, colWidths=vat_oficial.PDF_COL_WIDTHS, repeatRows=1)
+    table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+                               ("BACKGROUND", (0, 0), (-1, 0), colors.lightblue)]))
+    SimpleDocTemplate(path, pagesize=A4, leftMargin=15 * mm, rightMargin=15 * mm).build([table])
+
+
+def timed(label, n, fn):
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<22} {n:>8,} rows {elapsed:9.2f} s {n / elapsed:10,.0f} rows/s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    ap.add_argument("--baseline", action="store_true", help="also time the old all-Paragraph table")
+    args = ap.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            oficial, vouchers = synthetic_rows(n, rng)
+            half = n // 2
+            timed("vat_oficial", n, lambda: vat_oficial.render_pdf(
+                oficial[:half], oficial[half:], os.path.join(tmp, "oficial.pdf"), 2024, 1))
+            timed("vat_vouchers", n, lambda: vat_vouchers.render_pdf(
+                vouchers[:half], vouchers[half:], os.path.join(tmp, "vouchers.pdf"), 2024, 1))
+            if args.baseline:
+                timed("baseline (Paragraphs)", n, lambda: baseline_pdf(oficial, os.path.join(tmp, "base.pdf")))
+
+
+if __name__ == "__main__":
+    main()
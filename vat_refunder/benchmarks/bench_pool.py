@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-query latency with and without the shared connection pool.
+
+"unpooled" opens a fresh connection per query (the old per-module db_cursor),
+"pooled" checks one out of db.get_pool() (ping + reuse), "prepared" also
+runs the query as a server-side prepared statement reused across checkouts
+(queries.session()).
+
+Usage:
+  python benchmarks/bench_pool.py [-n 200] [--query "SELECT 1"]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import db  # noqa: E402
+import queries  # noqa: E402
+
+
+def time_unpooled(query, n):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        cnx = db.connect()
+        cur = cnx.cursor()
+        cur.execute(query)
+        cur.fetchall()
+        cur.close()
+        cnx.close()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def time_pooled(query, n):
+    db.get_pool()  # warm-up: the pool connects once per process
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        with db.db_cursor() as cur:
+            cur.execute(query)
+            cur.fetchall()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def time_prepared(query, n):
+    db.get_pool()
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        with queries.session() as s:
+            s.fetchall(query)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def report(label, samples):
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    print(f"{label:<10} n={len(ms):<5} mean={statistics.mean(ms):8.3f} ms  "
+          f"median={statistics.median(ms):8.3f} ms  p95={p95:8.3f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", type=int, default=200, help="queries per mode")
+    ap.add_argument("--query", default="SELECT Supplier_ID, Supplier_Name FROM NIF_Codes LIMIT 1")
+    args = ap.parse_args()
+
+    report("unpooled", time_unpooled(args.query, args.n))
+    report("pooled", time_pooled(args.query, args.n))
+    report("prepared", time_prepared(args.query, args.n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmarks of the hot paths against the configured database
+(fill it first with benchmarks/seed.py).
+
+Each benchmark runs --repeat times; min and median wall time are recorded.
+Every run is appended to a JSON history (benchmarks/history.json by default)
+with the git commit and the table sizes, and compared with the last run on
+the same data volume: a median more than --threshold percent slower is
+reported as a regression.
+
+Benchmarks:
+  vat_oficial PDF / CSV      fetch both views for the period, render
+  vat_vouchers PDF / CSV     fetch_rows + render_pdf / write_csv (no cache, no dialogs)
+  vat_colleague report       fetch_rows + render_pdf / write_csv (build_report minus the watermark)
+  invoice submit (MySQL)     invoices_repo.add_invoice, SUBMITS times: the direct
+                             write, one transaction per invoice
+  invoice submit (journal)   journal.submit_invoice, SUBMITS times: what the
+                             Chancery form waits for (a journal in the temp dir;
+                             its syncer is drained before cleanup, untimed)
+  form startup               build each entry form as a Toplevel (needs a display)
+
+Usage:
+  python benchmarks/run_benchmarks.py [--year 2024 --quarter 4] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+from db import db_cursor  # noqa: E402
+import invoices_repo  # noqa: E402
+import vat_colleague  # noqa: E402
+import vat_oficial  # noqa: E402
+import vat_vouchers  # noqa: E402
+
+HISTORY_FILE = os.path.join(HERE, "history.json")
+SIZE_TABLES = ("NIF_Codes", "Vouchers", "Invoices_Chancery", "Invoices_Residence", "Invoices_Personal")
+SUBMITS = 20
+SYNC_WAIT_SECONDS = 60
+FORMS = ("invoice_chy", "invoice_res", "invoice_pers", "vouchers", "new_supplier")
+BENCH_PREFIX = "BENCH-"
+
+BENCHMARKS = []
+
+
+class Skip(Exception):
+    """Benchmark cannot run in this environment (no display, missing proc, ...)."""
+
+
+def bench(name):
+    def register(fn):
+        BENCHMARKS.append((name, fn))
+        return fn
+    return register
+
+
+# ==========================================================
+# Benchmarks: each returns the number of rows/items it handled
+# ==========================================================
+@bench("vat_oficial PDF")
+def _oficial_pdf(ctx):
+    q, y = ctx["quarter"], ctx["year"]
+    ch = list(vat_oficial.iter_rows(vat_oficial.CHANCERY_VIEW, q, y))
+    rs = list(vat_oficial.iter_rows(vat_oficial.RESIDENCE_VIEW, q, y))
+    vat_oficial.render_pdf(ch, rs, os.path.join(ctx["tmp"], "oficial.pdf"), y, q)
+    return len(ch) + len(rs)
+
+
+@bench("vat_oficial CSV")
+def _oficial_csv(ctx):
+    q, y = ctx["quarter"], ctx["year"]
+    written, _ = vat_oficial.generate_csv(
+        (("Chancery", vat_oficial.iter_rows(vat_oficial.CHANCERY_VIEW, q, y)),
+         ("Residence", vat_oficial.iter_rows(vat_oficial.RESIDENCE_VIEW, q, y))),
+        os.path.join(ctx["tmp"], "oficial.csv"), os.path.join(ctx["tmp"], "oficial_log.csv"))
+    return written
+
+
+@bench("vat_vouchers PDF")
+def _vouchers_pdf(ctx):
+    q, y = ctx["quarter"], ctx["year"]
+    ch, rs = (vat_vouchers.fetch_rows(table, q, y) for _, table in vat_vouchers.TABLES)
+    vat_vouchers.render_pdf(ch, rs, os.path.join(ctx["tmp"], "vouchers.pdf"), y, q)
+    return len(ch) + len(rs)
+
+
+@bench("vat_vouchers CSV")
+def _vouchers_csv(ctx):
+    q, y = ctx["quarter"], ctx["year"]
+    n = 0
+    for name, table in vat_vouchers.TABLES:
+        rows = vat_vouchers.fetch_rows(table, q, y)
+        vat_vouchers.write_csv(rows, os.path.join(ctx["tmp"], f"vouchers_{name}.csv"))
+        n += len(rows)
+    return n
+
+
+@bench("vat_colleague report")
+def _colleague(ctx):
+    from mysql.connector import Error
+    try:
+        data = vat_colleague.fetch_rows(ctx["colleague"], ctx["quarter"], ctx["year"])
+    except Error as e:
+        raise Skip(f"GetRelFactColleague: {e}")
+    valid = [row for row in data if len(row) >= 13]
+    if valid:
+        pdf_name, csv_name = vat_colleague.report_filenames(valid, ctx["quarter"], ctx["year"])
+        vat_colleague.render_pdf(valid, os.path.join(ctx["tmp"], pdf_name))
+        vat_colleague.write_csv(valid, os.path.join(ctx["tmp"], csv_name))
+    return len(valid)
+
+
+def _bench_invoices(ctx, path):
+    """SUBMITS Chancery rows (invoices_repo.INVOICE_COLUMNS) with fresh BENCH- numbers."""
+    ctx["run"] += 1
+    date = f"{ctx['year']}-{3 * ctx['quarter'] - 1:02d}-15"
+    return [(ctx["supplier_id"], f"{BENCH_PREFIX}{path}-{os.getpid()}-{ctx['run']}-{i}", date,
+             121.0, 21.0, 1, "Processed") for i in range(SUBMITS)]
+
+
+@bench("invoice submit (MySQL)")
+def _invoice_submit_mysql(ctx):
+    for row in _bench_invoices(ctx, "db"):
+        invoices_repo.add_invoice("Invoices_Chancery", row)
+    return SUBMITS
+
+
+@bench("invoice submit (journal)")
+def _invoice_submit_journal(ctx):
+    import journal  # after main() pointed VAT_JOURNAL_PATH at the temp dir
+    for row in _bench_invoices(ctx, "j"):
+        journal.submit_invoice("Invoices_Chancery", row)
+    return SUBMITS
+
+
+@bench("form startup")
+def _form_startup(ctx):
+    import importlib
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        raise Skip(f"no display: {e}")
+    root.withdraw()
+    try:
+        for name in FORMS:
+            window = importlib.import_module(name).main(root)
+            window.update_idletasks()
+            window.destroy()
+    finally:
+        root.destroy()
+    return len(FORMS)
+
+
+def _drain_journal():
+    """Let the syncer write what the journal benchmark queued, then stop it."""
+    journal = sys.modules.get("journal")
+    if journal is None or journal._default is None:
+        return
+    j, syncer = journal.default()
+    deadline = time.monotonic() + SYNC_WAIT_SECONDS
+    while j.counts().get("pending", 0) and time.monotonic() < deadline:
+        syncer.wake()
+        time.sleep(0.1)
+    syncer.stop()
+
+
+def _cleanup():
+    _drain_journal()
+    with db_cursor(commit=True) as cur:
+        cur.execute("DELETE FROM Invoices_Chancery WHERE Number LIKE %s", (BENCH_PREFIX + "%",))
+
+
+# ==========================================================
+# Runner
+# ==========================================================
+def table_sizes():
+    with db_cursor() as cur:
+        sizes = {}
+        for table in SIZE_TABLES:
+            cur.execute(f"SELECT COUNT(*) FROM {table}")
+            sizes[table] = cur.fetchone()[0]
+        return sizes
+
+
+def busiest_period():
+    with db_cursor() as cur:
+        cur.execute("""SELECT Year, Quarter FROM Vat_Rollup_Quarter
+                       WHERE Year > 0 AND Refundable = 1 AND Entity <> 'Personal'
+                       GROUP BY Year, Quarter ORDER BY SUM(Invoice_Count) DESC LIMIT 1""")
+        row = cur.fetchone()
+        return row if row else (datetime.now().year, 1)
+
+
+def any_supplier():
+    with db_cursor() as cur:
+        cur.execute("SELECT MIN(Supplier_ID) FROM NIF_Codes")
+        return cur.fetchone()[0]
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(ctx, repeat, only=None):
+    results = {}
+    for name, fn in BENCHMARKS:
+        if only and not any(o.lower() in name.lower() for o in only):
+            continue
+        times, items, status, note = [], 0, "ok", None
+        try:
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                items = fn(ctx)
+                times.append(time.perf_counter() - t0)
+        except Skip as e:
+            status, note = "skipped", str(e)
+        except Exception as e:
+            status, note = "error", f"{type(e).__name__}: {e}"
+        results[name] = {
+            "status": status,
+            "items": items,
+            "min": round(min(times), 4) if times else None,
+            "median": round(statistics.median(times), 4) if times else None,
+        }
+        if note:
+            results[name]["note"] = note
+        shown = f"{results[name]['median']:8.3f} s median, {items:,} items" if times else note
+        print(f"{name:<24} {status:<8} {shown}")
+    return results
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current, history, threshold):
+    """Regressions of *current* against the last run on the same table sizes."""
+    previous = next((r for r in reversed(history) if r["sizes"] == current["sizes"]), None)
+    if previous is None:
+        print("No earlier run on this data volume to compare with.")
+        return []
+    print(f"Compared with {previous['timestamp']} ({previous.get('commit') or 'unknown commit'}):")
+    regressions = []
+    for name, res in current["results"].items():
+        old = previous["results"].get(name)
+        if not old or not old.get("median") or not res.get("median"):
+            continue
+        change = (res["median"] - old["median"]) / old["median"] * 100
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"  {name:<24} {old['median']:8.3f} -> {res['median']:8.3f} s  {change:+6.1f} %  {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--year", type=int, help="period to report on (default: busiest seeded quarter)")
+    ap.add_argument("--quarter", type=int, choices=(1, 2, 3, 4))
+    ap.add_argument("--colleague", type=int, default=1, help="Colleague_ID for the personal report")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", nargs="+", help="run benchmarks whose name contains any of these")
+    ap.add_argument("--history", default=HISTORY_FILE)
+    ap.add_argument("--threshold", type=float, default=20.0, help="regression threshold in percent")
+    ap.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    args = ap.parse_args()
+
+    year, quarter = (args.year, args.quarter) if args.year and args.quarter else busiest_period()
+    sizes = table_sizes()
+    print(f"Period Q{quarter} {year}; " + ", ".join(f"{k}={v:,}" for k, v in sizes.items()))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # the journal benchmark and the forms must not touch the user's journal
+        os.environ["VAT_JOURNAL_PATH"] = os.path.join(tmp, "journal.sqlite3")
+        ctx = dict(year=year, quarter=quarter, colleague=args.colleague, tmp=tmp, run=0,
+                   supplier_id=any_supplier())
+        try:
+            results = run(ctx, args.repeat, args.only)
+        finally:
+            _cleanup()
+
+    current = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "period": [year, quarter],
+        "repeat": args.repeat,
+        "sizes": sizes,
+        "results": results,
+    }
+    history = load_history(args.history)
+    regressions = compare(current, history, args.threshold)
+    if not args.no_save:
+        history.append(current)
+        with open(args.history, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2)
+        print(f"Appended to {args.history}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Synthetic data for load testing: fills the vat_refunder schema with
+suppliers, budget heads, vouchers and Chancery / Residence / Personal
+invoices at a chosen multiple of today's volume.
+
+Distributions:
+- Supplier popularity is Zipf-like: a few suppliers (utilities, cleaning,
+  the travel agency) issue most invoices, most suppliers appear rarely.
+- Invoices are spread over --years with quarter weights QUARTER_WEIGHTS
+  (year-end is busiest), uniformly within the quarter.
+- Totals are log-normal around ~150 EUR; VAT is 21 %, 10 % or 4 % included.
+- REFUNDABLE_SHARE of Chancery/Residence invoices are refundable; about one
+  in VOUCHER_EVERY invoices is attached to a voucher.
+
+Rows are inserted in chunks with executemany, one commit per chunk, through
+the normal triggers (Table_Versions, VAT rollups).
+
+Usage:
+  python benchmarks/seed.py --scale 10             # 10x BASE_VOLUME
+  python benchmarks/seed.py --invoices 500000 --years 2019-2025 --reset
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+# Roughly one mission's yearly volume, per table.
+BASE_VOLUME = dict(suppliers=400, heads=25, vouchers=1_500, invoices=6_000, personal=1_500)
+QUARTER_WEIGHTS = (0.22, 0.24, 0.20, 0.34)
+VAT_RATES = (0.21, 0.21, 0.21, 0.10, 0.04)
+REFUNDABLE_SHARE = 0.85
+VOUCHER_EVERY = 4
+CHUNK_ROWS = 5_000
+SEED_TABLES = ("Invoices_Personal", "Invoices_Chancery", "Invoices_Residence",
+               "Vouchers", "NIF_Codes", "Head_of_Accounts")
+
+WORDS = ["Limpiezas", "Suministros", "Hotel", "Papelería", "Transportes", "Seguros",
+         "Electricidad", "Madrid", "Iberia", "Consultores", "Gestión", "Servicios",
+         "Restaurante", "Farmacia", "Telefónica", "Taller", "Mantenimiento", "Jardines"]
+SUFFIXES = ["S.L.", "S.A.", "S.L.U.", "C.B."]
+
+
+def volume(scale=1.0, **overrides):
+    """Row counts for *scale* x BASE_VOLUME, with explicit counts taking precedence."""
+    counts = {k: max(1, int(v * scale)) for k, v in BASE_VOLUME.items()}
+    counts["heads"] = BASE_VOLUME["heads"]  # budget heads do not grow with volume
+    counts.update({k: v for k, v in overrides.items() if v is not None})
+    return counts
+
+
+class Sampler:
+    def __init__(self, rng, years, supplier_ids):
+        self.rng = rng
+        self.years = years
+        self._supplier_ids = supplier_ids
+        self._supplier_weights = [1.0 / (rank + 1) ** 1.1 for rank in range(len(supplier_ids))]  # Zipf-like
+
+    def suppliers(self, k):
+        return self.rng.choices(self._supplier_ids, weights=self._supplier_weights, k=k)
+
+    def invoice_date(self):
+        year = self.rng.choice(self.years)
+        quarter = self.rng.choices((1, 2, 3, 4), weights=QUARTER_WEIGHTS)[0]
+        start = date(year, 3 * quarter - 2, 1)
+        end = date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+        return start + timedelta(days=self.rng.randrange((end - start).days))
+
+    def amounts(self):
+        total = round(min(self.rng.lognormvariate(5.0, 1.1), 60_000), 2)
+        rate = self.rng.choice(VAT_RATES)
+        return total, round(total * rate / (1 + rate), 2)
+
+
+def _chunks(rows, size=CHUNK_ROWS):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _insert(cnx, cur, sql, rows, progress=None, label=""):
+    done = 0
+    for chunk in _chunks(rows):
+        cur.executemany(sql, chunk)
+        cnx.commit()
+        done += len(chunk)
+        if progress:
+            progress(label, done, len(rows))
+
+
+def _first_id(cur, table, column):
+    """Start for the numbers in generated names; not a prediction of the IDs."""
+    cur.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    return cur.fetchone()[0] + 1
+
+
+def _ids(cur, table, id_column, key_column, keys):
+    """IDs of the rows just inserted, in the order of their unique *keys*.
+
+    AUTO_INCREMENT does not continue from MAX(id) + 1 after deletes or rolled
+    back inserts, so the rows are read back by what was generated for them;
+    should a key repeat an older row's, the newest row wins.
+    """
+    found = {}
+    for chunk in _chunks(keys):
+        cur.execute(f"SELECT {key_column}, {id_column} FROM {table} WHERE {key_column} IN "
+                    f"({', '.join(['%s'] * len(chunk))}) ORDER BY {id_column}", chunk)
+        found.update(cur.fetchall())
+    return [found[key] for key in keys]
+
+
+def reset(cnx, cur):
+    """Empty the seeded tables (and their rollups); TRUNCATE bypasses triggers."""
+    cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in SEED_TABLES + ("Vat_Rollup_Supplier", "Vat_Rollup_Quarter"):
+        cur.execute(f"TRUNCATE TABLE {table}")
+    cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+    cur.execute("UPDATE Table_Versions SET Version = Version + 1")
+    cnx.commit()
+
+
+def seed(cnx, counts, years, rng=None, progress=None):
+    """Insert *counts* rows (see volume()) spread over *years*; returns counts."""
+    rng = rng or random.Random(42)
+    cur = cnx.cursor()
+    try:
+        supplier_base = _first_id(cur, "NIF_Codes", "Supplier_ID")
+        suppliers = [(f"{rng.choice('ABGHJ')}{supplier_base + i:08d}",
+                      f"{' '.join(rng.sample(WORDS, rng.randint(1, 3)))} {supplier_base + i:06d} {rng.choice(SUFFIXES)}")
+                     for i in range(counts["suppliers"])]
+        _insert(cnx, cur,
+                "INSERT INTO NIF_Codes (Supplier_NIF_Code, Supplier_Name) VALUES (%s, %s)",
+                suppliers, progress, "suppliers")
+        supplier_ids = _ids(cur, "NIF_Codes", "Supplier_ID", "Supplier_NIF_Code", [nif for nif, _ in suppliers])
+
+        head_base = _first_id(cur, "Head_of_Accounts", "Head_of_Accounts_ID")
+        heads = [f"Budget Head {head_base + i:03d}" for i in range(counts["heads"])]
+        _insert(cnx, cur, "INSERT INTO Head_of_Accounts (Name) VALUES (%s)",
+                [(name,) for name in heads], progress, "heads")
+        head_ids = _ids(cur, "Head_of_Accounts", "Head_of_Accounts_ID", "Name", heads)
+
+        sampler = Sampler(rng, years, supplier_ids)
+
+        voucher_base = _first_id(cur, "Vouchers", "Voucher_ID")
+        vouchers = []
+        for i in range(counts["vouchers"]):
+            d = sampler.invoice_date()
+            vouchers.append((f"V{voucher_base + i:08d}", rng.choice(head_ids),
+                             f"Beneficiary {rng.randrange(500):03d}", sampler.amounts()[0],
+                             (d.month - 1) // 3 + 1, d.year))
+        _insert(cnx, cur,
+                """INSERT INTO Vouchers (Voucher_Number, Head_of_Accounts_ID, Voucher_Beneficiary,
+                                         Voucher_Euro, Voucher_Quarter, Voucher_Year)
+                   VALUES (%s, %s, %s, %s, %s, %s)""",
+                vouchers, progress, "vouchers")
+        voucher_ids = _ids(cur, "Vouchers", "Voucher_ID", "Voucher_Number", [v[0] for v in vouchers])
+
+        for table, prefix in (("Invoices_Chancery", "C"), ("Invoices_Residence", "R")):
+            base = _first_id(cur, table, "ID")
+            rows = []
+            for i, supplier_id in enumerate(sampler.suppliers(counts["invoices"])):
+                total, vat = sampler.amounts()
+                voucher_id = rng.choice(voucher_ids) if rng.randrange(VOUCHER_EVERY) == 0 else None
+                rows.append((supplier_id, f"{prefix}{base + i:010d}", sampler.invoice_date(), total, vat,
+                             1 if rng.random() < REFUNDABLE_SHARE else 0, "Processed", voucher_id))
+            _insert(cnx, cur,
+                    f"""INSERT INTO {table}
+                            (Supplier_ID, Number, Date, Total, Vat, Refundable, Status, Voucher_ID)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+                    rows, progress, table)
+
+        base = _first_id(cur, "Invoices_Personal", "ID")
+        rows = []
+        for i, supplier_id in enumerate(sampler.suppliers(counts["personal"])):
+            total, vat = sampler.amounts()
+            rows.append((supplier_id, rng.randint(1, 60), rng.randint(1, 200), f"P{base + i:010d}",
+                         sampler.invoice_date(), total, vat, rng.randint(1, 3), None))
+        _insert(cnx, cur,
+                """INSERT INTO Invoices_Personal
+                       (Store, Colleague_ID, Recipient_ID, Number, Date, Amount, VAT, Status, Date_Refunded)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                rows, progress, "Invoices_Personal")
+
+        cur.execute("ANALYZE TABLE " + ", ".join(SEED_TABLES))
+        cur.fetchall()
+    finally:
+        cur.close()
+    return counts
+
+
+def parse_years(text):
+    """'2021-2025' or '2021,2023' -> [2021, ...]."""
+    if "-" in text:
+        lo, hi = text.split("-", 1)
+        return list(range(int(lo), int(hi) + 1))
+    return [int(y) for y in text.split(",")]
+
+
+def _print_progress(label, done, total):
+    print(f"\r{label:<20} {done:>10,} / {total:,}", end="\n" if done == total else "", flush=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scale", type=float, default=1.0, help="multiple of BASE_VOLUME")
+    ap.add_argument("--suppliers", type=int)
+    ap.add_argument("--vouchers", type=int)
+    ap.add_argument("--invoices", type=int, help="rows per Chancery / Residence table")
+    ap.add_argument("--personal", type=int)
+    ap.add_argument("--years", default="2021-2025", help="e.g. 2021-2025 or 2022,2024")
+    ap.add_argument("--seed", type=int, default=42, help="random seed (same seed, same data)")
+    ap.add_argument("--reset", action="store_true", help="empty the seeded tables first")
+    args = ap.parse_args()
+
+    from db import connect  # app/db.py: DB_* settings from .env
+
+    counts = volume(args.scale, suppliers=args.suppliers, vouchers=args.vouchers,
+                    invoices=args.invoices, personal=args.personal)
+    cnx = connect()
+    try:
+        if args.reset:
+            reset(cnx, cnx.cursor())
+        seed(cnx, counts, parse_years(args.years), random.Random(args.seed), progress=_print_progress)
+    finally:
+        cnx.close()
+    print("Seeded:", ", ".join(f"{k}={v:,}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN regression check for the report queries.
+
+Builds a scratch database from db/init/*.sql, seeds it with synthetic
+invoices (benchmarks/seed.py), runs EXPLAIN FORMAT=JSON on every report query and fails (exit 1)
+if any plan reads a table with a full table/index scan or needs a filesort.
+
+- Full scans of tables smaller than SMALL_TABLE_ROWS (and filesorts over
+  only such tables) are tolerated: on a few hundred rows the optimizer is
+  right to skip the index.
+- ALLOWED_FILESORT lists queries whose sort cannot come from an index, with
+  the reason; every other filesort is a failure.
+
+Needs a MySQL account that may create databases, triggers and procedures
+(root of the Docker container by default).
+
+Usage:
+  python db/check_query_plans.py [--scale 5] [--keep]
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+import mysql.connector  # noqa: E402
+import seed as synthetic  # noqa: E402  benchmarks/seed.py
+import vat_dashboard  # noqa: E402
+import vat_oficial  # noqa: E402
+import vat_vouchers  # noqa: E402
+
+SCRATCH_DB = "vat_refunder_plancheck"
+SMALL_TABLE_ROWS = 1000
+FULL_SCAN_TYPES = ("ALL", "index")
+
+ALLOWED_FILESORT = {
+    # ORDER BY NIF, Fecha_Devengo, Numero_Factura: NIF comes from NIF_Codes,
+    # the date from the invoice table, so no single index holds that order.
+    # The sort only covers one quarter's rows, already narrowed by IDX_I*_Report.
+    "oficial Chancery": "ORDER BY spans NIF_Codes and the invoice table",
+    "oficial Residence": "ORDER BY spans NIF_Codes and the invoice table",
+    "oficial changes Chancery": "ORDER BY spans NIF_Codes and the invoice table",
+    "oficial changes Residence": "ORDER BY spans NIF_Codes and the invoice table",
+    # The two UNION branches come from different indexes; only the changed
+    # rows are sorted.
+    "vouchers changes Chancery": "ORDER BY over a UNION result",
+    "vouchers changes Residence": "ORDER BY over a UNION result",
+}
+
+# ==========================================================
+# SQL scripts
+# ==========================================================
+def iter_statements(path):
+    """Statements of a mysql-client script, honouring DELIMITER lines."""
+    delimiter = ";"
+    buf = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            if not buf and (not stripped or stripped.startswith(("--", "#"))):
+                continue
+            if stripped.upper().startswith("DELIMITER "):
+                delimiter = stripped.split(None, 1)[1]
+                continue
+            buf.append(line)
+            if stripped.endswith(delimiter):
+                stmt = "".join(buf).rstrip()[: -len(delimiter)].strip()
+                buf = []
+                if stmt:
+                    yield stmt
+    if "".join(buf).strip():
+        yield "".join(buf).strip()
+
+
+def run_init_scripts(cur, database):
+    for path in sorted(glob.glob(os.path.join(HERE, "init", "*.sql"))):
+        for stmt in iter_statements(path):
+            if re.match(r"(CREATE DATABASE|USE)\b", stmt, re.I):
+                stmt = re.sub(r"\bvat_refunder\b", database, stmt)
+            cur.execute(stmt)
+            if cur.with_rows:
+                cur.fetchall()
+
+
+# ==========================================================
+# Plans
+# ==========================================================
+def report_queries(year, quarter):
+    """(name, sql, params) for every report query."""
+    queries = []
+    for name, table in vat_vouchers.TABLES:
+        queries.append((f"vouchers {name}", vat_vouchers.BASE_QUERY.format(table=table), (quarter, year)))
+    for name, view in (("Chancery", vat_oficial.CHANCERY_VIEW), ("Residence", vat_oficial.RESIDENCE_VIEW)):
+        sql = vat_oficial.REPORT_QUERY.format(columns=vat_oficial.SELECT_WITH_PROVEEDOR, view_name=view)
+        queries.append((f"oficial {name}", sql, (quarter, year)))
+    since = f"{year}-01-01"
+    for name, table in vat_oficial.CHANGE_TABLES:
+        queries.append((f"oficial changes {name}", vat_oficial.CHANGES_QUERY.format(table=table),
+                        (since, year, quarter, since)))
+    for name, table in vat_vouchers.TABLES:
+        queries.append((f"vouchers changes {name}", vat_vouchers.CHANGES_QUERY.format(table=table),
+                        (since, quarter, year, since, since, since, quarter, year)))
+    queries.append(("dashboard years", vat_dashboard.YEARS_QUERY, ()))
+    queries.append(("dashboard quarter totals", vat_dashboard.QUARTER_TOTALS_QUERY, (year, 1)))
+    queries.append(("dashboard top suppliers", vat_dashboard.TOP_SUPPLIERS_QUERY,
+                    (year, quarter, 1, vat_dashboard.TOP_SUPPLIERS)))
+    return queries
+
+
+def walk(node):
+    """Yield every dict in an EXPLAIN JSON document."""
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from walk(value)
+
+
+def plan_problems(plan, table_rows):
+    """Full scans of non-trivial tables and filesorts found in *plan*.
+
+    A filesort is tolerated when every table in the plan is small.
+    """
+    problems = []
+    filesort = False
+    large = False
+    for node in walk(plan):
+        table = node.get("table")
+        if isinstance(table, dict) and "table_name" in table:
+            name = table["table_name"]
+            is_large = table_rows.get(name, SMALL_TABLE_ROWS) >= SMALL_TABLE_ROWS
+            large = large or is_large
+            if is_large and table.get("access_type") in FULL_SCAN_TYPES:
+                problems.append(f"full scan ({table['access_type']}) of {name}")
+        if node.get("using_filesort"):
+            filesort = True
+    if filesort and large:
+        problems.append("filesort")
+    return problems
+
+
+def table_sizes(cur, database):
+    cur.execute(
+        "SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s",
+        (database,),
+    )
+    return {name: rows or 0 for name, rows in cur.fetchall()}
+
+
+def check(cur, database, year, quarter, verbose=False):
+    sizes = table_sizes(cur, database)
+    # aliases used in the queries map to these tables
+    sizes.update(i=max(sizes.get("Invoices_Chancery", 0), sizes.get("Invoices_Residence", 0)),
+                 n=sizes.get("NIF_Codes", 0), v=sizes.get("Vouchers", 0),
+                 ha=sizes.get("Head_of_Accounts", 0), r=sizes.get("Vat_Rollup_Supplier", 0))
+    failures = 0
+    for name, sql, params in report_queries(year, quarter):
+        cur.execute("EXPLAIN FORMAT=JSON " + sql, params)
+        plan = json.loads(cur.fetchone()[0])
+        problems = plan_problems(plan, sizes)
+        if "filesort" in problems and name in ALLOWED_FILESORT:
+            problems = [p for p in problems if p != "filesort"]
+            note = f" (filesort allowed: {ALLOWED_FILESORT[name]})"
+        else:
+            note = ""
+        status = "FAIL" if problems else "ok"
+        print(f"{status:<4} {name}{note}" + (": " + "; ".join(sorted(set(problems))) if problems else ""))
+        if verbose or problems:
+            print(json.dumps(plan, indent=2))
+        failures += bool(problems)
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default=os.getenv("DB_HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("DB_PORT", "3306")))
+    ap.add_argument("--user", default="root")
+    ap.add_argument("--password", default=os.getenv("MYSQL_ROOT_PASSWORD", "ChangeMeUser!"))
+    ap.add_argument("--database", default=SCRATCH_DB, help="scratch database (dropped and recreated)")
+    ap.add_argument("--scale", type=float, default=5, help="seed volume, multiple of seed.BASE_VOLUME")
+    ap.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    ap.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = ap.parse_args()
+
+    if args.database == "vat_refunder":
+        ap.error("refusing to drop the application database; pick a scratch name")
+
+    cnx = mysql.connector.connect(host=args.host, port=args.port, user=args.user,
+                                  password=args.password, consume_results=True)
+    cur = cnx.cursor()
+    try:
+        cur.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        run_init_scripts(cur, args.database)
+        cur.execute(f"USE `{args.database}`")
+        synthetic.seed(cnx, synthetic.volume(args.scale), [2021, 2022, 2023, 2024, 2025], random.Random(42))
+        cur.execute("ANALYZE TABLE Vat_Rollup_Quarter, Vat_Rollup_Supplier")
+        cur.fetchall()
+        failures = check(cur, args.database, year=2024, quarter=2, verbose=args.verbose)
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        cur.close()
+        cnx.close()
+
+    print(f"{failures} quer{'y' if failures == 1 else 'ies'} with full scans or filesorts"
+          if failures else "All report queries use their indexes.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -106,8 +106,7 @@ CREATE TABLE IF NOT EXISTS Invoices_Residence (
     ON DELETE SET NULL ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
-## TODO (darius): Add Invoices_Chancery_Vat view 
-## TODO (darius): Add Invoices_Residence_Vat view 
+## Invoices_Chancery_Vat / Invoices_Residence_Vat views: see 004_report_indexes.sql
 ## TODO (darius): Add Invoices_Personal view 
 ## TODO (darius): Add recipients table
 ## TODO (darius): Add Refund_Status table
@@ -0,0 +1,52 @@
+-- ============================================================
+--  Per-table change counters for the reference-data cache
+--  (app/refdata.py). One cheap SELECT on Table_Versions tells the
+--  app which lookup tables changed since it last loaded them.
+--  Safe to re-run against an existing database.
+-- ============================================================
+
+USE vat_refunder;
+
+CREATE TABLE IF NOT EXISTS Table_Versions (
+  Table_Name VARCHAR(64) NOT NULL,
+  Version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+  PRIMARY KEY (Table_Name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO Table_Versions (Table_Name) VALUES
+  ('NIF_Codes'),
+  ('Head_of_Accounts');
+
+-- ============================================================
+-- NIF_Codes
+-- ============================================================
+DROP TRIGGER IF EXISTS trg_NIF_Codes_ai;
+DROP TRIGGER IF EXISTS trg_NIF_Codes_au;
+DROP TRIGGER IF EXISTS trg_NIF_Codes_ad;
+CREATE TRIGGER trg_NIF_Codes_ai AFTER INSERT ON NIF_Codes FOR EACH ROW
+  UPDATE Table_Versions SET Version = Version + 1 WHERE Table_Name = 'NIF_Codes';
+CREATE TRIGGER trg_NIF_Codes_au AFTER UPDATE ON NIF_Codes FOR EACH ROW
+  UPDATE Table_Versions SET Version = Version + 1 WHERE Table_Name = 'NIF_Codes';
+CREATE TRIGGER trg_NIF_Codes_ad AFTER DELETE ON NIF_Codes FOR EACH ROW
+  UPDATE Table_Versions SET Version = Version + 1 WHERE Table_Name = 'NIF_Codes';
+
+-- ============================================================
+-- Head_of_Accounts
+-- ============================================================
+DROP TRIGGER IF EXISTS trg_Head_of_Accounts_ai;
+DROP TRIGGER IF EXISTS trg_Head_of_Accounts_au;
+DROP TRIGGER IF EXISTS trg_Head_of_Accounts_ad;
+CREATE TRIGGER trg_Head_of_Accounts_ai AFTER INSERT ON Head_of_Accounts FOR EACH ROW
+  UPDATE Table_Versions SET Version = Version + 1 WHERE Table_Name = 'Head_of_Accounts';
+CREATE TRIGGER trg_Head_of_Accounts_au AFTER UPDATE ON Head_of_Accounts FOR EACH ROW
+  UPDATE Table_Versions SET Version = Version + 1 WHERE Table_Name = 'Head_of_Accounts';
+CREATE TRIGGER trg_Head_of_Accounts_ad AFTER DELETE ON Head_of_Accounts FOR EACH ROW
+  UPDATE Table_Versions SET Version = Version + 1 WHERE Table_Name = 'Head_of_Accounts';
+
+-- ============================================================
+-- Colleagues, Recipients and Refund_Status get no counter yet:
+-- their CREATE TABLEs are still TODOs in 001_init.sql, and a
+-- trigger cannot be created on a missing table. app/refdata.py
+-- reloads a table without a counter row on every access, so add
+-- the row and the same three triggers here once they exist.
+-- ============================================================
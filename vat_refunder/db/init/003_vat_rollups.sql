@@ -0,0 +1,179 @@
+-- ============================================================
+--  Materialized VAT rollups (app/vat_dashboard.py).
+--  Invoice counts, totals and VAT per entity / year / quarter /
+--  refundable flag, kept current by triggers on the three invoice
+--  tables, so a quarter or year total is a primary-key lookup
+--  instead of a scan over the invoices.
+--  Safe to re-run: tables are kept, triggers are recreated and
+--  the rollups are rebuilt from the invoice tables at the end.
+-- ============================================================
+
+USE vat_refunder;
+
+-- ============================================================
+-- Invoices_Personal (columns as written by app/invoice_pers.py).
+-- Only created when missing; Colleagues, Recipients and
+-- Refund_Status are still TODOs in 001_init.sql, so no FKs yet.
+-- ============================================================
+CREATE TABLE IF NOT EXISTS Invoices_Personal (
+  ID INT NOT NULL AUTO_INCREMENT,
+  Store INT DEFAULT NULL,
+  Colleague_ID INT DEFAULT NULL,
+  Recipient_ID INT DEFAULT NULL,
+  Number VARCHAR(255) DEFAULT NULL,
+  Date DATE DEFAULT NULL,
+  Amount DECIMAL(10,2) DEFAULT NULL,
+  VAT DECIMAL(10,2) DEFAULT NULL,
+  Status INT DEFAULT NULL,
+  Date_Refunded DATE DEFAULT NULL,
+  PRIMARY KEY (ID),
+  UNIQUE KEY Invoice_Personal_No (Number),
+  KEY Store (Store),
+  KEY Colleague_ID (Colleague_ID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ============================================================
+-- Rollup tables
+--   NULL dates / suppliers / refundable flags are stored as 0 so
+--   they can be part of the primary key.
+-- ============================================================
+CREATE TABLE IF NOT EXISTS Vat_Rollup_Supplier (
+  Entity ENUM('Chancery','Residence','Personal') NOT NULL,
+  Year INT NOT NULL,
+  Quarter INT NOT NULL,
+  Refundable TINYINT(1) NOT NULL,
+  Supplier_ID INT NOT NULL,
+  Invoice_Count INT NOT NULL DEFAULT 0,
+  Total DECIMAL(14,2) NOT NULL DEFAULT 0,
+  Vat DECIMAL(14,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (Entity, Year, Quarter, Refundable, Supplier_ID),
+  KEY IDX_VRS_Year_Quarter (Year, Quarter)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS Vat_Rollup_Quarter (
+  Entity ENUM('Chancery','Residence','Personal') NOT NULL,
+  Year INT NOT NULL,
+  Quarter INT NOT NULL,
+  Refundable TINYINT(1) NOT NULL,
+  Invoice_Count INT NOT NULL DEFAULT 0,
+  Total DECIMAL(14,2) NOT NULL DEFAULT 0,
+  Vat DECIMAL(14,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (Entity, Year, Quarter, Refundable),
+  KEY IDX_VRQ_Year_Quarter (Year, Quarter)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ============================================================
+-- Vat_Rollup_Apply: add (p_sign = 1) or remove (p_sign = -1)
+-- one invoice from both rollups.
+-- ============================================================
+DROP PROCEDURE IF EXISTS Vat_Rollup_Apply;
+DROP PROCEDURE IF EXISTS Rebuild_Vat_Rollups;
+
+DELIMITER $$
+
+CREATE PROCEDURE Vat_Rollup_Apply(
+  IN p_entity VARCHAR(16), IN p_date DATE, IN p_refundable TINYINT,
+  IN p_supplier INT, IN p_sign INT, IN p_total DECIMAL(10,2), IN p_vat DECIMAL(10,2))
+BEGIN
+  DECLARE v_year INT DEFAULT COALESCE(YEAR(p_date), 0);
+  DECLARE v_quarter INT DEFAULT COALESCE(QUARTER(p_date), 0);
+  DECLARE v_refundable TINYINT DEFAULT COALESCE(p_refundable, 0);
+  DECLARE v_total DECIMAL(14,2) DEFAULT p_sign * COALESCE(p_total, 0);
+  DECLARE v_vat DECIMAL(14,2) DEFAULT p_sign * COALESCE(p_vat, 0);
+
+  INSERT INTO Vat_Rollup_Supplier
+    (Entity, Year, Quarter, Refundable, Supplier_ID, Invoice_Count, Total, Vat)
+  VALUES (p_entity, v_year, v_quarter, v_refundable, COALESCE(p_supplier, 0), p_sign, v_total, v_vat)
+  AS r ON DUPLICATE KEY UPDATE
+    Invoice_Count = Vat_Rollup_Supplier.Invoice_Count + r.Invoice_Count,
+    Total = Vat_Rollup_Supplier.Total + r.Total,
+    Vat = Vat_Rollup_Supplier.Vat + r.Vat;
+
+  INSERT INTO Vat_Rollup_Quarter
+    (Entity, Year, Quarter, Refundable, Invoice_Count, Total, Vat)
+  VALUES (p_entity, v_year, v_quarter, v_refundable, p_sign, v_total, v_vat)
+  AS r ON DUPLICATE KEY UPDATE
+    Invoice_Count = Vat_Rollup_Quarter.Invoice_Count + r.Invoice_Count,
+    Total = Vat_Rollup_Quarter.Total + r.Total,
+    Vat = Vat_Rollup_Quarter.Vat + r.Vat;
+END$$
+
+-- Recompute both rollups from scratch (after bulk loads that bypassed
+-- triggers, or to check for drift): CALL Rebuild_Vat_Rollups();
+CREATE PROCEDURE Rebuild_Vat_Rollups()
+BEGIN
+  DELETE FROM Vat_Rollup_Supplier;
+  DELETE FROM Vat_Rollup_Quarter;
+
+  INSERT INTO Vat_Rollup_Supplier
+    (Entity, Year, Quarter, Refundable, Supplier_ID, Invoice_Count, Total, Vat)
+  SELECT 'Chancery', COALESCE(Year, 0), COALESCE(Quarter, 0), COALESCE(Refundable, 0),
+         COALESCE(Supplier_ID, 0), COUNT(*), COALESCE(SUM(Total), 0), COALESCE(SUM(Vat), 0)
+  FROM Invoices_Chancery GROUP BY 1, 2, 3, 4, 5
+  UNION ALL
+  SELECT 'Residence', COALESCE(Year, 0), COALESCE(Quarter, 0), COALESCE(Refundable, 0),
+         COALESCE(Supplier_ID, 0), COUNT(*), COALESCE(SUM(Total), 0), COALESCE(SUM(Vat), 0)
+  FROM Invoices_Residence GROUP BY 1, 2, 3, 4, 5
+  UNION ALL
+  SELECT 'Personal', COALESCE(YEAR(Date), 0), COALESCE(QUARTER(Date), 0), 1,
+         COALESCE(Store, 0), COUNT(*), COALESCE(SUM(Amount), 0), COALESCE(SUM(VAT), 0)
+  FROM Invoices_Personal GROUP BY 1, 2, 3, 4, 5;
+
+  INSERT INTO Vat_Rollup_Quarter
+    (Entity, Year, Quarter, Refundable, Invoice_Count, Total, Vat)
+  SELECT Entity, Year, Quarter, Refundable, SUM(Invoice_Count), SUM(Total), SUM(Vat)
+  FROM Vat_Rollup_Supplier GROUP BY Entity, Year, Quarter, Refundable;
+END$$
+
+-- ============================================================
+-- Invoices_Chancery
+-- ============================================================
+DROP TRIGGER IF EXISTS trg_Invoices_Chancery_rollup_ai$$
+DROP TRIGGER IF EXISTS trg_Invoices_Chancery_rollup_au$$
+DROP TRIGGER IF EXISTS trg_Invoices_Chancery_rollup_ad$$
+CREATE TRIGGER trg_Invoices_Chancery_rollup_ai AFTER INSERT ON Invoices_Chancery FOR EACH ROW
+  CALL Vat_Rollup_Apply('Chancery', NEW.Date, NEW.Refundable, NEW.Supplier_ID, 1, NEW.Total, NEW.Vat)$$
+CREATE TRIGGER trg_Invoices_Chancery_rollup_au AFTER UPDATE ON Invoices_Chancery FOR EACH ROW
+BEGIN
+  CALL Vat_Rollup_Apply('Chancery', OLD.Date, OLD.Refundable, OLD.Supplier_ID, -1, OLD.Total, OLD.Vat);
+  CALL Vat_Rollup_Apply('Chancery', NEW.Date, NEW.Refundable, NEW.Supplier_ID, 1, NEW.Total, NEW.Vat);
+END$$
+CREATE TRIGGER trg_Invoices_Chancery_rollup_ad AFTER DELETE ON Invoices_Chancery FOR EACH ROW
+  CALL Vat_Rollup_Apply('Chancery', OLD.Date, OLD.Refundable, OLD.Supplier_ID, -1, OLD.Total, OLD.Vat)$$
+
+-- ============================================================
+-- Invoices_Residence
+-- ============================================================
+DROP TRIGGER IF EXISTS trg_Invoices_Residence_rollup_ai$$
+DROP TRIGGER IF EXISTS trg_Invoices_Residence_rollup_au$$
+DROP TRIGGER IF EXISTS trg_Invoices_Residence_rollup_ad$$
+CREATE TRIGGER trg_Invoices_Residence_rollup_ai AFTER INSERT ON Invoices_Residence FOR EACH ROW
+  CALL Vat_Rollup_Apply('Residence', NEW.Date, NEW.Refundable, NEW.Supplier_ID, 1, NEW.Total, NEW.Vat)$$
+CREATE TRIGGER trg_Invoices_Residence_rollup_au AFTER UPDATE ON Invoices_Residence FOR EACH ROW
+BEGIN
+  CALL Vat_Rollup_Apply('Residence', OLD.Date, OLD.Refundable, OLD.Supplier_ID, -1, OLD.Total, OLD.Vat);
+  CALL Vat_Rollup_Apply('Residence', NEW.Date, NEW.Refundable, NEW.Supplier_ID, 1, NEW.Total, NEW.Vat);
+END$$
+CREATE TRIGGER trg_Invoices_Residence_rollup_ad AFTER DELETE ON Invoices_Residence FOR EACH ROW
+  CALL Vat_Rollup_Apply('Residence', OLD.Date, OLD.Refundable, OLD.Supplier_ID, -1, OLD.Total, OLD.Vat)$$
+
+-- ============================================================
+-- Invoices_Personal (every personal invoice is refundable)
+-- ============================================================
+DROP TRIGGER IF EXISTS trg_Invoices_Personal_rollup_ai$$
+DROP TRIGGER IF EXISTS trg_Invoices_Personal_rollup_au$$
+DROP TRIGGER IF EXISTS trg_Invoices_Personal_rollup_ad$$
+CREATE TRIGGER trg_Invoices_Personal_rollup_ai AFTER INSERT ON Invoices_Personal FOR EACH ROW
+  CALL Vat_Rollup_Apply('Personal', NEW.Date, 1, NEW.Store, 1, NEW.Amount, NEW.VAT)$$
+CREATE TRIGGER trg_Invoices_Personal_rollup_au AFTER UPDATE ON Invoices_Personal FOR EACH ROW
+BEGIN
+  CALL Vat_Rollup_Apply('Personal', OLD.Date, 1, OLD.Store, -1, OLD.Amount, OLD.VAT);
+  CALL Vat_Rollup_Apply('Personal', NEW.Date, 1, NEW.Store, 1, NEW.Amount, NEW.VAT);
+END$$
+CREATE TRIGGER trg_Invoices_Personal_rollup_ad AFTER DELETE ON Invoices_Personal FOR EACH ROW
+  CALL Vat_Rollup_Apply('Personal', OLD.Date, 1, OLD.Store, -1, OLD.Amount, OLD.VAT)$$
+
+DELIMITER ;
+
+-- Bring the rollups in line with whatever the invoice tables hold now.
+CALL Rebuild_Vat_Rollups();
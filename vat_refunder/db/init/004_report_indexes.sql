@@ -0,0 +1,117 @@
+-- ============================================================
+--  Indexes shaped around the report queries, and the two VAT
+--  views vat_oficial.py reads.
+--
+--  The old composite indexes led with the amount column
+--  (Vat / Voucher_Euro, Year, Quarter), so no report predicate
+--  could use them. The report queries filter on Year + Quarter +
+--  Refundable and sort by Date, Number; the new indexes start
+--  with exactly those columns and carry the remaining selected
+--  columns, so a quarter is read as one index range, already in
+--  report order (no filesort, no row lookups).
+--
+--  Checked by db/check_query_plans.py (EXPLAIN FORMAT=JSON).
+--  Safe to re-run against an existing database.
+-- ============================================================
+
+USE vat_refunder;
+
+DROP PROCEDURE IF EXISTS Drop_Index_If_Exists;
+DROP PROCEDURE IF EXISTS Create_View_If_Missing;
+
+DELIMITER $$
+
+CREATE PROCEDURE Drop_Index_If_Exists(IN p_table VARCHAR(64), IN p_index VARCHAR(64))
+BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND INDEX_NAME = p_index) THEN
+    SET @ddl = CONCAT('ALTER TABLE `', p_table, '` DROP INDEX `', p_index, '`');
+    PREPARE stmt FROM @ddl;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+  END IF;
+END$$
+
+-- Existing installations may already have their own definition of a view;
+-- only fill in the ones that are missing.
+CREATE PROCEDURE Create_View_If_Missing(IN p_view VARCHAR(64), IN p_ddl TEXT)
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.VIEWS
+                 WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_view) THEN
+    SET @ddl = p_ddl;
+    PREPARE stmt FROM @ddl;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+  END IF;
+END$$
+
+DELIMITER ;
+
+-- ============================================================
+-- Invoices_Chancery / Invoices_Residence
+--   WHERE Quarter = ? AND Year = ? AND Refundable = 1
+--   ORDER BY Date, Number
+-- ============================================================
+CALL Drop_Index_If_Exists('Invoices_Chancery', 'IDX_IC_Vat_Year_Quarter');
+CALL Drop_Index_If_Exists('Invoices_Chancery', 'IDX_IC_Report');
+ALTER TABLE Invoices_Chancery
+  ADD KEY IDX_IC_Report (Year, Quarter, Refundable, Date, Number, Supplier_ID, Voucher_ID, Total, Vat);
+
+CALL Drop_Index_If_Exists('Invoices_Residence', 'IDX_IR_Vat_Year_Quarter');
+CALL Drop_Index_If_Exists('Invoices_Residence', 'IDX_IR_Report');
+ALTER TABLE Invoices_Residence
+  ADD KEY IDX_IR_Report (Year, Quarter, Refundable, Date, Number, Supplier_ID, Voucher_ID, Total, Vat);
+
+-- ============================================================
+-- Vouchers: by period, not by amount
+-- ============================================================
+CALL Drop_Index_If_Exists('Vouchers', 'IDX_Vouchers_Euro_Year_Quarter');
+CALL Drop_Index_If_Exists('Vouchers', 'IDX_Vouchers_Year_Quarter');
+ALTER TABLE Vouchers
+  ADD KEY IDX_Vouchers_Year_Quarter (Voucher_Year, Voucher_Quarter);
+
+-- ============================================================
+-- Vat_Rollup_Supplier: top suppliers of a period by VAT
+--   WHERE Year = ? AND Quarter = ? AND Refundable = ? ORDER BY Vat DESC
+-- ============================================================
+CALL Drop_Index_If_Exists('Vat_Rollup_Supplier', 'IDX_VRS_Year_Quarter');
+CALL Drop_Index_If_Exists('Vat_Rollup_Supplier', 'IDX_VRS_Period_Vat');
+ALTER TABLE Vat_Rollup_Supplier
+  ADD KEY IDX_VRS_Period_Vat (Year, Quarter, Refundable, Vat);
+
+-- ============================================================
+-- VAT views for vat_oficial.py: refundable invoices with the
+-- supplier's NIF and name, in the column names the AEAT export uses.
+-- ============================================================
+CALL Create_View_If_Missing('Invoices_Chancery_Vat', '
+  CREATE VIEW Invoices_Chancery_Vat AS
+  SELECT n.Supplier_NIF_Code AS NIF,
+         n.Supplier_Name     AS Proveedor,
+         i.Number            AS Numero_Factura,
+         i.Date              AS Fecha_Devengo,
+         i.Total             AS Importe_Total_Impuestos_Incluidos,
+         i.Vat               AS Cuotas_IVA,
+         i.Quarter           AS Trimestre,
+         i.Year              AS Fiscal_Year
+  FROM Invoices_Chancery i
+  LEFT JOIN NIF_Codes n ON n.Supplier_ID = i.Supplier_ID
+  WHERE i.Refundable = 1');
+
+CALL Create_View_If_Missing('Invoices_Residence_Vat', '
+  CREATE VIEW Invoices_Residence_Vat AS
+  SELECT n.Supplier_NIF_Code AS NIF,
+         n.Supplier_Name     AS Proveedor,
+         i.Number            AS Numero_Factura,
+         i.Date              AS Fecha_Devengo,
+         i.Total             AS Importe_Total_Impuestos_Incluidos,
+         i.Vat               AS Cuotas_IVA,
+         i.Quarter           AS Trimestre,
+         i.Year              AS Fiscal_Year
+  FROM Invoices_Residence i
+  LEFT JOIN NIF_Codes n ON n.Supplier_ID = i.Supplier_ID
+  WHERE i.Refundable = 1');
+
+DROP PROCEDURE Drop_Index_If_Exists;
+DROP PROCEDURE Create_View_If_Missing;
+
+ANALYZE TABLE Invoices_Chancery, Invoices_Residence, Vouchers, Vat_Rollup_Supplier;
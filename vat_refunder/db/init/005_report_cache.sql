@@ -0,0 +1,21 @@
+-- ============================================================
+--  Change counter for Vouchers, so app/report_cache.py notices
+--  renamed or re-assigned vouchers in the invoice-to-voucher
+--  report (see 002_table_versions.sql for the other counters).
+--  Safe to re-run against an existing database.
+-- ============================================================
+
+USE vat_refunder;
+
+INSERT IGNORE INTO Table_Versions (Table_Name) VALUES
+  ('Vouchers');
+
+DROP TRIGGER IF EXISTS trg_Vouchers_ai;
+DROP TRIGGER IF EXISTS trg_Vouchers_au;
+DROP TRIGGER IF EXISTS trg_Vouchers_ad;
+CREATE TRIGGER trg_Vouchers_ai AFTER INSERT ON Vouchers FOR EACH ROW
+  UPDATE Table_Versions SET Version = Version + 1 WHERE Table_Name = 'Vouchers';
+CREATE TRIGGER trg_Vouchers_au AFTER UPDATE ON Vouchers FOR EACH ROW
+  UPDATE Table_Versions SET Version = Version + 1 WHERE Table_Name = 'Vouchers';
+CREATE TRIGGER trg_Vouchers_ad AFTER DELETE ON Vouchers FOR EACH ROW
+  UPDATE Table_Versions SET Version = Version + 1 WHERE Table_Name = 'Vouchers';
@@ -0,0 +1,102 @@
+-- ============================================================
+--  Change tracking for incremental exports (app/export_changes.py).
+--
+--  Created_At / Updated_At on the invoice and voucher tables are
+--  kept by MySQL itself (DEFAULT / ON UPDATE CURRENT_TIMESTAMP),
+--  so every writer is covered without touching the forms.
+--  Rows that exist when this runs get the migration time.
+--
+--  IDX_I*_Changes put Updated_At right after the report predicate
+--  (Year, Quarter, Refundable), so "changed since the last export"
+--  is one short index range instead of the whole quarter.
+--
+--  Export_Watermarks remembers, per report and scope, when it was
+--  last exported and the period's row count / VAT at that moment.
+--  NULL quarter / year / colleague are stored as 0 so they can be
+--  part of the primary key.
+--
+--  Safe to re-run against an existing database.
+-- ============================================================
+
+USE vat_refunder;
+
+DROP PROCEDURE IF EXISTS Add_Change_Tracking;
+DROP PROCEDURE IF EXISTS Drop_Index_If_Exists;
+
+DELIMITER $$
+
+CREATE PROCEDURE Add_Change_Tracking(IN p_table VARCHAR(64))
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.COLUMNS
+                 WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND COLUMN_NAME = 'Updated_At') THEN
+    SET @ddl = CONCAT('ALTER TABLE `', p_table, '`',
+                      ' ADD COLUMN Created_At DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),',
+                      ' ADD COLUMN Updated_At DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)',
+                      ' ON UPDATE CURRENT_TIMESTAMP(6)');
+    PREPARE stmt FROM @ddl;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+  END IF;
+END$$
+
+CREATE PROCEDURE Drop_Index_If_Exists(IN p_table VARCHAR(64), IN p_index VARCHAR(64))
+BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.STATISTICS
+             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND INDEX_NAME = p_index) THEN
+    SET @ddl = CONCAT('ALTER TABLE `', p_table, '` DROP INDEX `', p_index, '`');
+    PREPARE stmt FROM @ddl;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+  END IF;
+END$$
+
+DELIMITER ;
+
+-- ============================================================
+-- Created_At / Updated_At
+-- ============================================================
+CALL Add_Change_Tracking('Invoices_Chancery');
+CALL Add_Change_Tracking('Invoices_Residence');
+CALL Add_Change_Tracking('Invoices_Personal');
+CALL Add_Change_Tracking('Vouchers');
+
+-- ============================================================
+-- Indexes
+--   Chancery / Residence:
+--     WHERE Year = ? AND Quarter = ? AND Refundable = 1 AND Updated_At > ?
+--   Vouchers (voucher edits re-export their invoices),
+--   Invoices_Personal (matched against GetRelFactColleague):
+--     WHERE Updated_At > ?
+-- ============================================================
+CALL Drop_Index_If_Exists('Invoices_Chancery', 'IDX_IC_Changes');
+ALTER TABLE Invoices_Chancery
+  ADD KEY IDX_IC_Changes (Year, Quarter, Refundable, Updated_At);
+
+CALL Drop_Index_If_Exists('Invoices_Residence', 'IDX_IR_Changes');
+ALTER TABLE Invoices_Residence
+  ADD KEY IDX_IR_Changes (Year, Quarter, Refundable, Updated_At);
+
+CALL Drop_Index_If_Exists('Vouchers', 'IDX_Vouchers_Updated');
+ALTER TABLE Vouchers
+  ADD KEY IDX_Vouchers_Updated (Updated_At);
+
+CALL Drop_Index_If_Exists('Invoices_Personal', 'IDX_IP_Updated');
+ALTER TABLE Invoices_Personal
+  ADD KEY IDX_IP_Updated (Updated_At);
+
+-- ============================================================
+-- Export_Watermarks
+-- ============================================================
+CREATE TABLE IF NOT EXISTS Export_Watermarks (
+  Report VARCHAR(32) NOT NULL,
+  Year INT NOT NULL,
+  Quarter INT NOT NULL,
+  Colleague_ID INT NOT NULL DEFAULT 0,
+  Exported_At DATETIME(6) NOT NULL,
+  Row_Count INT NOT NULL DEFAULT 0,
+  Vat_Total DECIMAL(14,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (Report, Year, Quarter, Colleague_ID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+DROP PROCEDURE Add_Change_Tracking;
+DROP PROCEDURE Drop_Index_If_Exists;